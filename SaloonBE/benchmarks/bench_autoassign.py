@@ -0,0 +1,110 @@
+"""
+Benchmark for the automatic barber assignment scheduler.
+
+Builds a salon with 100 barbers, 200 confirmed bookings and up to 2,000
+pending ones on one day (haircuts and colorings spread over opening
+hours, as many as the salon's seats allow) and times:
+
+* ``plan_assignments`` alone, the in-memory interval scheduling;
+* a full ``auto_assign`` run, which also writes the assignments through
+  ``apply_bulk_operation`` (slot claims, stats, events).
+
+Runs against a throwaway SQLite file, never the project database.
+
+Usage (from SaloonBE/):
+    python -m benchmarks.bench_autoassign
+"""
+import os
+import tempfile
+import time as clock
+from collections import Counter
+from datetime import time, timedelta
+
+from benchmarks.django_env import setup_django
+
+BARBERS = 100
+PENDING = 2000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, 'bench.sqlite3'))
+        from django.db import connection
+        from django.utils import timezone
+
+        from core.models import Barber, Booking, Salon, Service, SlotClaim, User
+        from core.reservations import SlotUnavailable, claim_slot
+        from core.scheduling import auto_assign, plan_assignments
+        from core.stats import verify_salon_stats
+
+        owner = User.objects.create_user(username='owner', password='x', user_type='owner', phone='9000000000')
+        customer = User.objects.create_user(username='customer', password='x', user_type='customer',
+                                            phone='9100000000')
+        salon = Salon.objects.create(
+            owner=owner, name='Rush Hour Cuts', description='', address='MG Road',
+            latitude=17.385, longitude=78.4867, phone='1234567890',
+            opening_time=time(9), closing_time=time(21),
+        )
+        services = [
+            Service.objects.create(salon=salon, name='Haircut', description='', price='249.50', duration=30),
+            Service.objects.create(salon=salon, name='Coloring', description='', price='899.00', duration=60),
+        ]
+        barbers = [
+            Barber.objects.create(
+                user=User.objects.create_user(username=f'barber{i}', password='x', user_type='barber',
+                                              phone=f'92{i:08d}'),
+                salon=salon,
+            )
+            for i in range(BARBERS)
+        ]
+        day = timezone.localdate() + timedelta(days=1)
+        for i in range(BARBERS * 2):
+            booking = Booking.objects.create(
+                customer=customer, salon=salon, service=services[0], barber=barbers[i % BARBERS],
+                status='confirmed', booking_date=day, booking_time=time(9 + i // BARBERS * 6),
+            )
+            claim_slot(booking)
+        # Pending bookings hold unassigned claims, so only as many as the seats allow exist
+        for i in range(PENDING):
+            booking = Booking.objects.create(
+                customer=customer, salon=salon, service=services[i % 5 == 0], status='pending',
+                booking_date=day, booking_time=time(9 + i % 22 // 2, 30 * (i % 2)),
+            )
+            try:
+                claim_slot(booking)
+            except SlotUnavailable:
+                booking.delete()
+
+        bookings = list(Booking.objects.filter(salon=salon, booking_date=day).select_related('service')
+                        .order_by('booking_time', 'pk'))
+        pending = [b for b in bookings if b.barber_id is None]
+        started = clock.perf_counter()
+        plan = plan_assignments([b.pk for b in barbers], [b for b in bookings if b.barber_id], pending)
+        planned = (clock.perf_counter() - started) * 1000
+
+        queries = []
+        started = clock.perf_counter()
+        with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+            assigned, still_pending = auto_assign(salon.pk, day)
+        elapsed = clock.perf_counter() - started
+
+        loads = Counter(Booking.objects.filter(salon=salon, booking_date=day).exclude(barber=None)
+                        .values_list('barber_id', flat=True))
+        print(f'{len(pending)} pending bookings, {BARBERS} barbers')
+        print(f'plan_assignments: {len(plan)} planned in {planned:.1f} ms')
+        print(f'auto_assign: {assigned} assigned, {still_pending} still pending in {elapsed:.2f} s '
+              f'({len(queries)} queries)')
+        print(f'bookings per barber: min {min(loads.values())}, max {max(loads.values())}')
+
+        assert assigned == len(plan)
+        assert not verify_salon_stats([salon.pk]), 'stats drifted'
+        double_booked = (
+            SlotClaim.objects.filter(salon=salon, booking_date=day).exclude(barber=None)
+            .values_list('barber_id', 'cell').distinct().count()
+            != SlotClaim.objects.filter(salon=salon, booking_date=day).exclude(barber=None).count()
+        )
+        assert not double_booked, 'a barber holds overlapping bookings'
+
+
+if __name__ == '__main__':
+    main()
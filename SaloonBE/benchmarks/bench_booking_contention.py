@@ -0,0 +1,114 @@
+"""
+Concurrency benchmark for booking creation.
+
+Many customer threads POST to ``/api/bookings/`` at once, most of them
+going for the same few popular slots. Reports bookings per second, how
+many requests succeeded or got ``409 Conflict``, and checks that no slot
+ended up with more active bookings than the salon has barbers.
+
+Runs against a throwaway SQLite file, never the project database.
+
+Usage (from SaloonBE/):
+    python -m benchmarks.bench_booking_contention
+"""
+import os
+import random
+import tempfile
+import threading
+import time as clock
+from collections import Counter
+from datetime import date, time, timedelta
+
+from benchmarks.django_env import setup_django
+
+BARBERS = 3
+CLIENTS = (8, 32)
+REQUESTS_PER_CLIENT = 10
+POPULAR_SLOTS = (time(10), time(10, 30), time(18))
+POPULAR_SHARE = 0.8
+
+
+def make_world(clients, tag):
+    from core.models import Barber, Salon, Service, User
+
+    owner = User.objects.create_user(username=f'{tag}-owner', password='x', user_type='owner', phone=f'90{tag:08d}')
+    salon = Salon.objects.create(
+        owner=owner, name=f'Popular Cuts {tag}', description='', address='MG Road',
+        latitude=17.385, longitude=78.4867, phone='1234567890',
+        opening_time=time(9), closing_time=time(21),
+    )
+    service = Service.objects.create(salon=salon, name='Haircut', description='', price=250, duration=30)
+    for i in range(BARBERS):
+        user = User.objects.create_user(username=f'{tag}-barber{i}', password='x', user_type='barber', phone=f'91{tag:04d}{i:04d}')
+        Barber.objects.create(user=user, salon=salon)
+    customers = [
+        User.objects.create_user(username=f'{tag}-customer{i}', password='x', user_type='customer', phone=f'92{tag:04d}{i:04d}')
+        for i in range(clients)
+    ]
+    return salon, service, customers
+
+
+def run_round(clients, day):
+    from django.db import connection
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from core.models import Booking
+
+    salon, service, customers = make_world(clients, tag=clients)
+
+    opening = [time(h, m) for h in range(9, 21) for m in (0, 30)]
+    outcomes = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(clients)
+
+    def client_thread(customer, seed):
+        rng = random.Random(seed)
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(customer)}')
+        barrier.wait()
+        for _ in range(REQUESTS_PER_CLIENT):
+            slot = rng.choice(POPULAR_SLOTS if rng.random() < POPULAR_SHARE else opening)
+            response = api.post('/api/bookings/', {
+                'salon': salon.pk, 'service': service.pk,
+                'booking_date': day.isoformat(), 'booking_time': slot.strftime('%H:%M'),
+            }, format='json')
+            with lock:
+                outcomes[response.status_code] += 1
+        connection.close()
+
+    threads = [threading.Thread(target=client_thread, args=(c, i)) for i, c in enumerate(customers)]
+    started = clock.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = clock.perf_counter() - started
+
+    per_slot = Counter(
+        Booking.objects.filter(salon=salon).exclude(status='cancelled').values_list('booking_time', flat=True)
+    )
+    worst = max(per_slot.values(), default=0)
+    assert worst <= BARBERS, f'overbooked: {worst} bookings in one slot with {BARBERS} barbers'
+    return outcomes, elapsed, worst
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        # Writers queue on SQLite's lock instead of failing with "database is locked"
+        setup_django(os.path.join(tmp, 'bench.sqlite3'), timeout=30, transaction_mode='IMMEDIATE')
+        day = date.today() + timedelta(days=1)
+
+        print(f"{'clients':>8} {'requests':>9} {'201':>6} {'409':>6} {'other':>6} "
+              f"{'req/s':>8} {'bookings/s':>11} {'max/slot':>9}")
+        for clients in CLIENTS:
+            outcomes, elapsed, worst = run_round(clients, day)
+            total = sum(outcomes.values())
+            created, conflicts = outcomes[201], outcomes[409]
+            other = total - created - conflicts
+            print(f'{clients:>8} {total:>9} {created:>6} {conflicts:>6} {other:>6} '
+                  f'{total / elapsed:>8.1f} {created / elapsed:>11.1f} {worst:>9}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark for the service catalog import.
+
+Imports a 5,000-service catalog through
+``POST /api/salons/<id>/services/import/`` with a CSV upload, first into
+an empty salon and then again with a third of the prices changed, and
+compares it with creating services the way owners did before, one
+``POST /api/services/`` each (timed on the first 500 rows). Reports wall
+time and query count for each run and checks the export round-trips.
+
+Runs against a throwaway SQLite file, never the project database.
+
+Usage (from SaloonBE/):
+    python -m benchmarks.bench_catalog_import
+"""
+import csv
+import io
+import os
+import tempfile
+import time as clock
+from datetime import time
+
+from benchmarks.django_env import setup_django
+
+ROWS = 5_000
+BASELINE_ROWS = 500
+
+
+def make_csv(price_bump=0):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(['name', 'description', 'price', 'duration', 'is_active', 'image'])
+    for i in range(ROWS):
+        price = 100 + i % 400 + (price_bump if i % 3 == 0 else 0)
+        writer.writerow([f'Service {i:05d}', f'Treatment number {i}', f'{price}.00', 15 + 15 * (i % 6), 'true', ''])
+    return out.getvalue().encode()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, 'bench.sqlite3'))
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from django.db import connection
+        from rest_framework.test import APIClient
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        from core.models import Salon, Service, User
+
+        owner = User.objects.create_user(username='owner', password='x', user_type='owner', phone='9000000000')
+        salons = [
+            Salon.objects.create(
+                owner=owner, name=f'Branch {i}', description='', address='MG Road',
+                latitude=17.385, longitude=78.4867, phone='1234567890',
+                opening_time=time(9), closing_time=time(21),
+            )
+            for i in range(2)
+        ]
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(owner)}')
+
+        def measure(func):
+            queries = []
+
+            def count(execute, sql, params, many, context):
+                queries.append(sql)
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(count):
+                started = clock.perf_counter()
+                result = func()
+                elapsed = clock.perf_counter() - started
+            return result, elapsed, len(queries)
+
+        def post_each():
+            rows = csv.DictReader(io.StringIO(make_csv().decode()))
+            for _, row in zip(range(BASELINE_ROWS), rows):
+                response = api.post('/api/services/', {**row, 'salon': salons[0].pk}, format='json')
+                assert response.status_code == 201, response.data
+
+        def upload(body):
+            def run():
+                file = SimpleUploadedFile('services.csv', body, content_type='text/csv')
+                response = api.post(f'/api/salons/{salons[1].pk}/services/import/', {'file': file}, format='multipart')
+                assert response.status_code == 200, response.data
+                return response.data
+            return run
+
+        print(f"{'run':>24} {'rows':>6} {'seconds':>8} {'queries':>8}  result")
+        _, elapsed, queries = measure(post_each)
+        print(f"{'POST per service':>24} {BASELINE_ROWS:>6} {elapsed:>8.2f} {queries:>8}  "
+              f'~{elapsed * ROWS / BASELINE_ROWS:.0f}s for {ROWS}')
+        for label, body in (('import, new catalog', make_csv()), ('import, 1/3 repriced', make_csv(25))):
+            result, elapsed, queries = measure(upload(body))
+            print(f'{label:>24} {ROWS:>6} {elapsed:>8.2f} {queries:>8}  {result}')
+
+        response = api.get(f'/api/salons/{salons[1].pk}/services/export/')
+        exported = b''.join(response.streaming_content)
+        assert exported.replace(b'\r\n', b'\n') == make_csv(25).replace(b'\r\n', b'\n'), 'export does not round-trip'
+        assert Service.objects.filter(salon=salons[1]).count() == ROWS
+
+
+if __name__ == '__main__':
+    main()
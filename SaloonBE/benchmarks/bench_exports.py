@@ -0,0 +1,118 @@
+"""
+Memory benchmark for the streaming CSV exports.
+
+Builds salons with 20k and 100k bookings (each with a payment) and
+measures peak Python memory (``tracemalloc``) for:
+
+* serializing every booking the way the list endpoint does
+  (``BookingSerializer(..., many=True).data``), which is what paging
+  through ``/api/bookings/`` for a monthly dump amounts to;
+* ``GET /api/bookings/export/`` and ``GET /api/payments/export/``
+  consumed chunk by chunk, under WSGI (``Client``) and ASGI
+  (``AsyncClient``, read with ``async for`` as ``ASGIHandler`` does).
+
+Export peaks should stay flat as the row count grows. Timings include
+``tracemalloc`` overhead, which inflates the serializer run the most.
+
+Runs against a throwaway SQLite file, never the project database.
+
+Usage (from SaloonBE/):
+    python -m benchmarks.bench_exports
+"""
+import asyncio
+import os
+import tempfile
+import time as clock
+import tracemalloc
+from datetime import date, time, timedelta
+
+from benchmarks.django_env import setup_django
+
+SIZES = (20_000, 100_000)
+
+
+def make_rows(count, tag):
+    from django.contrib.auth.hashers import make_password
+
+    from core.models import Booking, Payment, Salon, Service, User
+
+    owner = User.objects.create(username=f'owner{tag}', password=make_password('x'), user_type='owner',
+                                phone=f'90{tag:08d}')
+    customer = User.objects.create(username=f'customer{tag}', password='!', user_type='customer',
+                                   phone=f'91{tag:08d}', first_name='Carl')
+    salon = Salon.objects.create(
+        owner=owner, name=f'Ledger Cuts {tag}', description='', address='MG Road',
+        latitude=17.385, longitude=78.4867, phone='1234567890',
+        opening_time=time(9), closing_time=time(21),
+    )
+    service = Service.objects.create(salon=salon, name='Haircut', description='', price='249.50', duration=30)
+    start = date(2025, 1, 1)
+    Booking.objects.bulk_create([
+        Booking(customer=customer, salon=salon, service=service, status='completed', notes='',
+                booking_date=start + timedelta(days=i // 40), booking_time=time(9 + i % 12, 30 * (i % 2)))
+        for i in range(count)
+    ], batch_size=2000)
+    bookings = Booking.objects.filter(salon=salon).values_list('pk', flat=True).iterator()
+    Payment.objects.bulk_create(
+        (Payment(booking_id=pk, amount='249.50', payment_method='upi', status='completed') for pk in bookings),
+        batch_size=2000,
+    )
+    return owner, salon
+
+
+def measure(func):
+    tracemalloc.start()
+    started = clock.perf_counter()
+    size = func()
+    elapsed = clock.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, elapsed, peak / 2 ** 20
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, 'bench.sqlite3'))
+        from django.test import AsyncClient, Client
+        from rest_framework.renderers import JSONRenderer
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        from core.models import Booking
+        from core.serializers import BookingSerializer
+
+        print(f"{'rows':>8} {'method':>30} {'MB out':>7} {'seconds':>8} {'peak MB':>8}")
+        for tag, count in enumerate(SIZES):
+            owner, salon = make_rows(count, tag)
+            headers = {'Authorization': f'Bearer {AccessToken.for_user(owner)}'}
+
+            def serialize_all():
+                queryset = Booking.objects.filter(salon=salon).select_related(
+                    'customer', 'salon', 'service', 'barber__user'
+                )
+                return len(JSONRenderer().render(BookingSerializer(queryset, many=True).data))
+
+            def wsgi(url):
+                def run():
+                    response = Client().get(url, headers=headers)
+                    return sum(len(chunk) for chunk in response.streaming_content)
+                return run
+
+            def asgi(url):
+                async def consume():
+                    response = await AsyncClient().get(url, headers=headers)
+                    return sum([len(chunk) async for chunk in response])
+                return lambda: asyncio.run(consume())
+
+            cases = [
+                ('serializer, all bookings', serialize_all),
+                ('bookings export (WSGI)', wsgi('/api/bookings/export/')),
+                ('bookings export (ASGI)', asgi('/api/bookings/export/')),
+                ('payments export (WSGI)', wsgi('/api/payments/export/')),
+            ]
+            for name, func in cases:
+                size, elapsed, peak = measure(func)
+                print(f'{count:>8} {name:>30} {size / 2 ** 20:>7.1f} {elapsed:>8.2f} {peak:>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
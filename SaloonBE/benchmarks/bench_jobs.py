@@ -0,0 +1,93 @@
+"""
+Benchmark for the background job worker.
+
+Queues 1,000 jobs that each rebuild one salon's stats (a handful of
+queries, like the real handlers) and drains them with:
+
+* one worker running jobs inline;
+* one worker with a pool of 4 threads;
+* two workers side by side with 2 threads each, competing for claims.
+
+Reports jobs per second and checks every job ran exactly once. SQLite
+takes one writer at a time, so here threads cost more in lock waits than
+they gain; they pay off for handlers that wait on something else (mail,
+HTTP) or on a database with row-level locking.
+
+Runs against a throwaway SQLite file, never the project database.
+
+Usage (from SaloonBE/):
+    python -m benchmarks.bench_jobs
+"""
+import os
+import tempfile
+import threading
+import time as clock
+from collections import Counter
+from datetime import time
+
+from benchmarks.django_env import setup_django
+
+JOBS = 1000
+SALONS = 20
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, 'bench.sqlite3'), timeout=30, transaction_mode='IMMEDIATE')
+        from django.db import connection
+
+        from core.jobs import Worker, enqueue, register
+        from core.models import Job, Salon, User
+        from core.stats import rebuild_salon_stats
+
+        owner = User.objects.create_user(username='owner', password='x', user_type='owner', phone='9000000000')
+        salons = [
+            Salon.objects.create(
+                owner=owner, name=f'Salon {i}', description='', address='MG Road',
+                latitude=17.385, longitude=78.4867, phone='1234567890',
+                opening_time=time(9), closing_time=time(21),
+            ).pk
+            for i in range(SALONS)
+        ]
+
+        ran, lock = Counter(), threading.Lock()
+
+        @register('bench.rebuild')
+        def rebuild(n, salon_id):
+            rebuild_salon_stats([salon_id])
+            with lock:
+                ran[n] += 1
+
+        def drain(workers, threads):
+            def run(worker):
+                worker.run(once=True)
+                worker.shutdown()
+                connection.close()
+
+            pool = [Worker(threads=threads) for _ in range(workers)]
+            started = clock.perf_counter()
+            runners = [threading.Thread(target=run, args=(worker,)) for worker in pool]
+            for runner in runners:
+                runner.start()
+            for runner in runners:
+                runner.join()
+            return clock.perf_counter() - started, [worker.stats()['ran'] for worker in pool]
+
+        print(f"{'workers x threads':>18} {'seconds':>8} {'jobs/s':>8}  jobs per worker")
+        for workers, threads in ((1, 1), (1, 4), (2, 2)):
+            Job.objects.all().delete()
+            ran.clear()
+            for n in range(JOBS):
+                enqueue('bench.rebuild', {'n': n, 'salon_id': salons[n % SALONS]})
+
+            elapsed, per_worker = drain(workers, threads)
+            label = f'{workers} x {threads}'
+            print(f'{label:>18} {elapsed:>8.2f} {JOBS / elapsed:>8.0f}  {per_worker}')
+
+            assert sum(per_worker) == JOBS
+            assert set(ran) == set(range(JOBS)) and set(ran.values()) == {1}, 'a job ran twice or not at all'
+            assert Job.objects.filter(status='succeeded').count() == JOBS
+
+
+if __name__ == '__main__':
+    main()
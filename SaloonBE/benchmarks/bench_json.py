@@ -0,0 +1,70 @@
+"""
+Benchmark for the orjson renderer and parser.
+
+Renders representative API payloads with DRF's ``JSONRenderer`` and with
+``core.renderers.FastJSONRenderer``, checks the bytes are identical, and
+reports render time. Payloads are real serializer output for salon,
+booking and barber lists (strings for decimals and dates, as the API
+sends them), plus a list of raw model values where ``Decimal``, ``date``
+and ``time`` objects go through the encoder fallback. Parsing is measured
+on a bulk request body.
+
+Usage (from SaloonBE/):
+    python -m benchmarks.bench_json
+"""
+import os
+import tempfile
+import timeit
+from io import BytesIO
+
+from benchmarks.bench_read_path import make_rows
+from benchmarks.django_env import setup_django
+
+REPEAT = 5
+
+
+def best_ms(func, number=3):
+    return min(timeit.repeat(func, number=number, repeat=REPEAT)) / number * 1000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, 'bench.sqlite3'))
+        from rest_framework.parsers import JSONParser
+        from rest_framework.renderers import JSONRenderer
+
+        from core.models import Barber, Booking, Salon
+        from core.readpath import BARBER_DETAIL_READER, BOOKING_READER, SALON_LIST_READER
+        from core.renderers import FastJSONParser, FastJSONRenderer
+
+        make_rows()
+        bookings = Booking.objects.order_by('-booking_date', '-booking_time', '-id')
+        payloads = [
+            ('salons 10k', SALON_LIST_READER.serialize(Salon.objects.order_by('-created_at', '-id'))),
+            ('bookings 10k', BOOKING_READER.serialize(bookings)),
+            ('bookings page', BOOKING_READER.serialize(bookings[:50])),
+            ('barbers 10k', BARBER_DETAIL_READER.serialize(Barber.objects.order_by('id'))),
+            ('raw values 10k', list(bookings.values(
+                'id', 'salon_id', 'service__price', 'booking_date', 'booking_time', 'status', 'created_at',
+            ))),
+        ]
+
+        stock, fast = JSONRenderer(), FastJSONRenderer()
+        print(f"{'payload':>15} {'KB':>8} {'json (ms)':>10} {'orjson (ms)':>12} {'speedup':>8}")
+        for name, data in payloads:
+            body = stock.render(data)
+            assert fast.render(data) == body, name
+            stock_ms = best_ms(lambda: stock.render(data))
+            fast_ms = best_ms(lambda: fast.render(data))
+            print(f'{name:>15} {len(body) / 1024:>8.0f} {stock_ms:>10.2f} {fast_ms:>12.2f} '
+                  f'{stock_ms / fast_ms:>7.1f}x')
+
+        body = stock.render(payloads[1][1])
+        stock_ms = best_ms(lambda: JSONParser().parse(BytesIO(body)))
+        fast_ms = best_ms(lambda: FastJSONParser().parse(BytesIO(body)))
+        print(f"{'parse bookings':>15} {len(body) / 1024:>8.0f} {stock_ms:>10.2f} {fast_ms:>12.2f} "
+              f'{stock_ms / fast_ms:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Micro-benchmark for the nearby salon ranking.
+
+Compares the original per-object haversine loop plus full sort against
+the vectorised distance computation with top-k selection in ``core.geo``.
+
+Usage (from SaloonBE/):
+    python -m benchmarks.bench_nearby
+"""
+import random
+import timeit
+from decimal import Decimal
+from types import SimpleNamespace
+
+from core.geo import closest, haversine_km
+
+CENTER = (17.385044, 78.486671)
+RADIUS_KM = 25
+LIMIT = 20
+SIZES = (1_000, 10_000, 100_000)
+
+
+def make_salons(count, seed=42):
+    rng = random.Random(seed)
+    return [
+        SimpleNamespace(
+            id=i,
+            latitude=Decimal(f'{CENTER[0] + rng.uniform(-0.3, 0.3):.6f}'),
+            longitude=Decimal(f'{CENTER[1] + rng.uniform(-0.3, 0.3):.6f}'),
+        )
+        for i in range(count)
+    ]
+
+
+def loop_path(salons):
+    """The original implementation: score every object, sort everything"""
+    lat, lng = CENTER
+    result = []
+    for salon in salons:
+        distance = haversine_km(lat, lng, float(salon.latitude), float(salon.longitude))
+        if distance <= RADIUS_KM:
+            salon.distance = round(distance, 2)
+            result.append(salon)
+    result.sort(key=lambda x: x.distance)
+    return result[:LIMIT]
+
+
+def vectorised_path(points):
+    """The new implementation over float rows, as fetched by ``values_list``"""
+    lat, lng = CENTER
+    return closest(lat, lng, points, RADIUS_KM, LIMIT)
+
+
+def main():
+    print(f"{'salons':>8} {'loop (ms)':>12} {'vectorised (ms)':>16} {'speedup':>8}")
+    for size in SIZES:
+        salons = make_salons(size)
+        points = [(float(s.latitude), float(s.longitude)) for s in salons]
+        expected = [s.distance for s in loop_path(salons)]
+        assert expected == [round(d, 2) for _, d in vectorised_path(points)]
+        repeat = max(3, 30_000 // size)
+        loop_ms = min(timeit.repeat(lambda: loop_path(salons), number=1, repeat=repeat)) * 1000
+        vec_ms = min(timeit.repeat(lambda: vectorised_path(points), number=1, repeat=repeat)) * 1000
+        print(f'{size:>8} {loop_ms:>12.2f} {vec_ms:>16.2f} {loop_ms / vec_ms:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark for the live walk-in queue.
+
+Builds a salon with 20 barbers and 630 bookings today (30 per barber plus
+30 unassigned walk-ins) and times:
+
+* loading the salon's queue from the database, which every status change
+  would cost without the in-memory copy;
+* one status change applied incrementally (start the first booking in a
+  lane, then complete it), including the ``bulk_update`` of moved rows;
+* ``GET /api/bookings/<id>/queue/`` polled by the customer, answered from
+  memory.
+
+Runs against a throwaway SQLite file, never the project database.
+
+Usage (from SaloonBE/):
+    python -m benchmarks.bench_queue
+"""
+import os
+import tempfile
+import time as clock
+from datetime import time
+
+from benchmarks.django_env import setup_django
+
+BARBERS = 20
+PER_LANE = 30
+REPEAT = 50
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, 'bench.sqlite3'))
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from django.utils import timezone
+        from rest_framework.test import APIClient
+
+        from core.authentication import ClaimsRefreshToken
+        from core.models import Barber, Booking, Salon, Service, User
+        from core.queues import QUEUES
+
+        owner = User.objects.create_user(username='owner', password='x', user_type='owner', phone='9000000000')
+        customer = User.objects.create_user(username='customer', password='x', user_type='customer',
+                                            phone='9100000000')
+        salon = Salon.objects.create(
+            owner=owner, name='Queue Cuts', description='', address='MG Road',
+            latitude=17.385, longitude=78.4867, phone='1234567890',
+            opening_time=time(9), closing_time=time(21),
+        )
+        service = Service.objects.create(salon=salon, name='Haircut', description='', price='249.50', duration=20)
+        barbers = [
+            Barber.objects.create(
+                user=User.objects.create_user(username=f'barber{i}', password='x', user_type='barber',
+                                              phone=f'92{i:08d}'),
+                salon=salon,
+            )
+            for i in range(BARBERS)
+        ]
+        today = timezone.localdate()
+        Booking.objects.bulk_create([
+            Booking(customer=customer, salon=salon, service=service, notes='', booking_date=today,
+                    barber=barber, status='confirmed' if barber else 'pending',
+                    booking_time=time(9 + i // 3, 20 * (i % 3)))
+            for barber in barbers + [None]
+            for i in range(PER_LANE)
+        ])
+        bookings = Booking.objects.filter(salon=salon).count()
+
+        def timed(func, repeat=REPEAT):
+            started = clock.perf_counter()
+            for _ in range(repeat):
+                func()
+            return (clock.perf_counter() - started) / repeat * 1000
+
+        def load():
+            QUEUES.clear()
+            QUEUES.lanes(salon.pk)
+
+        lane = list(Booking.objects.filter(barber__in=barbers).order_by('barber_id', 'booking_time', 'pk'))
+        heads = iter(lane[i * PER_LANE + j] for j in range(PER_LANE) for i in range(BARBERS))
+
+        def status_change():
+            booking = next(heads)
+            for new_status in ('in_progress', 'completed'):
+                booking.status = new_status
+                booking.save()
+
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f'Bearer {ClaimsRefreshToken.for_user(customer).access_token}')
+        polled = lane[-1]
+
+        def poll():
+            response = api.get(f'/api/bookings/{polled.pk}/queue/')
+            assert response.status_code == 200, response.data
+
+        print(f'{bookings} bookings today, {BARBERS} barbers')
+        print(f"{'operation':>36} {'ms':>9} {'queries':>8}")
+        for label, func, repeat in (
+            ('load queue from database', load, REPEAT),
+            ('start + complete one booking', status_change, REPEAT),
+            ('customer poll', poll, REPEAT),
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                elapsed = timed(func, repeat)
+            print(f'{label:>36} {elapsed:>9.2f} {len(queries) / repeat:>8.1f}')
+
+        # Incremental positions agree with a fresh load
+        def positions():
+            return {e.booking_id: (e.position, e.wait) for lane in QUEUES.lanes(salon.pk).values() for e in lane}
+        memory = positions()
+        QUEUES.clear()
+        assert memory == positions(), 'incremental updates drifted from a fresh load'
+        stored = dict(Booking.objects.filter(pk__in=memory).values_list('pk', 'queue_position'))
+        assert stored == {pk: position for pk, (position, _) in memory.items()}, 'rows drifted from the queue'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark for the compiled list read path.
+
+Serializes 10k salons, bookings and barbers with the DRF serializers the
+list endpoints used before and with the ``core.readpath`` readers that
+replace them, checks that both render the same JSON bytes, and reports
+rows per second. Both sides include the database query.
+
+Usage (from SaloonBE/):
+    python -m benchmarks.bench_read_path
+"""
+import os
+import tempfile
+import timeit
+from datetime import date, time, timedelta
+
+from benchmarks.django_env import setup_django
+
+ROWS = 10_000
+REPEAT = 3
+
+
+def make_rows():
+    from django.contrib.auth.hashers import make_password
+
+    from core.models import Barber, Booking, Salon, Service, User
+
+    password = make_password('x')
+    owner = User.objects.create(username='owner', password=password, user_type='owner', phone='9000000000',
+                                first_name='Olivia', last_name='Stone')
+    customer = User.objects.create(username='customer', password=password, user_type='customer',
+                                   phone='9100000000', first_name='Carl')
+    Salon.objects.bulk_create([
+        Salon(owner=owner, name=f'Salon {i}', description='', address=f'{i} MG Road',
+              latitude=f'{17 + i / ROWS:.6f}', longitude=f'{78 + i / ROWS:.6f}', phone='1234567890',
+              opening_time=time(9), closing_time=time(21), rating=f'{i % 500 / 100:.2f}', total_reviews=i % 40,
+              cover_image=f'https://img.example.com/{i}.jpg', geo_cell=0)
+        for i in range(ROWS)
+    ], batch_size=1000)
+    salon = Salon.objects.order_by('pk').first()
+    service = Service.objects.create(salon=salon, name='Haircut', description='', price='249.50', duration=30)
+
+    users = User.objects.bulk_create([
+        User(username=f'barber{i}', password=password, user_type='barber', phone=f'92{i:08d}',
+             first_name=f'Barber{i}' if i % 3 else '')
+        for i in range(ROWS)
+    ], batch_size=1000)
+    Barber.objects.bulk_create([
+        Barber(user=user, salon=salon if i % 4 else None, specialization='Fades', experience_years=i % 20)
+        for i, user in enumerate(users)
+    ], batch_size=1000)
+    barbers = list(Barber.objects.filter(salon=salon)[:50])
+
+    start = date(2025, 1, 1)
+    Booking.objects.bulk_create([
+        Booking(customer=customer, salon=salon, service=service,
+                barber=barbers[i % len(barbers)] if i % 2 else None,
+                booking_date=start + timedelta(days=i // 20), booking_time=time(9 + i % 12, 30 * (i % 2)),
+                status='confirmed' if i % 2 else 'pending', notes='')
+        for i in range(ROWS)
+    ], batch_size=1000)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, 'bench.sqlite3'))
+        from rest_framework.renderers import JSONRenderer
+
+        from core.models import Barber, Booking, Salon
+        from core.readpath import BARBER_DETAIL_READER, BOOKING_READER, SALON_LIST_READER
+        from core.serializers import BarberDetailSerializer, BookingSerializer, SalonListSerializer
+
+        make_rows()
+        cases = [
+            ('salons', SalonListSerializer, SALON_LIST_READER, Salon.objects.order_by('-created_at', '-id')),
+            ('bookings', BookingSerializer, BOOKING_READER,
+             Booking.objects.select_related('customer', 'salon', 'service', 'barber__user')
+             .order_by('-booking_date', '-booking_time', '-id')),
+            ('barbers', BarberDetailSerializer, BARBER_DETAIL_READER,
+             Barber.objects.select_related('user', 'salon').order_by('id')),
+        ]
+
+        print(f"{'list':>9} {'rows':>7} {'serializer (rows/s)':>20} {'reader (rows/s)':>16} {'speedup':>8}")
+        for name, serializer_class, reader, queryset in cases:
+            def before():
+                return serializer_class(queryset.all(), many=True).data
+
+            def after():
+                return reader.serialize(queryset.all())
+
+            assert JSONRenderer().render(before()) == JSONRenderer().render(after()), name
+            before_s = min(timeit.repeat(before, number=1, repeat=REPEAT))
+            after_s = min(timeit.repeat(after, number=1, repeat=REPEAT))
+            print(f'{name:>9} {ROWS:>7} {ROWS / before_s:>20,.0f} {ROWS / after_s:>16,.0f} '
+                  f'{before_s / after_s:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
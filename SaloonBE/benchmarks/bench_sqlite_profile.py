@@ -0,0 +1,191 @@
+"""
+Concurrency benchmark for the SQLite connection profile.
+
+Runs the same mixed workload against Django's default SQLite setup
+(rollback journal, deferred transactions, a new connection per request)
+and against the production profile from ``salon_backend.settings_production``
+(WAL, ``synchronous=NORMAL``, ``busy_timeout``, mmap, immediate
+transactions, persistent connections). Reader threads page through a
+salon's bookings as its owner while writer threads create bookings that
+a barber then assigns themselves to. Reports throughput, latency
+percentiles and how many requests failed with "database is locked".
+
+Each profile runs in its own process on its own throwaway SQLite file,
+never the project database.
+
+Usage (from SaloonBE/):
+    python -m benchmarks.bench_sqlite_profile
+"""
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time as clock
+from collections import Counter
+from datetime import date, time, timedelta
+
+READERS = 16
+WRITERS = 4
+DURATION = 5.0
+SEED_BOOKINGS = 2_000
+PROFILES = ('default', 'production')
+
+
+def profile_options(name):
+    if name == 'default':
+        return {}
+    # The production profile refuses to load without its secrets
+    os.environ.setdefault('DJANGO_SECRET_KEY', 'benchmark-only')
+    os.environ.setdefault('DJANGO_ALLOWED_HOSTS', 'localhost')
+    os.environ.setdefault('CACHE_BACKEND', 'redis')
+    os.environ.setdefault('CACHE_LOCATION', 'redis://localhost:6379/0')
+    from salon_backend.settings_production import SQLITE_OPTIONS
+    return dict(SQLITE_OPTIONS, conn_max_age=600)
+
+
+def make_world():
+    from core.models import Barber, Booking, Salon, Service, User
+
+    owner = User.objects.create_user(username='owner', password='x', user_type='owner', phone='9000000000')
+    salon = Salon.objects.create(
+        owner=owner, name='Busy Cuts', description='', address='MG Road',
+        latitude=17.385, longitude=78.4867, phone='1234567890',
+        opening_time=time(9), closing_time=time(21),
+    )
+    service = Service.objects.create(salon=salon, name='Haircut', description='', price=250, duration=30)
+    barbers = []
+    for i in range(WRITERS):
+        user = User.objects.create_user(username=f'barber{i}', password='x', user_type='barber', phone=f'910000000{i}')
+        Barber.objects.create(user=user, salon=salon)
+        barbers.append(user)
+    customers = [
+        User.objects.create_user(username=f'customer{i}', password='x', user_type='customer', phone=f'92000000{i:02d}')
+        for i in range(WRITERS)
+    ]
+    start = date.today() - timedelta(days=400)
+    Booking.objects.bulk_create([
+        Booking(customer=customers[i % WRITERS], salon=salon, service=service,
+                booking_date=start + timedelta(days=i // 5), booking_time=time(10 + i % 5), status='completed')
+        for i in range(SEED_BOOKINGS)
+    ])
+    return owner, salon, service, customers, barbers
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000 if samples else 0.0
+
+
+def run_profile(name, path):
+    from benchmarks.django_env import setup_django
+
+    setup_django(path, **profile_options(name))
+    from django.db import OperationalError, connection
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    owner, salon, service, customers, barbers = make_world()
+    connection.close()
+
+    def client(user):
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return api
+
+    outcomes = Counter()
+    latencies = {'read': [], 'write': []}
+    lock = threading.Lock()
+    barrier = threading.Barrier(READERS + WRITERS + 1)
+    stop = threading.Event()
+
+    def timed(kind, request):
+        started = clock.perf_counter()
+        try:
+            status = request().status_code
+        except OperationalError as exc:
+            status = 'locked' if 'locked' in str(exc) else 'error'
+        elapsed = clock.perf_counter() - started
+        with lock:
+            outcomes[kind, status] += 1
+            latencies[kind].append(elapsed)
+        return status
+
+    def reader():
+        api = client(owner)
+        barrier.wait()
+        while not stop.is_set():
+            timed('read', lambda: api.get(f'/api/bookings/?salon={salon.pk}&page_size=20'))
+        connection.close()
+
+    def writer(customer, barber, seed):
+        rng = random.Random(seed)
+        api, barber_api = client(customer), client(barber)
+        barber_id = barber.barber_profile.pk
+        barrier.wait()
+        while not stop.is_set():
+            day = date.today() + timedelta(days=rng.randint(1, 90))
+            payload = {
+                'salon': salon.pk, 'service': service.pk, 'booking_date': day.isoformat(),
+                'booking_time': f'{rng.randint(9, 20):02d}:{rng.choice((0, 30)):02d}',
+            }
+            response = {}
+
+            def create():
+                response['created'] = api.post('/api/bookings/', payload, format='json')
+                return response['created']
+
+            if timed('write', create) == 201:
+                pk = response['created'].data['id']
+                timed('write', lambda: barber_api.patch(f'/api/bookings/{pk}/', {'barber': barber_id}, format='json'))
+        connection.close()
+
+    threads = [threading.Thread(target=reader) for _ in range(READERS)]
+    threads += [threading.Thread(target=writer, args=(c, b, i)) for i, (c, b) in enumerate(zip(customers, barbers))]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = clock.perf_counter()
+    clock.sleep(DURATION)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = clock.perf_counter() - started
+
+    ok = {kind: sum(n for (k, status), n in outcomes.items() if k == kind and status in (200, 201))
+          for kind in ('read', 'write')}
+    return {
+        'reads/s': ok['read'] / elapsed,
+        'read p50': percentile(latencies['read'], 0.5),
+        'read p99': percentile(latencies['read'], 0.99),
+        'writes/s': ok['write'] / elapsed,
+        'write p99': percentile(latencies['write'], 0.99),
+        'locked': sum(n for (_, status), n in outcomes.items() if status == 'locked'),
+        'failed': sum(n for (_, status), n in outcomes.items() if status not in (200, 201, 409, 'locked')),
+    }
+
+
+def main():
+    if len(sys.argv) == 3:
+        # Child process: one profile, result as JSON on stdout
+        print(json.dumps(run_profile(sys.argv[1], sys.argv[2])))
+        return
+
+    print(f'{READERS} readers, {WRITERS} writers, {DURATION:.0f}s per profile')
+    print(f"{'profile':>11} {'reads/s':>8} {'read p50':>9} {'read p99':>9} {'writes/s':>9} "
+          f"{'write p99':>10} {'locked':>7} {'failed':>7}")
+    for name in PROFILES:
+        with tempfile.TemporaryDirectory() as tmp:
+            child = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_sqlite_profile', name, os.path.join(tmp, 'bench.sqlite3')],
+                capture_output=True, text=True, check=True,
+            )
+        r = json.loads(child.stdout.strip().splitlines()[-1])
+        print(f"{name:>11} {r['reads/s']:>8.1f} {r['read p50']:>7.1f}ms {r['read p99']:>7.1f}ms "
+              f"{r['writes/s']:>9.1f} {r['write p99']:>8.1f}ms {r['locked']:>7} {r['failed']:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark for the salon time-series endpoint.
+
+Builds a salon with three years of history (150 bookings a day, about
+164k bookings) and times ``GET /api/salons/<id>/stats/timeseries/``:
+
+* a monthly series over all three years aggregated straight from
+  ``Booking``, which is what the endpoint would do without rollups;
+* the first read of the day, which still aggregates live and queues the
+  roll-up job;
+* the worker running that job, which rolls every past day up into
+  ``DailySalonStats``;
+* warm monthly, weekly and daily reads, which only aggregate today live.
+
+Runs against a throwaway SQLite file, never the project database.
+
+Usage (from SaloonBE/):
+    python -m benchmarks.bench_timeseries
+"""
+import os
+import tempfile
+import time as clock
+from datetime import time, timedelta
+
+from benchmarks.django_env import setup_django
+
+YEARS = 3
+BOOKINGS_PER_DAY = 150
+REPEAT = 5
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(os.path.join(tmp, 'bench.sqlite3'))
+        from django.db.models import Count, Sum
+        from django.db.models.functions import TruncMonth
+        from django.utils import timezone
+        from rest_framework.test import APIClient
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        from core.jobs import Worker
+        from core.models import Barber, Booking, DailySalonStats, Salon, Service, User
+        from core.rollups import reset_rollups
+        from core.stats import CANCELLED, COMPLETED
+
+        owner = User.objects.create_user(username='owner', password='x', user_type='owner', phone='9000000000')
+        customer = User.objects.create_user(username='customer', password='x', user_type='customer',
+                                            phone='9100000000')
+        salon = Salon.objects.create(
+            owner=owner, name='Ledger Cuts', description='', address='MG Road',
+            latitude=17.385, longitude=78.4867, phone='1234567890',
+            opening_time=time(9), closing_time=time(21),
+        )
+        service = Service.objects.create(salon=salon, name='Haircut', description='', price='249.50', duration=30)
+        barber = Barber.objects.create(
+            user=User.objects.create_user(username='barber', password='x', user_type='barber', phone='9200000000'),
+            salon=salon,
+        )
+        today = timezone.localdate()
+        start = today - timedelta(days=365 * YEARS)
+        statuses = ('completed',) * 7 + ('cancelled', 'confirmed', 'pending')
+        Booking.objects.bulk_create(
+            (
+                Booking(customer=customer, salon=salon, service=service, notes='',
+                        status=statuses[i % len(statuses)],
+                        barber=None if statuses[i % len(statuses)] in ('pending', 'cancelled') else barber,
+                        booking_date=start + timedelta(days=i // BOOKINGS_PER_DAY),
+                        booking_time=time(9 + i % 12, 30 * (i % 2)))
+                for i in range((today - start).days * BOOKINGS_PER_DAY + BOOKINGS_PER_DAY)
+            ),
+            batch_size=2000,
+        )
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(owner)}')
+        url = f'/api/salons/{salon.pk}/stats/timeseries/'
+
+        def timed(func, repeat=REPEAT):
+            started = clock.perf_counter()
+            for _ in range(repeat):
+                func()
+            return (clock.perf_counter() - started) / repeat * 1000
+
+        def live_monthly():
+            list(
+                Booking.objects.filter(salon=salon, booking_date__range=(start, today)).order_by()
+                .annotate(period=TruncMonth('booking_date')).values('period').annotate(
+                    bookings=Count('id'), completed_bookings=Count('id', filter=COMPLETED),
+                    cancelled_bookings=Count('id', filter=CANCELLED), revenue=Sum('service__price', filter=COMPLETED),
+                )
+            )
+
+        def read(query):
+            def run():
+                response = api.get(f'{url}?{query}')
+                assert response.status_code == 200, response.data
+                return response.data
+            return run
+
+        booking_rows = Booking.objects.filter(salon=salon).count()
+        monthly = f'period=month&start_date={start}'
+        print(f'{booking_rows} bookings over {YEARS} years')
+        print(f"{'read':>36} {'ms':>9} {'rows aggregated':>16}")
+        print(f"{'live aggregate, monthly':>36} {timed(live_monthly):>9.1f} {booking_rows:>16}")
+        print(f"{'first read (queues roll-up)':>36} {timed(read(monthly), repeat=1):>9.1f} {booking_rows:>16}")
+        print(f"{'roll-up job':>36} {timed(lambda: Worker().run(once=True), repeat=1):>9.1f} {booking_rows:>16}")
+        rollup_rows = DailySalonStats.objects.filter(salon=salon).count()
+        # Rollup rows for the past days plus today's bookings
+        for label, query, rows in (
+            ('monthly, 3 years', monthly, rollup_rows),
+            ('weekly, 3 years', f'period=week&start_date={start}', rollup_rows),
+            ('daily, last 365 days', f'period=day&start_date={today - timedelta(days=364)}', 364),
+        ):
+            print(f'{label:>36} {timed(read(query)):>9.1f} {rows + BOOKINGS_PER_DAY:>16}')
+
+        # Rolled-up and live results agree
+        rolled = read(monthly)()['results']
+        reset_rollups([salon.pk])
+        assert rolled == read(monthly)()['results'], 'rollups drifted from the booking table'
+
+
+if __name__ == '__main__':
+    main()
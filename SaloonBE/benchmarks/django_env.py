@@ -0,0 +1,17 @@
+"""Run benchmarks against a throwaway SQLite database, never the project one."""
+import logging
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'salon_backend.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+
+def setup_django(path, conn_max_age=0, **options):
+    settings.DATABASES['default'].update(NAME=path, OPTIONS=options, CONN_MAX_AGE=conn_max_age)
+    django.setup()
+    # Expected 4xx responses would otherwise be logged as warnings
+    logging.getLogger('django.request').setLevel(logging.ERROR)
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
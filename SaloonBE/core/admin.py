@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import BarberJoinRequest, User, Salon, Service, Barber, Booking, Payment, Review
+from .models import BarberJoinRequest, DailySalonStats, Job, User, Salon, SalonStats, Service, Barber, Booking, Payment, Review
 
 
 @admin.register(User)
@@ -23,6 +23,22 @@ class SalonAdmin(admin.ModelAdmin):
     readonly_fields = ['rating', 'total_reviews', 'created_at']
 
 
+@admin.register(SalonStats)
+class SalonStatsAdmin(admin.ModelAdmin):
+    list_display = ['salon', 'confirmed_bookings', 'completed_bookings', 'pending_bookings',
+                    'cancelled_bookings', 'total_revenue', 'total_barbers', 'updated_at']
+    readonly_fields = ['confirmed_bookings', 'completed_bookings', 'pending_bookings',
+                       'cancelled_bookings', 'total_revenue', 'total_barbers', 'rolled_up_through', 'updated_at']
+
+
+@admin.register(DailySalonStats)
+class DailySalonStatsAdmin(admin.ModelAdmin):
+    list_display = ['salon', 'date', 'bookings', 'completed_bookings', 'cancelled_bookings', 'revenue']
+    list_filter = ['salon']
+    date_hierarchy = 'date'
+    readonly_fields = ['bookings', 'completed_bookings', 'cancelled_bookings', 'revenue']
+
+
 @admin.register(Service)
 class ServiceAdmin(admin.ModelAdmin):
     list_display = ['name', 'salon', 'price', 'duration', 'is_active']
@@ -65,4 +81,11 @@ class BarberJoinRequestAdmin(admin.ModelAdmin):
     list_display = ['barber', 'salon', 'status', 'created_at']
     list_filter = ['status', 'created_at']
     search_fields = ['barber__username', 'salon__name']
-    readonly_fields = ['created_at', 'updated_at']
\ No newline at end of file
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'attempts', 'max_attempts', 'run_at', 'finished_at']
+    list_filter = ['status', 'name']
+    readonly_fields = ['claimed_by', 'claimed_at', 'last_error', 'created_at', 'finished_at']
@@ -0,0 +1,184 @@
+"""
+Claims-based JWT authentication.
+
+Tokens from ``/api/auth/login/`` and ``/api/auth/token/refresh/`` carry
+what most views need to know about the caller:
+
+* ``username`` and ``user_type``
+* ``salon_ids``: the salons the user owns
+* ``barber_id`` and ``barber_salon_id``: their barber profile and its salon
+* ``ver``: the user's ``token_version`` when the token was issued
+
+``ClaimsJWTAuthentication`` turns those claims into ``request.user``
+without loading the user row. The user is a ``User`` whose other fields
+are deferred, so ``owner=request.user`` filters and comparisons work as
+before, and the first access to any other field loads the rest of the
+row in one query.
+
+Whenever something behind the claims changes, the handlers in
+``core.signals`` call ``bump_token_version``: user type, active flag,
+password, owned salons or barber salon. A token whose ``ver`` is behind
+is not trusted, and that request loads the user row like plain
+``JWTAuthentication`` (as does the first request after the cached
+version expires). Inactive users are refused there, and so are
+tokens issued before a password change (the ``hash_password`` claim).
+The client picks up fresh claims on its next refresh. The current version
+is cached for ``TOKEN_VERSION_CACHE_SECONDS`` in the default cache. With
+per-process caches, another worker may keep accepting a stale token for
+that long; share the cache to make revocation immediate.
+"""
+from django.core.cache import cache
+from django.db import router, transaction
+from django.db.models import F
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import Barber, Salon, User
+
+TOKEN_VERSION_CACHE_SECONDS = 60
+
+# Fields a claims-built user has loaded
+CLAIM_FIELDS = ('id', 'username', 'user_type')
+
+
+# ============ TOKEN VERSIONS ============
+
+def _version_key(user_id):
+    return f'auth:token-version:{user_id}'
+
+
+def cached_token_version(user_id):
+    return cache.get(_version_key(user_id))
+
+
+def cache_token_version(user):
+    cache.set(_version_key(user.pk), user.token_version, TOKEN_VERSION_CACHE_SECONDS)
+
+
+def bump_token_version(*user_ids):
+    """Stop trusting the claims in tokens already issued to these users"""
+    user_ids = {pk for pk in user_ids if pk is not None}
+    if not user_ids:
+        return
+    User.objects.filter(pk__in=user_ids).update(token_version=F('token_version') + 1)
+    keys = [_version_key(pk) for pk in user_ids]
+    cache.delete_many(keys)
+    # A concurrent request may cache the pre-commit version
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+# ============ CLAIMS ============
+
+def user_claims(user):
+    # Read the version first: a change after this point leaves the token behind, never ahead
+    version = User.objects.filter(pk=user.pk).values_list('token_version', flat=True).get()
+    barber_id, barber_salon_id = Barber.objects.filter(user=user).values_list('pk', 'salon_id').first() or (None, None)
+    return {
+        'username': user.username,
+        'user_type': user.user_type,
+        'salon_ids': sorted(Salon.objects.filter(owner=user).values_list('pk', flat=True)),
+        'barber_id': barber_id,
+        'barber_salon_id': barber_salon_id,
+        'ver': version,
+    }
+
+
+def salon_claims(token):
+    return {name: token[name] for name in ('salon_ids', 'barber_id', 'barber_salon_id')}
+
+
+def claims_user(user_id, token):
+    """A ``User`` with only ``CLAIM_FIELDS`` loaded and the salon claims in ``claims``"""
+    user = User.from_db(router.db_for_read(User), CLAIM_FIELDS, [user_id, token['username'], token['user_type']])
+    user.claims = salon_claims(token)
+    return user
+
+
+def owned_salon_ids(user):
+    """Ids of the salons ``user`` owns, from the token claims when there are any"""
+    claims = getattr(user, 'claims', None)
+    if claims is not None:
+        return set(claims['salon_ids'])
+    return set(Salon.objects.filter(owner=user).values_list('pk', flat=True))
+
+
+def barber_ids(user):
+    """``(barber_id, salon_id)`` of the user's barber profile; ``(None, None)`` without one"""
+    claims = getattr(user, 'claims', None)
+    if claims is not None:
+        return claims['barber_id'], claims['barber_salon_id']
+    return Barber.objects.filter(user=user).values_list('pk', 'salon_id').first() or (None, None)
+
+
+def is_revoked(token, user):
+    # Tokens issued before the claim existed carry no password hash
+    claim = token.get(api_settings.REVOKE_TOKEN_CLAIM)
+    return claim is not None and claim != get_md5_hash_password(user.password)
+
+
+# ============ TOKENS ============
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token (and access tokens made from it) carrying ``user_claims``"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token.payload.update(user_claims(user))
+        return token
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = ClaimsRefreshToken
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Issue the new access token with claims read from the database, not the refresh token"""
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(pk=refresh.payload.get(api_settings.USER_ID_CLAIM)).first()
+        if not api_settings.USER_AUTHENTICATION_RULE(user) or is_revoked(refresh, user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        access = refresh.access_token
+        access.payload.update(user_claims(user))
+        return {'access': str(access)}
+
+
+# ============ AUTHENTICATION ============
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that builds ``request.user`` from current token claims"""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError):
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        # Tokens from before claims existed have no version
+        version = validated_token.get('ver')
+        if version is not None and version == cached_token_version(user_id):
+            return claims_user(user_id, validated_token)
+
+        # Version not cached yet, or the claims are stale: check the user row
+        user = self.get_stored_user(user_id, validated_token)
+        cache_token_version(user)
+        if version == user.token_version:
+            user.claims = salon_claims(validated_token)
+        return user
+
+    def get_stored_user(self, user_id, validated_token):
+        user = User.objects.filter(pk=user_id).first()
+        if user is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        if is_revoked(validated_token, user):
+            raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+        return user
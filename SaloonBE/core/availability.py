@@ -0,0 +1,195 @@
+"""
+Server-side availability engine.
+
+For a salon, service and date range, ``get_availability`` returns the slot
+start times at which the service can still be booked. Existing bookings are
+loaded with a single query and counted per grid cell for each day; a slot
+is offered only if ``claim_slot`` (core/reservations.py) would accept a
+booking there, so the two share their rules: the statuses that hold a
+chair (``ACTIVE_STATUSES``), how many bookings a salon can run at once
+(``seat_capacity``) and the grid cells a booking covers (``cells_between``).
+With a barber, that barber's busy time is kept in an ``IntervalIndex``.
+
+Computed days are cached per (salon, day, service, barber). Cache keys
+embed a salon-wide version and a per-day version, which the helpers in
+``core.derived`` bump whenever a booking, barber, service or
+the salon itself changes, so stale entries are never read. Every worker
+must see the same versions, hence the shared cache the production
+settings require.
+"""
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from operator import itemgetter
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Barber, Booking
+
+SLOT_INTERVAL = 30  # minutes, same grid the app uses
+MAX_RANGE_DAYS = 14
+CACHE_TIMEOUT = 6 * 60 * 60
+
+# Bookings that hold a chair
+ACTIVE_STATUSES = ('pending', 'confirmed', 'in_progress')
+
+
+def seat_capacity(barbers):
+    """Overlapping bookings a salon with ``barbers`` available barbers can take"""
+    # A salon without barbers can still take one booking per slot
+    return max(barbers, 1)
+
+
+def to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def cells_between(start, end):
+    """Grid cells (start minute of each cell) that ``[start, end)`` minutes touch"""
+    return range(start - start % SLOT_INTERVAL, end, SLOT_INTERVAL)
+
+
+def format_minutes(minutes):
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+class IntervalIndex:
+    """Disjoint, sorted busy intervals ``[start, end)`` in minutes for one barber-day"""
+
+    def __init__(self, intervals=()):
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start < merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.intervals = merged
+
+    def is_free(self, start, end):
+        # The last interval starting before ``end`` also ends last, since intervals are disjoint
+        i = bisect_left(self.intervals, end, key=itemgetter(0))
+        return i == 0 or self.intervals[i - 1][1] <= start
+
+    def add(self, start, end):
+        """Mark a free ``[start, end)`` busy"""
+        insort(self.intervals, [start, end], key=itemgetter(0))
+
+
+def slot_starts(salon, duration):
+    """Slot grid for a salon's opening hours that fits the whole service"""
+    opening, closing = to_minutes(salon.opening_time), to_minutes(salon.closing_time)
+    return list(range(opening, closing - duration + 1, SLOT_INTERVAL))
+
+
+def free_slots_for_day(starts, duration, capacity, day_bookings, barber_id=None):
+    """
+    Pick free slots from ``starts`` given the day's active ``(barber_id,
+    start, end)`` bookings: every grid cell the service would cover holds
+    fewer than ``capacity`` bookings, and with ``barber_id`` none of those
+    cells is taken by one of that barber's bookings.
+    """
+    load = Counter()
+    busy = []
+    for booked_barber, start, end in day_bookings:
+        cells = cells_between(start, end)
+        load.update(cells)
+        if barber_id is not None and booked_barber == barber_id and cells:
+            busy.append((cells[0], cells[-1] + SLOT_INTERVAL))
+    chair = IntervalIndex(busy)
+
+    slots = []
+    for start in starts:
+        cells = cells_between(start, start + duration)
+        if barber_id is not None and cells and not chair.is_free(cells[0], cells[-1] + SLOT_INTERVAL):
+            continue
+        if all(load[cell] < capacity for cell in cells):
+            slots.append(start)
+    return slots
+
+
+# ============ CACHE VERSIONING ============
+
+def _version_keys(salon_id, days):
+    return [f'availability:v:{salon_id}'] + [f'availability:v:{salon_id}:{day}' for day in days]
+
+
+def _versions(salon_id, days):
+    keys = _version_keys(salon_id, days)
+    versions = cache.get_many(keys)
+    missing = {key: uuid4().hex for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def invalidate_availability(salon_id, day=None):
+    """Drop cached availability for a salon, or for one day of it"""
+    if salon_id is None:
+        return
+    suffix = f':{day}' if day is not None else ''
+    key = f'availability:v:{salon_id}{suffix}'
+
+    def bump():
+        cache.set(key, uuid4().hex, None)
+    bump()
+    # A concurrent request may cache pre-commit slots under the new version
+    transaction.on_commit(bump)
+
+
+# ============ PUBLIC API ============
+
+def get_availability(salon, service, start_date, end_date, barber=None):
+    """
+    Return ``{date: ['HH:MM', ...]}`` of bookable slot starts for each day
+    from ``start_date`` to ``end_date`` inclusive.
+    """
+    days = [start_date + timedelta(days=n) for n in range((end_date - start_date).days + 1)]
+    barber_id = barber.pk if barber is not None else None
+    salon_version, *day_versions = _versions(salon.pk, days)
+    cache_keys = {
+        day: f'availability:{salon.pk}:{salon_version}:{day}:{version}:{service.pk}:{barber_id}'
+        for day, version in zip(days, day_versions)
+    }
+    cached = cache.get_many(cache_keys.values())
+    result = {day: cached[key] for day, key in cache_keys.items() if key in cached}
+
+    missing = [day for day in days if day not in result]
+    if missing:
+        duration = service.duration
+        starts = slot_starts(salon, duration)
+        if barber is not None and not barber.is_available:
+            starts = []
+        capacity = seat_capacity(Barber.objects.filter(salon=salon, is_available=True).count())
+
+        # One query for every booking on the days still to compute
+        by_day = defaultdict(list)
+        rows = (
+            Booking.objects.filter(salon=salon, booking_date__in=missing, status__in=ACTIVE_STATUSES)
+            .values_list('barber_id', 'booking_date', 'booking_time', 'service__duration')
+        )
+        for booked_barber, day, time, booked_duration in rows:
+            start = to_minutes(time)
+            by_day[day].append((booked_barber, start, start + booked_duration))
+
+        fresh = {}
+        for day in missing:
+            slots = [format_minutes(s) for s in free_slots_for_day(
+                starts, duration, capacity, by_day[day], barber_id
+            )]
+            result[day] = slots
+            fresh[cache_keys[day]] = slots
+        cache.set_many(fresh, CACHE_TIMEOUT)
+
+    return {day: result[day] for day in days}
+
+
+def drop_past_slots(availability, lead_minutes=30):
+    """Remove slots that start less than ``lead_minutes`` from now"""
+    cutoff = datetime.now() + timedelta(minutes=lead_minutes)
+    return {
+        day: [s for s in slots if datetime.combine(day, datetime.strptime(s, '%H:%M').time()) >= cutoff]
+        for day, slots in availability.items()
+    }
@@ -0,0 +1,153 @@
+"""
+Bulk booking operations.
+
+``apply_bulk_operation`` validates every booking against
+``Booking.VALID_TRANSITIONS`` first and only then writes all of them with
+one UPDATE (``bulk_update`` when they get different values) in a single
+transaction; if any booking fails, none change. Neither sends
+``post_save``, so slot claims are synced here and the rest of the derived
+data goes through ``core.derived.bookings_saved``, as a single save does.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .derived import bookings_saved
+from .models import Booking, SlotClaim
+from .reservations import ACTIVE_STATUSES, SlotUnavailable, assign_claims, claim_slot, snapshot
+
+OPERATIONS = ('cancel', 'confirm', 'reassign', 'reschedule')
+MAX_BULK_BOOKINGS = 200
+
+# Bookings that can still be moved to another barber or time
+MOVABLE_STATUSES = ('pending', 'confirmed')
+
+
+class BulkOperationError(Exception):
+    """``errors`` maps booking ids to the reason each one was rejected"""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def check_transition(booking, new_status):
+    if new_status not in Booking.VALID_TRANSITIONS.get(booking.status, []):
+        return f'Cannot change status from {booking.status} to {new_status}'
+    return None
+
+
+def plan_change(booking, operation, barber=None, booking_date=None, booking_time=None):
+    """Field values ``operation`` sets on ``booking``, or an error message"""
+    if operation == 'cancel':
+        return check_transition(booking, 'cancelled') or {'status': 'cancelled'}
+
+    if operation == 'confirm':
+        if booking.barber_id is None:
+            return 'Assign a barber before confirming'
+        return check_transition(booking, 'confirmed') or {'status': 'confirmed'}
+
+    if booking.status not in MOVABLE_STATUSES:
+        return f'Cannot {operation} a booking in {booking.status} status'
+
+    if operation == 'reassign':
+        if barber.salon_id != booking.salon_id:
+            return 'Barber does not work at this salon'
+        # Assigning a pending booking confirms it, as barber self-assignment does
+        if booking.status == 'pending':
+            return check_transition(booking, 'confirmed') or {'barber': barber, 'status': 'confirmed'}
+        return {'barber': barber}
+
+    new_time = booking_time or booking.booking_time
+    if datetime.combine(booking_date, new_time) < datetime.now() + timedelta(minutes=30):
+        return 'Please book at least 30 minutes in advance'
+    return {'booking_date': booking_date, 'booking_time': new_time}
+
+
+def apply_bulk_operation(bookings, operation, **params):
+    """
+    Apply ``operation`` to every booking in ``bookings`` or to none of them.
+
+    Raises ``BulkOperationError`` when any booking fails validation and
+    ``SlotUnavailable`` (with the booking id in ``booking_id``) when a moved
+    booking no longer fits its slot.
+    """
+    changes, errors = {}, {}
+    for booking in bookings:
+        change = plan_change(booking, operation, **params)
+        if isinstance(change, str):
+            errors[booking.pk] = change
+        else:
+            changes[booking.pk] = change
+    if errors:
+        raise BulkOperationError(errors)
+
+    now = timezone.now()
+    fields = sorted({field for change in changes.values() for field in change}) + ['updated_at']
+    before = {booking.pk: snapshot(booking) for booking in bookings}
+    previous = {booking.pk: getattr(booking, '_persisted_state', None) for booking in bookings}
+    with transaction.atomic():
+        for booking in bookings:
+            for field, value in changes[booking.pk].items():
+                setattr(booking, field, value)
+            booking.updated_at = now
+        values = list(changes.values())
+        if all(change == values[0] for change in values):
+            # The usual case; one plain UPDATE is much cheaper than bulk_update's CASE per row
+            Booking.objects.filter(pk__in=changes).update(**values[0], updated_at=now)
+        else:
+            Booking.objects.bulk_update(bookings, fields)
+        sync_bulk_claims(bookings, before)
+        bookings_saved(bookings, previous)
+    return bookings
+
+
+def sync_bulk_claims(bookings, before):
+    """
+    ``sync_claims`` for many bookings, given their ``snapshot`` from before
+    the change. Every moved booking gives up its seats before any of them
+    claims new ones, so bookings can swap slots.
+    """
+    moved = [
+        b for b in bookings
+        if b.status in ACTIVE_STATUSES and before[b.pk][2:] != (b.booking_date, b.booking_time)
+    ]
+    released = [b for b in bookings if b.status not in ACTIVE_STATUSES] + moved
+    if released:
+        SlotClaim.objects.filter(booking__in=released).delete()
+
+    reassigned = defaultdict(list)
+    for booking in bookings:
+        if booking in moved:
+            try:
+                claim_slot(booking)
+            except SlotUnavailable as exc:
+                exc.booking_id = booking.pk
+                raise
+        elif booking.status in ACTIVE_STATUSES and before[booking.pk][1] != booking.barber_id:
+            reassigned[booking.barber_id].append(booking)
+    for barber_id, group in reassigned.items():
+        assign_group_claims(group, barber_id)
+
+
+def assign_group_claims(bookings, barber_id):
+    """``assign_claims`` for bookings moving to one barber, with one UPDATE when none collide"""
+    if len(bookings) > 1:
+        try:
+            with transaction.atomic():
+                SlotClaim.objects.filter(booking__in=bookings).update(barber_id=barber_id)
+            claimed = SlotClaim.objects.filter(booking__in=bookings).values('booking').distinct().count()
+            # Otherwise some bookings predate slot claims and still need theirs
+            if claimed == len(bookings):
+                return
+        except IntegrityError:
+            pass
+    # Booking by booking, to claim missing slots or find the one that collides
+    for booking in bookings:
+        try:
+            assign_claims(booking, barber_id)
+        except SlotUnavailable as exc:
+            exc.booking_id = booking.pk
+            raise
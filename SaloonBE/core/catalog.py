@@ -0,0 +1,184 @@
+"""
+Service catalog import and export.
+
+An import reads a CSV or JSON upload one batch at a time, validates each
+batch with ``ServiceImportSerializer`` and upserts it by service name:
+names the salon does not have yet go through ``bulk_create``, changed
+services through ``bulk_update``. Any invalid row rolls back the whole
+import. Exports stream the catalog in the same columns, so an export can
+be edited and imported again.
+
+Bulk writes skip ``post_save``, so ``import_catalog`` passes what it
+wrote to ``core.derived.services_saved``, as the service signal handlers
+do.
+"""
+import codecs
+import csv
+import json
+from collections import Counter
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from .derived import services_saved
+from .exports import EXPORT_CHUNK_SIZE, csv_stream
+from .models import Service
+from .serializers import ServiceImportSerializer
+
+CATALOG_FIELDS = ('name', 'description', 'price', 'duration', 'is_active', 'image')
+IMPORT_BATCH_SIZE = 500
+MAX_IMPORT_ROWS = 10_000
+MAX_REPORTED_ERRORS = 50
+
+
+class CatalogImportError(Exception):
+    """``errors`` is a list of ``{'row': n, 'errors': ...}`` entries"""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+# ============ IMPORT ============
+
+def read_rows(upload):
+    """Rows of an uploaded ``.csv`` (read line by line) or ``.json`` list"""
+    if upload.name.lower().endswith('.json') or upload.content_type == 'application/json':
+        try:
+            rows = json.load(upload)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise CatalogImportError([{'row': None, 'errors': f'Invalid JSON: {e}'}])
+        if not isinstance(rows, list):
+            raise CatalogImportError([{'row': None, 'errors': 'JSON upload must be a list of services'}])
+        return iter(rows)
+    return csv_rows(upload)
+
+
+def csv_rows(upload):
+    """Rows of a CSV upload; decoding and parse errors raise ``CatalogImportError`` with the row number"""
+    reader = csv.DictReader(codecs.iterdecode(upload, 'utf-8-sig'))
+    row = 0
+    try:
+        for row, record in enumerate(reader, 1):
+            yield record
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Nothing read yet means the header itself is broken
+        raise CatalogImportError([{'row': row + 1 if reader.line_num else None, 'errors': f'Invalid CSV: {e}'}])
+
+
+def clean_row(row):
+    # Empty cells fall back to the model default (or fail if required)
+    if not isinstance(row, dict):
+        return {}
+    return {field: row[field] for field in CATALOG_FIELDS if row.get(field) not in ('', None)}
+
+
+def import_catalog(salon, rows):
+    """
+    Upsert ``rows`` into the salon's catalog, keyed on service name.
+
+    Returns ``{'created': n, 'updated': n, 'unchanged': n}``; raises
+    ``CatalogImportError`` (and changes nothing) if any row is invalid.
+    When the salon already has several services with one name, the oldest
+    is updated.
+    """
+    existing = {}
+    for service in Service.objects.filter(salon=salon).order_by('-pk'):
+        existing[service.name] = service
+
+    counts = Counter(created=0, updated=0, unchanged=0)
+    errors, seen, created, touched = [], set(), [], []
+    price_changed = False
+    now = timezone.now()
+    rows = iter(rows)
+    row_number = 0
+
+    with transaction.atomic():
+        while batch := list(islice(rows, IMPORT_BATCH_SIZE)):
+            first_row = row_number + 1
+            row_number += len(batch)
+            if row_number > MAX_IMPORT_ROWS:
+                errors.append({'row': row_number, 'errors': f'Imports are limited to {MAX_IMPORT_ROWS} rows'})
+                break
+
+            serializer = ServiceImportSerializer(data=[clean_row(row) for row in batch], many=True)
+            if not serializer.is_valid():
+                errors.extend(
+                    {'row': first_row + i, 'errors': row_errors}
+                    for i, row_errors in enumerate(serializer.errors) if row_errors
+                )
+                if len(errors) >= MAX_REPORTED_ERRORS:
+                    break
+                continue
+
+            new, changed, changed_fields = [], [], set()
+            for i, data in enumerate(serializer.validated_data):
+                name = data['name']
+                if name in seen:
+                    errors.append({'row': first_row + i, 'errors': {'name': [f'Duplicate service name {name!r}']}})
+                    continue
+                seen.add(name)
+
+                service = existing.get(name)
+                if service is None:
+                    new.append(Service(salon=salon, **data))
+                    continue
+                changes = {field: value for field, value in data.items() if getattr(service, field) != value}
+                if not changes:
+                    counts['unchanged'] += 1
+                    continue
+                changed_fields.update(changes)
+                for field, value in changes.items():
+                    setattr(service, field, value)
+                service.updated_at = now
+                changed.append(service)
+
+            if errors:
+                continue
+            Service.objects.bulk_create(new)
+            if changed:
+                # Only the columns that differ, so a price list update stays a narrow UPDATE
+                Service.objects.bulk_update(changed, sorted(changed_fields) + ['updated_at'])
+                price_changed = price_changed or 'price' in changed_fields
+            created.extend(service.pk for service in new)
+            touched.extend(service.pk for service in changed)
+
+        if errors:
+            # Leaving the atomic block by exception rolls back earlier batches
+            raise CatalogImportError(errors[:MAX_REPORTED_ERRORS])
+
+        counts['created'], counts['updated'] = len(created), len(touched)
+        services_saved([salon.pk], created, touched, price_changed)
+    return dict(counts)
+
+
+# ============ EXPORT ============
+
+def export_rows(salon):
+    return (
+        Service.objects.filter(salon=salon).order_by('name', 'pk')
+        .values_list(*CATALOG_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def export_catalog_csv(salon):
+    rows = (
+        [name, description, price, duration, 'true' if is_active else 'false', image]
+        for name, description, price, duration, is_active, image in export_rows(salon)
+    )
+    return csv_stream(CATALOG_FIELDS, rows)
+
+
+def export_catalog_json(salon):
+    """A JSON list, one service per line, with prices as strings like the API"""
+    yield '['
+    separator = '\n'
+    for name, description, price, duration, is_active, image in export_rows(salon):
+        row = {
+            'name': name, 'description': description, 'price': str(price),
+            'duration': duration, 'is_active': is_active, 'image': image,
+        }
+        yield separator + json.dumps(row, ensure_ascii=False)
+        separator = ',\n'
+    yield '\n]\n'
@@ -0,0 +1,144 @@
+"""
+Derived data kept in step with bookings, barbers and services.
+
+Bookings feed SalonStats counters, daily rollups, cached availability,
+list ETags, the live queue and booking events; services feed the search
+indexes, cached service responses, revenue and the slot grid. The helpers
+here update all of it for one kind of write. The signal handlers in
+``core.signals`` call them for single saves and deletes, and the bulk
+paths that skip signals (``core.bulk``, ``core.catalog``) call the same
+helpers, so a change updates the same things whichever way it is written.
+
+Each helper is given the state from before the write, and each model has
+a single handler per signal that reads that state and then remembers the
+new one, so no handler depends on running before another.
+"""
+from .availability import invalidate_availability
+from .etags import bump_salon_version
+from .events import booking_event_type, publish_booking_event
+from .models import Booking
+from .queues import QUEUES, in_queue, queue_booking_changes, queue_booking_removal
+from .responsecache import invalidate_tags
+from .rollups import record_daily_changes, reset_rollups
+from .search import SALON_INDEX, SERVICE_INDEX
+from .stats import rebuild_salon_stats, record_booking_changes, refresh_barber_count, refresh_revenue
+
+
+def booking_state(booking):
+    return {f: getattr(booking, f) for f in Booking.TRACKED_FIELDS}
+
+
+# ============ BOOKINGS ============
+
+def bookings_saved(bookings, previous, created=False):
+    """
+    Update everything derived from ``bookings`` after they were written.
+
+    ``previous`` maps booking ids to their ``_persisted_state`` from before
+    the write; ``None`` (deferred fields, an unsaved copy) means unknown,
+    and the affected salons are rebuilt instead of patched.
+    """
+    changes = [(None if created else previous.get(b.pk), booking_state(b)) for b in bookings]
+    known = [(old, new) for old, new in changes if created or old is not None]
+    record_booking_changes(known)
+    record_daily_changes(known)
+    unknown = {new['salon_id'] for old, new in changes if old is None and not created}
+    if unknown:
+        rebuild_salon_stats(unknown)
+        reset_rollups(unknown)
+
+    days = {(new['salon_id'], new['booking_date']) for _, new in changes}
+    days |= {(old['salon_id'], old['booking_date']) for old, _ in changes if old is not None}
+    for salon_id, day in days:
+        invalidate_availability(salon_id, day)
+    for salon_id in unknown:
+        # The booking may have moved from any day
+        invalidate_availability(salon_id)
+    bump_salon_version(*{salon_id for salon_id, _ in days})
+
+    queue_booking_changes(
+        b.pk for b, (old, new) in zip(bookings, changes)
+        if (old is None and not created) or in_queue(new) or (old is not None and in_queue(old))
+    )
+    for booking, (old, _) in zip(bookings, changes):
+        publish_booking_event(booking, booking_event_type(old, booking, created))
+        booking.remember_state()
+
+
+def booking_deleted(booking):
+    state = getattr(booking, '_persisted_state', None) or booking_state(booking)
+    record_booking_changes([(state, None)])
+    record_daily_changes([(state, None)])
+    invalidate_availability(state['salon_id'], state['booking_date'])
+    bump_salon_version(booking.salon_id, state['salon_id'])
+    if in_queue(state):
+        queue_booking_removal(state['salon_id'], booking.pk)
+    publish_booking_event(booking, 'booking.deleted')
+
+
+# ============ BARBERS ============
+
+def barber_saved(barber, previous_salon_id):
+    """After a barber was saved; ``previous_salon_id`` is the salon they were at before"""
+    if previous_salon_id != barber.salon_id:
+        refresh_barber_count([previous_salon_id, barber.salon_id])
+    for salon_id in (previous_salon_id, barber.salon_id):
+        invalidate_availability(salon_id)
+    bump_salon_version(barber.salon_id, previous_salon_id)
+    # Lanes and the number of barbers sharing unassigned bookings
+    QUEUES.invalidate(barber.salon_id, previous_salon_id)
+
+
+def barber_deleted(barber, booking_salon_ids):
+    """After a barber was deleted; ``booking_salon_ids`` are the salons of the bookings they had"""
+    previous_salon_id = getattr(barber, '_persisted_salon_id', None)
+    invalidate_availability(barber.salon_id)
+    if booking_salon_ids:
+        # Their bookings were un-assigned without signals
+        rebuild_salon_stats(booking_salon_ids | {barber.salon_id} - {None})
+        reset_rollups(booking_salon_ids)
+    else:
+        refresh_barber_count([barber.salon_id])
+    bump_salon_version(barber.salon_id, previous_salon_id)
+    QUEUES.invalidate(barber.salon_id, previous_salon_id)
+
+
+# ============ SERVICES ============
+
+def services_saved(salon_ids, created_ids=(), updated_ids=(), price_changed=True):
+    """
+    Update what is derived from services after a write. ``salon_ids`` are
+    their salons, before and after. Updated services may have changed the
+    durations and active flags the slot grid and queue use and, unless
+    ``price_changed`` is false, the prices revenue is counted in.
+    """
+    salon_ids = {pk for pk in salon_ids if pk is not None}
+    service_ids = [*created_ids, *updated_ids]
+    if not service_ids:
+        return
+    SERVICE_INDEX.refresh(service_ids)
+    # Salons are indexed with their service names
+    SALON_INDEX.refresh(salon_ids)
+    invalidate_tags(
+        'service:all', *(f'service:salon:{pk}' for pk in salon_ids), *(f'service:{pk}' for pk in service_ids)
+    )
+    bump_salon_version(*salon_ids)
+    if updated_ids:
+        for salon_id in salon_ids:
+            invalidate_availability(salon_id)
+        QUEUES.invalidate(*salon_ids)
+        if price_changed:
+            for salon_id in salon_ids:
+                refresh_revenue(salon_id)
+            reset_rollups(salon_ids)
+
+
+def service_deleted(service):
+    salon_ids = {service.salon_id, getattr(service, '_persisted_salon_id', service.salon_id)} - {None}
+    SERVICE_INDEX.remove([service.pk])
+    SALON_INDEX.refresh(salon_ids)
+    invalidate_tags('service:all', f'service:{service.pk}', *(f'service:salon:{pk}' for pk in salon_ids))
+    bump_salon_version(*salon_ids)
+    for salon_id in salon_ids:
+        invalidate_availability(salon_id)
+    QUEUES.invalidate(*salon_ids)
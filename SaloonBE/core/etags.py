@@ -0,0 +1,80 @@
+"""
+Conditional GET for per-salon list endpoints.
+
+Each salon has a version token in the Django cache. The helpers in
+``core.derived`` replace it whenever a booking, service or barber is
+written, and ``core.signals`` when the salon itself is.
+``ConditionalListMixin`` derives the list ETag from that token plus the
+caller and query string, so a matching ``If-None-Match`` is answered with
+``304 Not Modified`` before the queryset or serializer runs.
+
+Tokens are random rather than incrementing, so a lost or evicted cache
+entry can never bring back an old ETag. Every worker process must read
+the same tokens, which is why the production settings require a shared
+cache backend.
+"""
+import hashlib
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def _version_key(salon_id):
+    return f'etag:salon:{salon_id}'
+
+
+def salon_version(salon_id):
+    key = _version_key(salon_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid4().hex
+        # Another request may have set it first; keep whichever won
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_salon_version(*salon_ids):
+    keys = [_version_key(pk) for pk in {pk for pk in salon_ids if pk is not None}]
+    if not keys:
+        return
+
+    def bump():
+        cache.set_many({key: uuid4().hex for key in keys}, None)
+    bump()
+    # A concurrent poll may tag pre-commit data with the new token
+    transaction.on_commit(bump)
+
+
+class ConditionalListMixin:
+    """ETag / If-None-Match for ``list`` when filtered with ``?salon=<id>``"""
+
+    def list_etag(self, request):
+        salon_id = request.query_params.get('salon')
+        if not salon_id or not salon_id.isdigit():
+            return None
+        # Same salon and version can still give different results per user and filter
+        scope = '|'.join([
+            type(self).__name__, salon_version(int(salon_id)),
+            str(request.user.pk), request.META.get('QUERY_STRING', ''),
+        ])
+        return quote_etag(hashlib.md5(scope.encode('utf-8')).hexdigest())
+
+    def list(self, request, *args, **kwargs):
+        etag = self.list_etag(request)
+        if etag is None:
+            return super().list(request, *args, **kwargs)
+
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().list(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            # Revalidate on every use
+            response['Cache-Control'] = 'private, no-cache'
+        return response
@@ -0,0 +1,216 @@
+"""
+Booking event pub/sub for the real-time stream.
+
+Signal handlers publish small booking events to topics (``salon:<id>``,
+``user:<id>`` for the customer and ``barber:<id>`` for the assigned
+barber, so publishing needs no lookups); the Server-Sent Events view in ``core.views`` subscribes to
+the topics a user may see and forwards events as they arrive.
+
+The broker is chosen with ``settings.EVENT_BROKER``:
+
+* ``LocalBroker`` (default) fans out inside one process. Enough for a
+  single ASGI worker.
+* ``RelayBroker`` additionally sends every event through the
+  ``run_event_relay`` management command, which echoes it to all
+  connected workers, so a booking changed in one process reaches
+  subscribers in every other one. It stands in for a shared broker such
+  as Redis pub/sub and falls back to local delivery when the relay is
+  down.
+"""
+import asyncio
+import json
+import logging
+import socket
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 100
+
+
+def salon_topic(salon_id):
+    return f'salon:{salon_id}'
+
+
+def user_topic(user_id):
+    return f'user:{user_id}'
+
+
+def barber_topic(barber_id):
+    return f'barber:{barber_id}'
+
+
+class Subscription:
+    """Events for one stream connection, consumed from its event loop"""
+
+    def __init__(self, broker, topics, maxsize=QUEUE_SIZE):
+        self.broker = broker
+        self.topics = frozenset(topics)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        # Set when events were dropped; the client must refetch
+        self.overflowed = False
+
+    def deliver(self, event):
+        """Called from any thread"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # Event loop already closed
+            self.close()
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        """Next event, or ``None`` after ``timeout`` seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """In-process topic fan-out"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, topics):
+        subscription = Subscription(self, topics)
+        with self._lock:
+            for topic in subscription.topics:
+                self._subscribers[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[topic]
+
+    def publish(self, topics, event):
+        self.deliver(topics, event)
+
+    def deliver(self, topics, event):
+        with self._lock:
+            targets = set().union(*(self._subscribers.get(topic, ()) for topic in topics))
+        for subscription in targets:
+            subscription.deliver(event)
+
+
+class RelayBroker(LocalBroker):
+    """
+    Local fan-out plus a TCP connection to ``run_event_relay``.
+
+    Published events go to the relay only; the relay sends them back to
+    every connected worker (this one included), whose reader thread hands
+    them to local subscribers.
+    """
+
+    def __init__(self, address=None):
+        super().__init__()
+        self.address = address or tuple(settings.EVENT_RELAY_ADDRESS)
+        self._sock = None
+        self._send_lock = threading.Lock()
+
+    def _connect(self):
+        if self._sock is not None:
+            return self._sock
+        try:
+            sock = socket.create_connection(self.address, timeout=2)
+        except OSError as e:
+            logger.warning('Event relay %s:%s unreachable: %s', *self.address, e)
+            return None
+        sock.settimeout(None)
+        self._sock = sock
+        threading.Thread(target=self._read, args=(sock,), daemon=True).start()
+        return sock
+
+    def _read(self, sock):
+        try:
+            for line in sock.makefile('r', encoding='utf-8'):
+                message = json.loads(line)
+                self.deliver(message['topics'], message['event'])
+        except (OSError, ValueError) as e:
+            logger.warning('Event relay connection lost: %s', e)
+        finally:
+            with self._send_lock:
+                if self._sock is sock:
+                    self._sock = None
+            sock.close()
+
+    def subscribe(self, topics):
+        with self._send_lock:
+            self._connect()
+        return super().subscribe(topics)
+
+    def publish(self, topics, event):
+        line = json.dumps({'topics': list(topics), 'event': event}) + '\n'
+        with self._send_lock:
+            sock = self._connect()
+            if sock is not None:
+                try:
+                    sock.sendall(line.encode('utf-8'))
+                    return
+                except OSError as e:
+                    logger.warning('Event relay send failed: %s', e)
+                    self._sock = None
+        # Relay down: at least this worker's subscribers hear about it
+        self.deliver(topics, event)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(getattr(settings, 'EVENT_BROKER', 'core.events.LocalBroker'))()
+
+
+# ============ BOOKING EVENTS ============
+
+def booking_event_type(previous, booking, created):
+    if created:
+        return 'booking.created'
+    if previous is None:
+        return 'booking.updated'
+    if previous['barber_id'] is None and booking.barber_id is not None:
+        return 'booking.assigned'
+    if previous['status'] != booking.status:
+        return 'booking.status'
+    return 'booking.updated'
+
+
+def publish_booking_event(booking, event_type):
+    """Publish once the surrounding transaction commits"""
+    topics = [salon_topic(booking.salon_id), user_topic(booking.customer_id)]
+    if booking.barber_id is not None:
+        topics.append(barber_topic(booking.barber_id))
+    event = {
+        'type': event_type,
+        'booking': {
+            'id': booking.pk,
+            'salon': booking.salon_id,
+            'customer': booking.customer_id,
+            'barber': booking.barber_id,
+            'service': booking.service_id,
+            'booking_date': str(booking.booking_date),
+            'booking_time': str(booking.booking_time)[:5],
+            'status': booking.status,
+        },
+    }
+    transaction.on_commit(lambda: get_broker().publish(topics, event))
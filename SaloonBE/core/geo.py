@@ -0,0 +1,142 @@
+"""Geospatial helpers for salon location lookups.
+
+Salons are bucketed into a fixed latitude/longitude grid. Each salon stores
+the integer id of its grid cell in ``Salon.geo_cell`` (indexed), so a radius
+search can be narrowed to the handful of cells overlapping the search
+bounding box before any exact distance is computed.
+"""
+import heapq
+from math import asin, cos, degrees, floor, radians, sin, sqrt
+
+from django.db.models import Q
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional at runtime
+    np = None
+
+EARTH_RADIUS_KM = 6371
+
+# Grid cell size in degrees (~11 km of latitude per row)
+GRID_CELL_DEGREES = 0.1
+GRID_ROWS = int(round(180 / GRID_CELL_DEGREES))
+GRID_COLUMNS = int(round(360 / GRID_CELL_DEGREES))
+
+# Above this many grid rows a cell lookup stops paying off and the
+# bounding box alone is used to narrow the candidates.
+MAX_GRID_ROWS = 64
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometres"""
+    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
+    c = 2 * asin(sqrt(a))
+    return EARTH_RADIUS_KM * c
+
+
+def grid_row(lat):
+    return min(max(int(floor((float(lat) + 90) / GRID_CELL_DEGREES)), 0), GRID_ROWS - 1)
+
+
+def grid_col(lng):
+    return min(max(int(floor((float(lng) + 180) / GRID_CELL_DEGREES)), 0), GRID_COLUMNS - 1)
+
+
+def grid_cell(lat, lng):
+    """Grid cell id for a coordinate, as stored on ``Salon.geo_cell``"""
+    return grid_row(lat) * GRID_COLUMNS + grid_col(lng)
+
+
+def bounding_box(lat, lng, radius_km):
+    """
+    Return ``(min_lat, max_lat, lng_ranges)`` enclosing a circle.
+
+    ``lng_ranges`` is a list of ``(min_lng, max_lng)`` tuples; a box that
+    crosses the antimeridian is split in two.
+    """
+    angular = radius_km / EARTH_RADIUS_KM
+    min_lat = lat - degrees(angular)
+    max_lat = lat + degrees(angular)
+
+    # Circle covers a pole: every longitude is in range
+    if min_lat <= -90 or max_lat >= 90 or angular >= 1:
+        return max(min_lat, -90), min(max_lat, 90), [(-180.0, 180.0)]
+
+    dlng = degrees(asin(min(1.0, sin(angular) / cos(radians(lat)))))
+    min_lng = lng - dlng
+    max_lng = lng + dlng
+
+    if min_lng < -180:
+        return min_lat, max_lat, [(min_lng + 360, 180.0), (-180.0, max_lng)]
+    if max_lng > 180:
+        return min_lat, max_lat, [(min_lng, 180.0), (-180.0, max_lng - 360)]
+    return min_lat, max_lat, [(min_lng, max_lng)]
+
+
+def nearby_filter(lat, lng, radius_km):
+    """
+    Build a ``Q`` selecting salons inside the bounding box of a circle.
+
+    The grid cell ranges let the database answer from the ``geo_cell``
+    index; the latitude/longitude ranges trim the cell overshoot so only
+    true bounding-box candidates reach the exact distance check.
+    """
+    min_lat, max_lat, lng_ranges = bounding_box(lat, lng, radius_km)
+
+    box = Q()
+    for min_lng, max_lng in lng_ranges:
+        box |= Q(longitude__gte=min_lng, longitude__lte=max_lng)
+    box &= Q(latitude__gte=min_lat, latitude__lte=max_lat)
+
+    first_row, last_row = grid_row(min_lat), grid_row(max_lat)
+    if last_row - first_row + 1 > MAX_GRID_ROWS:
+        return box
+
+    cells = Q()
+    for row in range(first_row, last_row + 1):
+        base = row * GRID_COLUMNS
+        for min_lng, max_lng in lng_ranges:
+            cells |= Q(geo_cell__range=(base + grid_col(min_lng), base + grid_col(max_lng)))
+    return cells & box
+
+
+def haversine_km_many(lat, lng, lats, lngs):
+    """Vectorised haversine from one point to arrays of coordinates"""
+    lat1, lon1 = radians(lat), radians(lng)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    lon2 = np.radians(np.asarray(lngs, dtype=np.float64))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def closest(lat, lng, points, radius_km, limit=None, offset=0):
+    """
+    Rank ``points`` (a sequence of ``(lat, lng)`` pairs) by distance.
+
+    Returns ``(index, distance_km)`` pairs for points within ``radius_km``,
+    nearest first, sliced to ``[offset:offset + limit]``. Only the first
+    ``offset + limit`` matches are ever fully sorted.
+    """
+    k = None if limit is None else offset + limit
+    if not points or k == 0:
+        return []
+
+    if np is None:
+        scored = (
+            (haversine_km(lat, lng, float(p_lat), float(p_lng)), i)
+            for i, (p_lat, p_lng) in enumerate(points)
+        )
+        within = [item for item in scored if item[0] <= radius_km]
+        ranked = sorted(within) if k is None else heapq.nsmallest(k, within)
+        return [(i, distance) for distance, i in ranked[offset:]]
+
+    coords = np.asarray(points, dtype=np.float64)
+    distances = haversine_km_many(lat, lng, coords[:, 0], coords[:, 1])
+    idx = np.flatnonzero(distances <= radius_km)
+    if k is not None and k < idx.size:
+        idx = idx[np.argpartition(distances[idx], k - 1)[:k]]
+    idx = idx[np.lexsort((idx, distances[idx]))][offset:]
+    return [(int(i), float(distances[i])) for i in idx]
@@ -0,0 +1,259 @@
+"""
+Background jobs backed by the ``Job`` table.
+
+Work that need not block a request (rating and stats rebuilds, rollups,
+barber assignment) is registered as a job handler with ``@register`` and
+queued with ``enqueue(name, payload)``. The job is a row inserted in the
+caller's transaction, so a view or signal handler that rolls back never
+leaves a job behind. Handlers take the payload as keyword arguments and
+run in a transaction of their own.
+
+The ``run_jobs`` management command runs a ``Worker``, which claims due
+jobs in batches and runs them on a thread pool. A claim is one statement
+that marks the rows running under a fresh token: ``SELECT ... FOR UPDATE
+SKIP LOCKED`` picks the rows where the database supports it (PostgreSQL,
+MySQL 8); elsewhere ``UPDATE ... WHERE id IN (SELECT ... LIMIT n) AND
+status = 'queued'``, which SQLite runs atomically since it has a single
+writer. Workers therefore never run the same job twice, however many run.
+
+A job that raises is retried with exponential backoff until it has been
+attempted ``max_attempts`` times, then marked failed with its traceback.
+While ``Worker.run`` is running, a heartbeat thread refreshes
+``claimed_at`` on its claims every ``HEARTBEAT_INTERVAL``; claims not
+refreshed for ``CLAIM_TIMEOUT`` belong to a worker that died and are
+requeued (or failed, if out of attempts). A job can therefore run again
+while it is still running only if its worker's heartbeat cannot write for
+that long, so handlers should be safe to repeat.
+"""
+import logging
+import random
+import threading
+import time
+import traceback
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 5
+# Retry delays: 10s, 20s, 40s, ... up to an hour, each with up to half taken off at random
+BACKOFF_BASE = 10
+BACKOFF_MAX = 3600
+CLAIM_TIMEOUT = timedelta(minutes=15)
+HEARTBEAT_INTERVAL = 60
+REQUEUE_INTERVAL = 60
+MAX_ERROR_LENGTH = 4000
+
+REGISTRY = {}
+
+
+def register(name):
+    """Decorator registering a function as the handler for jobs called ``name``"""
+    def decorator(func):
+        REGISTRY[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, delay=0, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Queue a job to run ``delay`` seconds from now; ``payload`` must be JSON-serializable"""
+    if name not in REGISTRY:
+        raise ValueError(f'Unknown job {name!r}')
+    return Job.objects.create(
+        name=name, payload=payload or {}, max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def enqueue_once(name, payload=None, **options):
+    """``enqueue`` unless the same job is already waiting to run; returns the queued job"""
+    queued = Job.objects.filter(name=name, status='queued', payload=payload or {}).first()
+    return queued or enqueue(name, payload, **options)
+
+
+def backoff(attempts):
+    """Seconds to wait before retrying a job that has failed ``attempts`` times"""
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    # Jitter, so jobs that failed together do not all retry together
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+# ============ CLAIMS ============
+
+def claim_jobs(limit):
+    """Mark up to ``limit`` due jobs running under a new claim token; returns them in claim order"""
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    due = Job.objects.filter(status='queued', run_at__lte=now).order_by('run_at', 'id')
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            claimed = Job.objects.filter(
+                pk__in=list(due.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit])
+            )
+        else:
+            # Re-checking the status keeps a row another worker claimed meanwhile out of this claim
+            claimed = Job.objects.filter(pk__in=due.values('pk')[:limit], status='queued')
+        count = claimed.update(status='running', claimed_by=token, claimed_at=now, attempts=F('attempts') + 1)
+    if not count:
+        return []
+    return list(Job.objects.filter(status='running', claimed_by=token).order_by('run_at', 'id'))
+
+
+def requeue_stale(timeout=CLAIM_TIMEOUT):
+    """Requeue jobs whose worker stopped before finishing them; returns how many were found"""
+    stale = Job.objects.filter(status='running', claimed_at__lt=timezone.now() - timeout)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', finished_at=timezone.now(), last_error='Worker stopped before finishing the job',
+    )
+    return failed + stale.update(status='queued', claimed_by='', claimed_at=None)
+
+
+# ============ RUNNING ============
+
+def _finish(job, **fields):
+    # Only while the claim holds; a job requeued as stale may be running elsewhere
+    Job.objects.filter(pk=job.pk, status='running', claimed_by=job.claimed_by).update(**fields)
+    return fields['status']
+
+
+def run_job(job):
+    """Run one claimed job and record the outcome; returns its new status"""
+    handler = REGISTRY.get(job.name)
+    if handler is None:
+        return _finish(job, status='failed', finished_at=timezone.now(),
+                       last_error=f'No handler registered for job {job.name!r}')
+    try:
+        with transaction.atomic():
+            handler(**job.payload)
+    except Exception:
+        logger.exception('Job #%s %s failed (attempt %s of %s)', job.pk, job.name, job.attempts, job.max_attempts)
+        error = traceback.format_exc()[-MAX_ERROR_LENGTH:]
+        if job.attempts < job.max_attempts:
+            return _finish(job, status='queued', claimed_by='', claimed_at=None, last_error=error,
+                           run_at=timezone.now() + timedelta(seconds=backoff(job.attempts)))
+        return _finish(job, status='failed', finished_at=timezone.now(), last_error=error)
+    return _finish(job, status='succeeded', finished_at=timezone.now(), last_error='')
+
+
+class Worker:
+    """Claims due jobs in batches and runs them, keeping throughput counters"""
+
+    def __init__(self, threads=1, batch_size=None):
+        self.threads = threads
+        self.batch_size = batch_size or threads * 4
+        # Outcomes by status: succeeded, queued (to be retried), failed
+        self.counts = Counter()
+        self.busy = 0.0
+        self.started = time.monotonic()
+        self._requeued_at = None
+        # Tokens of the claims being run, for the heartbeat
+        self._claims = set()
+        self._stopped = threading.Event()
+        self._pool = ThreadPoolExecutor(threads, thread_name_prefix='job') if threads > 1 else None
+
+    def _run_pooled(self, job):
+        # Pool threads keep their connections between jobs; drop broken ones
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
+        return run_job(job)
+
+    def _close_connection(self, barrier):
+        # Every thread waits at the barrier, so each one closes its own connection
+        barrier.wait()
+        connection.close()
+
+    def run_batch(self):
+        """Claim and run one batch; returns how many jobs ran"""
+        # Stale claims are rare and cost two writes to look for; once a minute is plenty
+        if self._requeued_at is None or time.monotonic() - self._requeued_at >= REQUEUE_INTERVAL:
+            requeue_stale()
+            self._requeued_at = time.monotonic()
+        jobs = claim_jobs(self.batch_size)
+        if not jobs:
+            return 0
+        token = jobs[0].claimed_by
+        self._claims.add(token)
+        started = time.monotonic()
+        try:
+            results = self._pool.map(self._run_pooled, jobs) if self._pool else map(run_job, jobs)
+            self.counts.update(results)
+        finally:
+            self._claims.discard(token)
+        self.busy += time.monotonic() - started
+        return len(jobs)
+
+    def heartbeat(self):
+        """Mark this worker's claims as still alive; returns how many jobs were touched"""
+        tokens = list(self._claims)
+        if not tokens:
+            return 0
+        return Job.objects.filter(status='running', claimed_by__in=tokens).update(claimed_at=timezone.now())
+
+    def _beat(self):
+        try:
+            while not self._stopped.wait(HEARTBEAT_INTERVAL):
+                try:
+                    self.heartbeat()
+                except DatabaseError:
+                    # Try again next beat; CLAIM_TIMEOUT allows for several misses
+                    logger.exception('Job heartbeat failed')
+        finally:
+            connection.close()
+
+    def run(self, once=False, poll_interval=1.0, report=None, report_interval=60.0):
+        """
+        Run batches until interrupted, sleeping ``poll_interval`` seconds
+        when nothing is due; with ``once``, stop when nothing is due.
+        ``report`` is called with ``stats()`` every ``report_interval``
+        seconds.
+        """
+        reported = time.monotonic()
+        self._stopped.clear()
+        heartbeat = threading.Thread(target=self._beat, name='job-heartbeat', daemon=True)
+        heartbeat.start()
+        try:
+            while True:
+                if not self.run_batch():
+                    if once:
+                        return
+                    time.sleep(poll_interval)
+                if report and time.monotonic() - reported >= report_interval:
+                    report(self.stats())
+                    reported = time.monotonic()
+        finally:
+            self._stopped.set()
+            heartbeat.join()
+
+    def shutdown(self):
+        if self._pool:
+            barrier = threading.Barrier(self.threads)
+            for _ in range(self.threads):
+                self._pool.submit(self._close_connection, barrier)
+            self._pool.shutdown()
+
+    def stats(self):
+        ran = sum(self.counts.values())
+        elapsed = time.monotonic() - self.started
+        return {
+            'ran': ran,
+            'succeeded': self.counts['succeeded'],
+            'retried': self.counts['queued'],
+            'failed': self.counts['failed'],
+            'elapsed': elapsed,
+            'jobs_per_second': ran / self.busy if self.busy else 0.0,
+            'queued': Job.objects.filter(status='queued').count(),
+        }
+
+
+def format_stats(stats):
+    return (f"{stats['ran']} job(s) in {stats['elapsed']:.2f}s ({stats['jobs_per_second']:.1f} jobs/s while busy): "
+            f"{stats['succeeded']} succeeded, {stats['retried']} to retry, {stats['failed']} failed; "
+            f"{stats['queued']} queued")
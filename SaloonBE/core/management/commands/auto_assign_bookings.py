@@ -0,0 +1,49 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.jobs import enqueue
+from core.scheduling import auto_assign, salons_with_pending
+
+
+class Command(BaseCommand):
+    help = ('Assign pending unassigned bookings to available barbers, balancing their load '
+            '(run it periodically, e.g. from cron)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--salon', type=int, action='append', dest='salons',
+                            help='Limit to this salon id (can be repeated)')
+        parser.add_argument('--date', help='Booking date, YYYY-MM-DD (default: today)')
+        parser.add_argument('--enqueue', action='store_true',
+                            help='Queue one job per salon for the run_jobs worker instead of assigning here')
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                day = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--date must be in YYYY-MM-DD format')
+        else:
+            day = timezone.localdate()
+
+        if options['enqueue']:
+            salon_ids = options['salons'] or salons_with_pending(day)
+            for salon_id in salon_ids:
+                enqueue('bookings.auto_assign', {'salon_id': salon_id, 'date_iso': day.isoformat()})
+            self.stdout.write(self.style.SUCCESS(f'Queued assignment of {day} for {len(salon_ids)} salon(s)'))
+            return
+
+        started = time.perf_counter()
+        total_assigned = total_pending = 0
+        for salon_id in options['salons'] or salons_with_pending(day):
+            assigned, pending = auto_assign(salon_id, day)
+            total_assigned += assigned
+            total_pending += pending
+            self.stdout.write(f'Salon {salon_id}: assigned {assigned}, still pending {pending}')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Assigned {total_assigned} booking(s) on {day} in {elapsed:.2f}s; {total_pending} still pending'
+        ))
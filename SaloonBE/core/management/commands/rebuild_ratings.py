@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.ratings import rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = 'Recompute salon and barber ratings and review counts from the review table'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            salons, barbers = rebuild_ratings()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt ratings for {salons} salon(s) and {barbers} barber(s)'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.rollups import reset_rollups
+from core.stats import rebuild_salon_stats, verify_salon_stats
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the incrementally maintained SalonStats counters and daily rollups, '
+            'or verify the counters with --verify')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--salon', type=int, action='append', dest='salons',
+                            help='Limit to this salon id (can be repeated)')
+        parser.add_argument('--verify', action='store_true',
+                            help='Only compare stored counters with a fresh aggregate; fail on drift')
+
+    def handle(self, *args, **options):
+        salon_ids = options['salons']
+
+        if options['verify']:
+            drift = verify_salon_stats(salon_ids)
+            for salon_id, fields in sorted(drift.items()):
+                details = ', '.join(f'{name}: stored={stored} expected={expected}'
+                                    for name, (stored, expected) in fields.items())
+                self.stdout.write(self.style.WARNING(f'Salon {salon_id}: {details}'))
+            if drift:
+                raise CommandError(f'{len(drift)} salon(s) have drifted stats; run without --verify to fix')
+            self.stdout.write(self.style.SUCCESS('All salon stats are consistent'))
+            return
+
+        count = rebuild_salon_stats(salon_ids)
+        # Rolled up again on the next time-series read
+        reset_rollups(salon_ids)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {count} salon(s)'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.search import SALON_INDEX, SERVICE_INDEX, fts_enabled
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search indexes for salons and services'
+
+    def handle(self, *args, **options):
+        if not fts_enabled():
+            self.stdout.write(self.style.WARNING('Full-text search needs SQLite FTS5; nothing to do.'))
+            return
+        for index in (SALON_INDEX, SERVICE_INDEX):
+            count = index.rebuild()
+            self.stdout.write(self.style.SUCCESS(f'Indexed {count} rows into {index.table}'))
@@ -0,0 +1,38 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Run the event relay that fans booking events out to every worker process (see core/events.py)'
+
+    def add_arguments(self, parser):
+        host, port = settings.EVENT_RELAY_ADDRESS
+        parser.add_argument('--host', default=host)
+        parser.add_argument('--port', type=int, default=port)
+
+    def handle(self, *args, **options):
+        asyncio.run(self.serve(options['host'], options['port']))
+
+    async def serve(self, host, port):
+        workers = set()
+
+        async def handle_worker(reader, writer):
+            workers.add(writer)
+            try:
+                # One JSON event per line, echoed to every worker including the sender
+                while line := await reader.readline():
+                    for worker in list(workers):
+                        try:
+                            worker.write(line)
+                        except (ConnectionError, RuntimeError):
+                            workers.discard(worker)
+            finally:
+                workers.discard(writer)
+                writer.close()
+
+        server = await asyncio.start_server(handle_worker, host, port)
+        self.stdout.write(self.style.SUCCESS(f'Event relay listening on {host}:{port}'))
+        async with server:
+            await server.serve_forever()
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.jobs import Worker, format_stats
+
+
+class Command(BaseCommand):
+    help = ('Run queued background jobs (see core/jobs.py); several workers can run at once, '
+            'each job runs in exactly one of them')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=1, help='Jobs to run in parallel (default: 1)')
+        parser.add_argument('--batch-size', type=int, help='Jobs claimed at a time (default: 4 per thread)')
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due instead of polling')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait when no job is due (default: 1)')
+        parser.add_argument('--report-interval', type=float, default=60.0,
+                            help='Seconds between throughput reports (default: 60)')
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1:
+            raise CommandError('--threads must be at least 1')
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        worker = Worker(threads=options['threads'], batch_size=options['batch_size'])
+        try:
+            worker.run(
+                once=options['once'], poll_interval=options['poll_interval'],
+                report=lambda stats: self.stdout.write(format_stats(stats)),
+                report_interval=options['report_interval'],
+            )
+        except KeyboardInterrupt:
+            self.stdout.write('Interrupted; jobs cut short are requeued once their claim times out')
+        finally:
+            worker.shutdown()
+        self.stdout.write(self.style.SUCCESS(format_stats(worker.stats())))
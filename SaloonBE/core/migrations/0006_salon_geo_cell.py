@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:22
+
+from django.db import migrations, models
+
+from core.geo import grid_cell
+
+
+def populate_geo_cells(apps, schema_editor):
+    Salon = apps.get_model('core', 'Salon')
+    salons = list(Salon.objects.only('id', 'latitude', 'longitude'))
+    for salon in salons:
+        salon.geo_cell = grid_cell(salon.latitude, salon.longitude)
+    Salon.objects.bulk_update(salons, ['geo_cell'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_alter_service_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salon',
+            name='geo_cell',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, help_text='Spatial grid cell derived from latitude/longitude', null=True),
+        ),
+        migrations.RunPython(populate_geo_cells, migrations.RunPython.noop),
+    ]
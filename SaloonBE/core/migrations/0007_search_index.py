@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:24
+
+from django.db import migrations
+
+
+def create_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS core_salon_fts USING fts5("
+        "name, address, description, services, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS core_service_fts USING fts5("
+        "name, description, salon_name, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO core_salon_fts (rowid, name, address, description, services) "
+        "SELECT s.id, s.name, s.address, s.description, "
+        "COALESCE((SELECT group_concat(sv.name, ' ') FROM core_service sv "
+        "WHERE sv.salon_id = s.id AND sv.is_active), '') "
+        "FROM core_salon s"
+    )
+    schema_editor.execute(
+        "INSERT INTO core_service_fts (rowid, name, description, salon_name) "
+        "SELECT sv.id, sv.name, sv.description, sl.name "
+        "FROM core_service sv JOIN core_salon sl ON sl.id = sv.salon_id"
+    )
+
+
+def drop_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS core_salon_fts")
+    schema_editor.execute("DROP TABLE IF EXISTS core_service_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_salon_geo_cell'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['-booking_date', '-booking_time', '-id'], name='booking_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['salon', '-booking_date', '-booking_time', '-id'], name='booking_salon_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['customer', '-booking_date', '-booking_time', '-id'], name='booking_customer_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['-payment_date', '-id'], name='payment_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-created_at', '-id'], name='review_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['salon', '-created_at', '-id'], name='review_salon_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salon',
+            index=models.Index(fields=['-created_at', '-id'], name='salon_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salon',
+            index=models.Index(fields=['owner', '-created_at', '-id'], name='salon_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['salon', '-created_at', '-id'], name='service_salon_created_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:32
+
+import datetime
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SLOT_INTERVAL = 30
+
+
+def backfill_claims(apps, schema_editor):
+    """Give upcoming active bookings their claims; legacy overbooking is kept as-is"""
+    Booking = apps.get_model('core', 'Booking')
+    SlotClaim = apps.get_model('core', 'SlotClaim')
+    seats = defaultdict(set)
+    barber_cells = set()
+    claims = []
+    bookings = (
+        Booking.objects.filter(
+            status__in=['pending', 'confirmed', 'in_progress'],
+            booking_date__gte=datetime.date.today(),
+        )
+        .order_by('booking_date', 'booking_time', 'id')
+        .values_list('id', 'salon_id', 'barber_id', 'booking_date', 'booking_time', 'service__duration')
+    )
+    for pk, salon_id, barber_id, day, time, duration in bookings:
+        start = time.hour * 60 + time.minute
+        for cell in range(start - start % SLOT_INTERVAL, start + duration, SLOT_INTERVAL):
+            taken = seats[(salon_id, day, cell)]
+            seat = next(s for s in range(len(taken) + 1) if s not in taken)
+            taken.add(seat)
+            barber = barber_id if (barber_id, day, cell) not in barber_cells else None
+            barber_cells.add((barber, day, cell))
+            claims.append(SlotClaim(
+                booking_id=pk, salon_id=salon_id, barber_id=barber,
+                booking_date=day, cell=cell, seat=seat,
+            ))
+    SlotClaim.objects.bulk_create(claims, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_salonstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotClaim',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('booking_date', models.DateField()),
+                ('cell', models.IntegerField(help_text='Cell start in minutes from midnight')),
+                ('seat', models.IntegerField(help_text='Capacity seat within the salon for this cell')),
+                ('barber', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='slot_claims', to='core.barber')),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_claims', to='core.booking')),
+                ('salon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_claims', to='core.salon')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('salon', 'booking_date', 'cell', 'seat'), name='unique_salon_seat'), models.UniqueConstraint(fields=('barber', 'booking_date', 'cell'), name='unique_barber_cell')],
+            },
+        ),
+        migrations.RunPython(backfill_claims, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:41
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_ratings(apps, schema_editor):
+    Review = apps.get_model('core', 'Review')
+    for model_name, group_by in (('Salon', 'salon_id'), ('Barber', 'barber_id')):
+        Model = apps.get_model('core', model_name)
+        totals = {
+            row[group_by]: (row['rating_sum'], row['total_reviews'])
+            for row in Review.objects.filter(**{f'{group_by}__isnull': False}).order_by().values(group_by).annotate(
+                rating_sum=Sum('rating'), total_reviews=Count('id'),
+            )
+        }
+        objs = []
+        for pk in Model.objects.values_list('pk', flat=True):
+            rating_sum, count = totals.get(pk, (0, 0))
+            rating = (Decimal(rating_sum) / count).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) if count else Decimal('0.00')
+            objs.append(Model(pk=pk, rating_sum=rating_sum, total_reviews=count, rating=rating))
+        Model.objects.bulk_update(objs, ['rating_sum', 'total_reviews', 'rating'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_slotclaim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='barber',
+            name='rating_sum',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='barber',
+            name='total_reviews',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='salon',
+            name='rating_sum',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='barber',
+            index=models.Index(fields=['salon', '-rating', '-id'], name='barber_salon_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salon',
+            index=models.Index(fields=['-rating', '-id'], name='salon_rating_idx'),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_ratings'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['salon', 'status', 'barber'], name='booking_salon_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('barber__isnull', True), ('status', 'pending')), fields=['salon', 'booking_date', 'booking_time'], name='booking_unassigned_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_booking_status_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salonstats',
+            name='rolled_up_through',
+            field=models.DateField(blank=True, help_text='Last booking date in DailySalonStats', null=True),
+        ),
+        migrations.CreateModel(
+            name='DailySalonStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('bookings', models.IntegerField(default=0)),
+                ('completed_bookings', models.IntegerField(default=0)),
+                ('cancelled_bookings', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('salon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='core.salon')),
+            ],
+            options={
+                'verbose_name_plural': 'daily salon stats',
+                'constraints': [models.UniqueConstraint(fields=('salon', 'date'), name='unique_salon_day')],
+            },
+        ),
+    ]
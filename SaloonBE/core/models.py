@@ -1,5 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
+
+from .geo import grid_cell
 
 # Custom User Model
 class User(AbstractUser):
@@ -14,12 +17,63 @@ class User(AbstractUser):
     profile_picture = models.ImageField(upload_to='profiles/', null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     profile_picture = models.URLField(max_length=500, blank=True, null=True)
+    # Bumped with F() updates when the claims in issued tokens go stale (core/authentication.py)
+    token_version = models.PositiveIntegerField(default=0, editable=False)
+    
+    # Fields whose changes make issued tokens stale
+    TOKEN_FIELDS = ('user_type', 'is_active', 'password')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_token_state()
+        return instance
     
+    def remember_token_state(self, fields=TOKEN_FIELDS):
+        """Snapshot the loaded TOKEN_FIELDS as last persisted"""
+        state = getattr(self, '_persisted_token_state', {})
+        deferred = self.get_deferred_fields()
+        state.update({f: getattr(self, f) for f in fields if f not in deferred})
+        self._persisted_token_state = state
+    
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # Users built from token claims load the rest of their row in one query
+        if fields is not None and getattr(self, 'claims', None) is not None:
+            fields = set(fields) | self.get_deferred_fields()
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self.remember_token_state([f for f in self.TOKEN_FIELDS if fields is None or f in fields])
+    
+    def save(self, *args, **kwargs):
+        # A stale instance must not write an old token_version back
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != 'token_version' and f.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.username} ({self.user_type})"
 
 
+# Maintained with F() updates by core.ratings
+RATING_FIELDS = ('rating', 'total_reviews', 'rating_sum')
+
+# Maintained with bulk_update by core.queues
+QUEUE_FIELDS = ('queue_position', 'estimated_wait_time')
+
+
+def preserve_fields(instance, save_kwargs, fields):
+    """Leave fields maintained elsewhere out of full saves so a stale instance cannot overwrite them"""
+    if instance._state.adding or save_kwargs.get('update_fields') is not None:
+        return
+    save_kwargs['update_fields'] = [
+        f.name for f in instance._meta.concrete_fields
+        if not f.primary_key and f.name not in fields
+    ]
+
+
 # Salon Model
 class Salon(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='salons')
@@ -33,12 +87,38 @@ class Salon(models.Model):
     closing_time = models.TimeField()
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.0)
     total_reviews = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0, editable=False)
     image = models.ImageField(upload_to='salons/', null=True, blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     cover_image = models.URLField(max_length=500, blank=True, null=True)
     gallery_images = models.JSONField(default=list, blank=True)  # List of image URLs
+    geo_cell = models.IntegerField(null=True, blank=True, editable=False, db_index=True,
+                                   help_text="Spatial grid cell derived from latitude/longitude")
    
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='salon_created_idx'),
+            models.Index(fields=['owner', '-created_at', '-id'], name='salon_owner_created_idx'),
+            models.Index(fields=['-rating', '-id'], name='salon_rating_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'owner_id' not in instance.get_deferred_fields():
+            instance._persisted_owner_id = instance.owner_id
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # Keep the spatial grid cell in step with the coordinates
+        if self.latitude is not None and self.longitude is not None:
+            self.geo_cell = grid_cell(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geo_cell'}
+        preserve_fields(self, kwargs, RATING_FIELDS)
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return self.name
@@ -58,6 +138,16 @@ class Service(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['salon', '-created_at', '-id'], name='service_salon_created_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'salon_id' not in instance.get_deferred_fields():
+            instance._persisted_salon_id = instance.salon_id
+        return instance
         
     def __str__(self):
         return f"{self.name} - {self.salon.name}"
@@ -70,9 +160,23 @@ class Barber(models.Model):
     specialization = models.CharField(max_length=200, blank=True)
     experience_years = models.IntegerField(default=0)
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.0)
+    total_reviews = models.IntegerField(default=0, editable=False)
+    rating_sum = models.IntegerField(default=0, editable=False)
     is_available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['salon', '-rating', '-id'], name='barber_salon_rating_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'salon_id' not in instance.get_deferred_fields():
+            instance._persisted_salon_id = instance.salon_id
+        return instance
+    
     def save(self, *args, **kwargs):
         # Ensure barber can only be assigned to one salon
         if self.salon:
@@ -80,6 +184,7 @@ class Barber(models.Model):
             existing = Barber.objects.filter(user=self.user).exclude(pk=self.pk).first()
             if existing and existing.salon and existing.salon != self.salon:
                 raise ValueError("Barber can only be assigned to one salon at a time")
+        preserve_fields(self, kwargs, RATING_FIELDS)
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -96,6 +201,15 @@ class Booking(models.Model):
         ('cancelled', 'Cancelled'),
     )
     
+    # Status changes allowed from each status
+    VALID_TRANSITIONS = {
+        'pending': ['confirmed', 'cancelled'],
+        'confirmed': ['in_progress', 'cancelled'],
+        'in_progress': ['completed'],
+        'completed': [],
+        'cancelled': [],
+    }
+    
     customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookings')
     salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='bookings')
     barber = models.ForeignKey(Barber, on_delete=models.SET_NULL, null=True, related_name='bookings')
@@ -111,6 +225,40 @@ class Booking(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination order for BookingViewSet, overall and per scope
+            models.Index(fields=['-booking_date', '-booking_time', '-id'], name='booking_date_time_idx'),
+            models.Index(fields=['salon', '-booking_date', '-booking_time', '-id'], name='booking_salon_date_idx'),
+            models.Index(fields=['customer', '-booking_date', '-booking_time', '-id'], name='booking_customer_date_idx'),
+            # Per-salon status counters (SalonStats rebuilds, revenue refresh)
+            models.Index(fields=['salon', 'status', 'barber'], name='booking_salon_status_idx'),
+            # Unassigned requests waiting for a barber, oldest slot first
+            models.Index(
+                fields=['salon', 'booking_date', 'booking_time'], name='booking_unassigned_idx',
+                condition=models.Q(status='pending', barber__isnull=True),
+            ),
+        ]
+    
+    # Fields whose previous values are needed to maintain derived data
+    # (SalonStats counters, availability cache)
+    TRACKED_FIELDS = ('salon_id', 'status', 'barber_id', 'service_id', 'booking_date')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_state()
+        return instance
+    
+    def remember_state(self):
+        """Snapshot tracked fields as last persisted (None if any are deferred)"""
+        if self.get_deferred_fields() & set(self.TRACKED_FIELDS):
+            self._persisted_state = None
+        else:
+            self._persisted_state = {f: getattr(self, f) for f in self.TRACKED_FIELDS}
+    
+    def save(self, *args, **kwargs):
+        preserve_fields(self, kwargs, QUEUE_FIELDS)
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return f"Booking #{self.id} - {self.customer.username} at {self.salon.name}"
@@ -139,6 +287,11 @@ class Payment(models.Model):
     transaction_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
     payment_date = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['-payment_date', '-id'], name='payment_date_idx'),
+        ]
+    
     def __str__(self):
         return f"Payment for Booking #{self.booking.id} - {self.amount}"
 
@@ -153,6 +306,28 @@ class Review(models.Model):
     comment = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='review_created_idx'),
+            models.Index(fields=['salon', '-created_at', '-id'], name='review_salon_created_idx'),
+        ]
+    
+    # Fields whose changes move salon and barber ratings (see core.ratings)
+    TRACKED_FIELDS = ('salon_id', 'barber_id', 'rating')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_state()
+        return instance
+    
+    def remember_state(self):
+        """Snapshot tracked fields as last persisted (None if any are deferred)"""
+        if self.get_deferred_fields() & set(self.TRACKED_FIELDS):
+            self._persisted_state = None
+        else:
+            self._persisted_state = {f: getattr(self, f) for f in self.TRACKED_FIELDS}
+    
     def __str__(self):
         return f"Review by {self.customer.username} for {self.salon.name}"
 
@@ -181,4 +356,94 @@ class BarberJoinRequest(models.Model):
         ordering = ['-created_at']
     
     def __str__(self):
-        return f"{self.barber.username} -> {self.salon.name} ({self.status})"
\ No newline at end of file
+        return f"{self.barber.username} -> {self.salon.name} ({self.status})"
+
+
+class SlotClaim(models.Model):
+    """A booking's hold on one availability grid cell (see core/reservations.py)"""
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='slot_claims')
+    salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='slot_claims')
+    barber = models.ForeignKey(Barber, on_delete=models.SET_NULL, null=True, blank=True, related_name='slot_claims')
+    booking_date = models.DateField()
+    cell = models.IntegerField(help_text="Cell start in minutes from midnight")
+    seat = models.IntegerField(help_text="Capacity seat within the salon for this cell")
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['salon', 'booking_date', 'cell', 'seat'], name='unique_salon_seat'),
+            models.UniqueConstraint(fields=['barber', 'booking_date', 'cell'], name='unique_barber_cell'),
+        ]
+    
+    def __str__(self):
+        return f"Booking #{self.booking_id} holds {self.booking_date} {self.cell // 60:02d}:{self.cell % 60:02d}"
+
+
+class SalonStats(models.Model):
+    """Booking counters per salon, maintained incrementally (see core/stats.py)"""
+    salon = models.OneToOneField(Salon, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    confirmed_bookings = models.IntegerField(default=0)
+    completed_bookings = models.IntegerField(default=0)
+    pending_bookings = models.IntegerField(default=0)
+    cancelled_bookings = models.IntegerField(default=0)
+    total_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total_barbers = models.IntegerField(default=0)
+    rolled_up_through = models.DateField(null=True, blank=True, help_text="Last booking date in DailySalonStats")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = 'salon stats'
+    
+    def __str__(self):
+        return f"Stats for {self.salon_id}"
+
+
+class DailySalonStats(models.Model):
+    """Booking totals per salon and booking date, rolled up once the day is over (see core/rollups.py)"""
+    salon = models.ForeignKey(Salon, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    bookings = models.IntegerField(default=0)
+    completed_bookings = models.IntegerField(default=0)
+    cancelled_bookings = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    class Meta:
+        verbose_name_plural = 'daily salon stats'
+        constraints = [
+            models.UniqueConstraint(fields=['salon', 'date'], name='unique_salon_day'),
+        ]
+    
+    def __str__(self):
+        return f"Stats for {self.salon_id} on {self.date}"
+
+
+class Job(models.Model):
+    """A unit of background work, run by the ``run_jobs`` worker (see core/jobs.py)"""
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    )
+    
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=32, blank=True, help_text="Token of the claim running the job")
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            # Due jobs in claim order
+            models.Index(fields=['run_at', 'id'], name='job_queued_idx', condition=models.Q(status='queued')),
+            # Claims to finish or requeue
+            models.Index(fields=['claimed_by'], name='job_running_idx', condition=models.Q(status='running')),
+        ]
+    
+    def __str__(self):
+        return f"Job #{self.pk} {self.name} ({self.status})"
@@ -0,0 +1,190 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+Unlike DRF's ``CursorPagination``, which stores only the first ordering
+field plus an offset, the cursor here holds the values of *every* ordering
+field of the boundary row. The next page is selected with a lexicographic
+``WHERE (a, b, id) < (x, y, z)`` comparison, so with a matching composite
+index every page costs the same as the first one.
+
+Pagination is opt-in: existing app clients expect plain lists, so a list
+endpoint only paginates when the request carries ``page_size`` or
+``cursor``.
+
+Search results keep their relevance order: when ``FullTextSearchFilter``
+has ranked the queryset and no explicit ``?ordering=`` is given, pages are
+keyed on the ``search_rank`` annotation, with ``id`` breaking ties.
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    # Must end in a unique field so every row has a distinct key
+    ordering = ('-created_at', '-id')
+    rank_ordering = ('search_rank', 'id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.fields = self.get_ordering(request, queryset, view)
+
+        cursor = self.decode_cursor(request, queryset)
+        self.has_cursor = cursor is not None
+        reverse = bool(cursor and cursor['reverse'])
+        ordering = [self._flip(f) for f in self.fields] if reverse else list(self.fields)
+
+        if cursor is not None:
+            queryset = queryset.filter(self._after(ordering, cursor['values']))
+        rows = list(queryset.order_by(*ordering)[:self.page_size + 1])
+
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.has_cursor
+
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        """Use an explicit ?ordering= from OrderingFilter, else search rank, else the class default"""
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        if not ordering:
+            if self.rank_ordering[0] in queryset.query.annotations:
+                return tuple(self.rank_ordering)
+            return tuple(self.ordering)
+        ordering = tuple(ordering)
+        if ordering[-1].lstrip('-') not in ('id', 'pk'):
+            ordering += ('-id',)
+        return ordering
+
+    # ---- cursor encoding ----
+
+    def encode_cursor(self, row, reverse):
+        values = [self._key(row, field) for field in self.fields]
+        payload = {'o': list(self.fields), 'v': values, 'r': reverse}
+        raw = json.dumps(payload, separators=(',', ':'), default=str).encode()
+        token = urlsafe_b64encode(raw).decode().rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, queryset):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            if payload['o'] != list(self.fields) or len(payload['v']) != len(self.fields):
+                raise ValueError
+            values = [
+                self._field(queryset, field).to_python(value)
+                for field, value in zip(self.fields, payload['v'])
+            ]
+            return {'values': values, 'reverse': bool(payload.get('r'))}
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    # ---- helpers ----
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def _field(queryset, field):
+        name = field.lstrip('-')
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        meta = queryset.model._meta
+        return meta.pk if name == 'pk' else meta.get_field(name)
+
+    @staticmethod
+    def _key(row, field):
+        name = field.lstrip('-')
+        return getattr(row, 'pk' if name in ('id', 'pk') else name)
+
+    @staticmethod
+    def _after(ordering, values):
+        """Rows strictly after ``values`` in ``ordering`` (row-value comparison)"""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        # Redundant bound on the leading column gives the index a range to seek
+        first = ordering[0]
+        bound = 'lte' if first.startswith('-') else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{bound}': values[0]}) & condition
+
+    # ---- response ----
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class BookingPagination(KeysetPagination):
+    ordering = ('-booking_date', '-booking_time', '-id')
+
+
+class PaymentPagination(KeysetPagination):
+    ordering = ('-payment_date', '-id')
@@ -0,0 +1,55 @@
+"""
+Per-endpoint SQL query budgets.
+
+Viewsets declare how many queries each action may run via
+``query_budgets``. Every request is counted with a connection execute
+wrapper; going over budget logs a warning, or raises
+``QueryBudgetExceeded`` when ``settings.QUERY_BUDGET_ENFORCE`` is on (the
+test suite enables it), so an N+1 regression fails loudly.
+"""
+import logging
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    """``execute_wrapper`` callable that records the SQL it sees"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+
+class QueryBudgetMixin:
+    # action name -> maximum number of queries, including authentication
+    query_budgets = {}
+
+    def dispatch(self, request, *args, **kwargs):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = super().dispatch(request, *args, **kwargs)
+
+        budget = self.query_budgets.get(getattr(self, 'action', None))
+        if budget is not None and counter.count > budget:
+            message = (
+                f'{type(self).__name__}.{self.action} ran {counter.count} queries '
+                f'(budget {budget}): ' + '; '.join(counter.queries)
+            )
+            if getattr(settings, 'QUERY_BUDGET_ENFORCE', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,347 @@
+"""
+Live walk-in queue.
+
+Today's active bookings at a salon (pending, confirmed, in progress) wait
+in one lane per barber, plus a lane for bookings no barber has taken yet.
+Within a lane the bookings in the chair come first and the rest follow by
+booking time. ``queue_position`` is 0 in the chair and counts up from 1
+for the bookings waiting; ``estimated_wait_time`` is the minutes of service
+(``Service.duration``) ahead in the lane. Every available barber serves
+the unassigned lane, so its work ahead is shared among them.
+
+``QUEUES`` keeps each salon's lanes in memory with an index by booking id,
+so ``lookup`` is a dict access plus one cache read. A salon is loaded from
+the database the first time it is needed each day. Once a booking change
+commits, ``bookings_changed`` moves its entry, recomputes its lanes
+from the point that changed and writes only the rows whose position or
+estimate moved, with one ``bulk_update``.
+
+Every change increments the salon's counter in the default cache. A
+process whose copy is exactly one change behind patches it; any other
+copy (another worker changed the queue, or it is a new day) is reloaded
+instead. Barber, service and salon edits call ``invalidate``, and the
+next access reloads the salon.
+
+Each salon has its own lock, held while its lanes are read, patched or
+loaded, so a slow load of one salon never holds up another. A short
+engine-wide lock only guards the dicts of salons, locks and the booking
+index, and is never held across a database query.
+"""
+import random
+import threading
+from bisect import insort
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import QUEUE_FIELDS, Barber, Booking, Service
+
+QUEUE_STATUSES = ('pending', 'confirmed', 'in_progress')
+
+
+def in_queue(state):
+    """Whether a booking (a dict of ``Booking.TRACKED_FIELDS``) is in today's queue"""
+    return state['status'] in QUEUE_STATUSES and state['booking_date'] == timezone.localdate()
+
+
+def entry_data(entry):
+    return {
+        'booking_id': entry.booking_id,
+        'barber_id': entry.barber_id,
+        'status': entry.status,
+        'booking_time': entry.booking_time.strftime('%H:%M'),
+        'queue_position': entry.position,
+        'estimated_wait_time': entry.wait,
+    }
+
+
+def _version_key(salon_id):
+    return f'queue:salon:{salon_id}'
+
+
+def _start_version(key):
+    # Random, so an evicted counter cannot come back at a version some process still holds
+    cache.add(key, random.getrandbits(48), None)
+    return cache.get(key)
+
+
+class QueueEntry:
+    __slots__ = ('booking_id', 'salon_id', 'customer_id', 'barber_id', 'status', 'booking_time',
+                 'duration', 'position', 'wait', 'work_ahead', 'stored')
+
+    def __init__(self, booking_id, salon_id, customer_id, barber_id, status, booking_time, duration,
+                 stored=(None, None)):
+        self.booking_id = booking_id
+        self.salon_id = salon_id
+        self.customer_id = customer_id
+        self.barber_id = barber_id
+        self.status = status
+        self.booking_time = booking_time
+        self.duration = duration
+        self.position = self.wait = None
+        self.work_ahead = 0
+        # (queue_position, estimated_wait_time) as last written to the row
+        self.stored = stored
+
+    @property
+    def key(self):
+        return (self.status != 'in_progress', self.booking_time, self.booking_id)
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+
+class SalonQueue:
+    """One salon's lanes for one day"""
+
+    def __init__(self, salon_id, day, version, barbers, durations):
+        self.salon_id = salon_id
+        self.day = day
+        self.version = version
+        self.barbers = barbers
+        self.durations = durations
+        self.lanes = defaultdict(list)
+        self.entries = {}
+
+    def duration(self, service_id):
+        if service_id not in self.durations:
+            self.durations[service_id] = (
+                Service.objects.filter(pk=service_id).values_list('duration', flat=True).first() or 0
+            )
+        return self.durations[service_id]
+
+    def add(self, entry):
+        lane = self.lanes[entry.barber_id]
+        insort(lane, entry)
+        self.entries[entry.booking_id] = entry
+        return lane.index(entry)
+
+    def remove(self, entry):
+        lane = self.lanes[entry.barber_id]
+        index = lane.index(entry)
+        del lane[index]
+        del self.entries[entry.booking_id]
+        return index
+
+    def recompute(self, barber_id, start=0):
+        """Positions and waits from ``start`` to the end of the lane; returns entries that changed"""
+        lane = self.lanes[barber_id]
+        # Bookings nobody has taken yet go to whichever barber frees up first
+        servers = max(1, self.barbers) if barber_id is None else 1
+        changed = []
+        for i in range(start, len(lane)):
+            entry = lane[i]
+            if i == 0:
+                entry.work_ahead, position = 0, 0
+            else:
+                previous = lane[i - 1]
+                entry.work_ahead = previous.work_ahead + previous.duration
+                position = previous.position
+            entry.position = 0 if entry.status == 'in_progress' else position + 1
+            entry.wait = 0 if entry.status == 'in_progress' else -(-entry.work_ahead // servers)
+            if (entry.position, entry.wait) != entry.stored:
+                changed.append(entry)
+        return changed
+
+
+class QueueEngine:
+    def __init__(self):
+        # Guards the three dicts below; taken after a salon lock, never before
+        self._lock = threading.Lock()
+        self._salons = {}
+        self._salon_locks = {}
+        # booking id -> salon id, for lookups by booking alone
+        self._index = {}
+
+    def clear(self):
+        with self._lock:
+            self._salons.clear()
+            self._index.clear()
+
+    def _salon_lock(self, salon_id):
+        with self._lock:
+            return self._salon_locks.setdefault(salon_id, threading.Lock())
+
+    def _indexed_salon(self, booking_id):
+        with self._lock:
+            return self._index.get(booking_id)
+
+    # ============ READS ============
+
+    def lookup(self, booking_id, salon_id=None):
+        """
+        The booking's ``QueueEntry`` if it is in today's queue, else None.
+        Without ``salon_id``, only salons already in memory are searched.
+        """
+        salon_id = self._indexed_salon(booking_id) or salon_id
+        if salon_id is None:
+            return None
+        with self._salon_lock(salon_id):
+            return self._current(salon_id).entries.get(booking_id)
+
+    def lanes(self, salon_id):
+        """``{barber_id: [QueueEntry, ...]}`` for the salon's non-empty lanes"""
+        with self._salon_lock(salon_id):
+            return {barber_id: list(lane) for barber_id, lane in self._current(salon_id).lanes.items() if lane}
+
+    # ============ CHANGES ============
+
+    def bookings_changed(self, booking_ids):
+        """Move bookings in (or out of) the queue after their changes committed"""
+        rows = {
+            row[0]: row[1:] for row in Booking.objects.filter(pk__in=booking_ids).values_list(
+                'pk', 'salon_id', 'customer_id', 'barber_id', 'status', 'booking_date', 'booking_time',
+                'service_id', *QUEUE_FIELDS,
+            )
+        }
+        for booking_id in booking_ids:
+            row = rows.get(booking_id)
+            old_salon = self._indexed_salon(booking_id)
+            new_salon = row[0] if row else None
+            if old_salon is not None and old_salon != new_salon:
+                self.booking_removed(old_salon, booking_id)
+            if new_salon is not None:
+                with self._salon_lock(new_salon):
+                    self._patch(new_salon, booking_id, row)
+
+    def booking_removed(self, salon_id, booking_id):
+        with self._salon_lock(salon_id):
+            self._patch(salon_id, booking_id, None)
+
+    def invalidate(self, *salon_ids):
+        """Reload these salons on their next access, in every process"""
+        salon_ids = {pk for pk in salon_ids if pk is not None}
+
+        def expire():
+            for salon_id in salon_ids:
+                with self._salon_lock(salon_id):
+                    self._drop(salon_id)
+                    cache.delete(_version_key(salon_id))
+        expire()
+        transaction.on_commit(expire)
+
+    # ============ INTERNALS (salon lock held) ============
+
+    def _current(self, salon_id):
+        with self._lock:
+            queue = self._salons.get(salon_id)
+        version = cache.get(_version_key(salon_id))
+        if queue is None or queue.day != timezone.localdate() or version is None or queue.version != version:
+            queue = self._load(salon_id, version)
+        return queue
+
+    def _patch(self, salon_id, booking_id, row):
+        """Apply the booking's current ``row`` (None: gone) to the salon, writing rows that changed"""
+        try:
+            self._apply(salon_id, booking_id, row)
+        except Exception:
+            # Half-applied; reload on next access
+            self._drop(salon_id)
+            raise
+
+    def _apply(self, salon_id, booking_id, row):
+        try:
+            version = cache.incr(_version_key(salon_id))
+        except ValueError:
+            version = None
+        with self._lock:
+            queue = self._salons.get(salon_id)
+        if queue is None or queue.day != timezone.localdate() or version is None or queue.version != version - 1:
+            # Not in memory or another process got there first; the reload sees this change
+            self._load(salon_id, version)
+            return
+        queue.version = version
+
+        lanes = {}
+        old = queue.entries.get(booking_id)
+        if old is not None:
+            lanes[old.barber_id] = queue.remove(old)
+            with self._lock:
+                self._index.pop(booking_id, None)
+        stored = old.stored if old is not None else (row[7:] if row else (None, None))
+
+        changed = []
+        if row is not None and row[3] in QUEUE_STATUSES and row[4] == queue.day:
+            _, customer_id, barber_id, status, _, booking_time, service_id = row[:7]
+            entry = QueueEntry(booking_id, salon_id, customer_id, barber_id, status, booking_time,
+                               queue.duration(service_id), stored)
+            index = queue.add(entry)
+            lanes[barber_id] = min(index, lanes.get(barber_id, index))
+            with self._lock:
+                self._index[booking_id] = salon_id
+        elif stored != (None, None):
+            # Left the queue
+            entry = QueueEntry(booking_id, salon_id, None, None, None, None, 0, stored)
+            changed.append(entry)
+
+        for barber_id, start in lanes.items():
+            changed.extend(queue.recompute(barber_id, start))
+        self._write(changed)
+
+    def _load(self, salon_id, version):
+        """Rebuild the salon's lanes from the database and write any rows that disagree"""
+        if version is None:
+            version = _start_version(_version_key(salon_id))
+        self._drop(salon_id)
+        today = timezone.localdate()
+        barbers = Barber.objects.filter(salon_id=salon_id, is_available=True).count()
+        durations = dict(Service.objects.filter(salon_id=salon_id).values_list('pk', 'duration'))
+        queue = SalonQueue(salon_id, today, version, barbers, durations)
+
+        rows = (
+            Booking.objects.filter(salon_id=salon_id, booking_date=today, status__in=QUEUE_STATUSES)
+            .values_list('pk', 'customer_id', 'barber_id', 'status', 'booking_time', 'service_id', *QUEUE_FIELDS)
+        )
+        for pk, customer_id, barber_id, status, booking_time, service_id, *stored in rows:
+            entry = QueueEntry(pk, salon_id, customer_id, barber_id, status, booking_time,
+                               queue.duration(service_id), tuple(stored))
+            queue.lanes[barber_id].append(entry)
+            queue.entries[pk] = entry
+
+        changed = []
+        for barber_id, lane in queue.lanes.items():
+            lane.sort()
+            changed.extend(queue.recompute(barber_id))
+        # Bookings that left the queue some other way (earlier days, queryset updates)
+        (
+            Booking.objects.filter(salon_id=salon_id, queue_position__isnull=False)
+            .exclude(booking_date=today, status__in=QUEUE_STATUSES)
+            .update(queue_position=None, estimated_wait_time=None)
+        )
+        self._write(changed)
+        with self._lock:
+            self._salons[salon_id] = queue
+            self._index.update(dict.fromkeys(queue.entries, salon_id))
+        return queue
+
+    def _drop(self, salon_id):
+        with self._lock:
+            queue = self._salons.pop(salon_id, None)
+            if queue is not None:
+                for booking_id in queue.entries:
+                    self._index.pop(booking_id, None)
+
+    def _write(self, entries):
+        if not entries:
+            return
+        Booking.objects.bulk_update(
+            [Booking(pk=e.booking_id, queue_position=e.position, estimated_wait_time=e.wait) for e in entries],
+            QUEUE_FIELDS,
+        )
+        for entry in entries:
+            entry.stored = (entry.position, entry.wait)
+
+
+QUEUES = QueueEngine()
+
+
+def queue_booking_changes(booking_ids):
+    booking_ids = list(booking_ids)
+    if booking_ids:
+        transaction.on_commit(lambda: QUEUES.bookings_changed(booking_ids), robust=True)
+
+
+def queue_booking_removal(salon_id, booking_id):
+    transaction.on_commit(lambda: QUEUES.booking_removed(salon_id, booking_id), robust=True)
@@ -0,0 +1,98 @@
+"""
+Incrementally maintained salon and barber ratings.
+
+Salons and barbers keep ``rating_sum`` and ``total_reviews`` next to the
+displayed ``rating``. Review writes apply ``F()`` deltas to both counters
+and recompute ``rating`` from them in the same UPDATE, so concurrent
+reviews never lose an increment and rating-ordered listings read a plain
+indexed column. ``rebuild_ratings`` recomputes everything from the review
+table and backs the ``rebuild_ratings`` management command. Both round
+half up to two places; the UPDATE works in integer hundredths so float
+division never decides a tie.
+"""
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db.models import Case, Count, DecimalField, F, FloatField, Sum, Value, When
+from django.db.models.functions import Cast, Round
+
+from .models import Barber, Review, Salon
+
+RATING_OUTPUT = DecimalField(max_digits=3, decimal_places=2)
+
+
+def average(total, count):
+    return (Decimal(total) / count).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) if count else Decimal('0.00')
+
+
+def record_review_change(old_state, new_state):
+    """
+    Apply the difference between two review states to salon and barber ratings.
+
+    States are dicts of ``Review.TRACKED_FIELDS``; ``None`` means the review
+    did not exist (creation) or no longer exists (deletion).
+    """
+    deltas = {Salon: defaultdict(lambda: [0, 0]), Barber: defaultdict(lambda: [0, 0])}
+    for state, sign in ((old_state, -1), (new_state, 1)):
+        if state is None:
+            continue
+        for model, pk in ((Salon, state['salon_id']), (Barber, state['barber_id'])):
+            if pk is not None:
+                deltas[model][pk][0] += sign * state['rating']
+                deltas[model][pk][1] += sign
+
+    for model, changes in deltas.items():
+        for pk, (rating_delta, count_delta) in changes.items():
+            if rating_delta or count_delta:
+                apply_rating_delta(model, pk, rating_delta, count_delta)
+
+
+def apply_rating_delta(model, pk, rating_delta, count_delta):
+    # SET expressions see the old row, so the new average is spelled out
+    new_sum = F('rating_sum') + rating_delta
+    new_count = F('total_reviews') + count_delta
+    # Integer division truncates, so adding half the divisor first rounds half up
+    hundredths = (new_sum * 200 + new_count) / (new_count * 2)
+    new_average = Round(Cast(hundredths, FloatField()) / 100, 2)
+    model.objects.filter(pk=pk).update(
+        rating_sum=new_sum,
+        total_reviews=new_count,
+        rating=Case(
+            When(total_reviews__gt=-count_delta, then=new_average),
+            default=Value(Decimal('0.00')),
+            output_field=RATING_OUTPUT,
+        ),
+    )
+
+
+def rebuild_ratings(salon_ids=None, barber_ids=None):
+    """
+    Recompute ratings with one grouped aggregate per model; returns
+    ``(salons, barbers)`` written. With no ids every row is rebuilt.
+    """
+    rebuild_all = salon_ids is None and barber_ids is None
+    written = []
+    for model, group_by, ids in ((Salon, 'salon_id', salon_ids), (Barber, 'barber_id', barber_ids)):
+        if not rebuild_all and not ids:
+            written.append(0)
+            continue
+        reviews = Review.objects.filter(**{f'{group_by}__isnull': False})
+        rows = model.objects.all()
+        if not rebuild_all:
+            reviews = reviews.filter(**{f'{group_by}__in': ids})
+            rows = rows.filter(pk__in=ids)
+
+        totals = {
+            row[group_by]: (row['rating_sum'], row['total_reviews'])
+            for row in reviews.order_by().values(group_by).annotate(
+                rating_sum=Sum('rating'), total_reviews=Count('id'),
+            )
+        }
+        objs = []
+        for pk in rows.values_list('pk', flat=True):
+            rating_sum, total_reviews = totals.get(pk, (0, 0))
+            objs.append(model(pk=pk, rating_sum=rating_sum, total_reviews=total_reviews,
+                              rating=average(rating_sum, total_reviews)))
+        model.objects.bulk_update(objs, ['rating_sum', 'total_reviews', 'rating'], batch_size=500)
+        written.append(len(objs))
+    return tuple(written)
@@ -0,0 +1,162 @@
+"""
+Compiled read path for high-volume list endpoints.
+
+A ``ValuesReader`` looks at a read serializer once and generates a plain
+Python function that turns one ``values_list()`` row, with the joined
+columns already selected, into the dict the serializer would have
+produced: same keys, same order, same value formatting. Lists then skip
+model instantiation and DRF's per-field dispatch entirely.
+
+Simple columns (ids, text, integers, booleans, choices) are copied as
+they are. Other types go through the serializer field's own
+``to_representation``, so decimals, dates and datetimes are formatted
+exactly as before. Fields computed in Python (``get_full_name``,
+``SerializerMethodField``) are declared with ``Computed``.
+"""
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.fields import empty
+from rest_framework.response import Response
+
+from .serializers import BarberDetailSerializer, BookingSerializer, SalonListSerializer
+
+# Serializer fields whose representation of a database value is the value itself
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField, serializers.CharField, serializers.ChoiceField,
+    serializers.IntegerField, serializers.PrimaryKeyRelatedField,
+)
+
+
+class Computed:
+    """Output computed by ``func`` from the given ``values_list`` lookups"""
+
+    def __init__(self, lookups, func):
+        self.lookups = tuple(lookups)
+        self.func = func
+
+
+class ValuesReader:
+    def __init__(self, serializer_class, computed=None):
+        self.serializer_class = serializer_class
+        self.computed = computed or {}
+        self._compiled = None
+
+    def compile(self):
+        serializer = self.serializer_class()
+        model = serializer.Meta.model
+        lookups = []
+        namespace = {}
+        lines = ['def convert(row):', '    out = {}']
+
+        def column(lookup):
+            if lookup not in lookups:
+                lookups.append(lookup)
+            return f'row[{lookups.index(lookup)}]'
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if name in self.computed:
+                spec = self.computed[name]
+                namespace[f'compute_{name}'] = spec.func
+                args = ', '.join(column(lookup) for lookup in spec.lookups)
+                lines.append(f'    out[{name!r}] = compute_{name}({args})')
+                continue
+            if isinstance(field, (serializers.SerializerMethodField, serializers.FileField)):
+                raise ImproperlyConfigured(f'{self.serializer_class.__name__}.{name} needs a Computed entry')
+
+            resolved = self._resolve(model, field.source_attrs)
+            if resolved is None:
+                # Not a model attribute: the serializer skips it too
+                continue
+            lookup, nullable_paths = resolved
+            value = column(lookup)
+            if not isinstance(field, PASSTHROUGH_FIELDS):
+                namespace[f'to_{name}'] = field.to_representation
+                value = f'(None if {value} is None else to_{name}({value}))'
+
+            indent = '    '
+            if nullable_paths and field.default is empty:
+                # A missing related object makes DRF skip the field (or return None)
+                missing = ' or '.join(f'{column(path)} is None' for path in nullable_paths)
+                if field.allow_null:
+                    value = f'(None if {missing} else {value})'
+                else:
+                    lines.append(f'    if not ({missing}):')
+                    indent += '    '
+            lines.append(f'{indent}out[{name!r}] = {value}')
+
+        lines.append('    return out')
+        exec(compile('\n'.join(lines), f'<reader {self.serializer_class.__name__}>', 'exec'), namespace)
+        return tuple(lookups), namespace['convert']
+
+    def _resolve(self, model, attrs):
+        """``values_list`` lookup for a source path, plus the nullable relations it crosses"""
+        path, nullable_paths = [], []
+        for i, attr in enumerate(attrs):
+            try:
+                model_field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                if hasattr(model, attr):
+                    raise ImproperlyConfigured(
+                        f'{self.serializer_class.__name__}: {".".join(attrs)} is computed in Python '
+                        'and needs a Computed entry'
+                    )
+                return None
+            path.append(attr)
+            if i < len(attrs) - 1:
+                if model_field.null:
+                    nullable_paths.append('__'.join(path))
+                model = model_field.related_model
+        return '__'.join(path), nullable_paths
+
+    def serialize(self, queryset):
+        """List of dicts for ``queryset``, identical to ``serializer(queryset, many=True).data``"""
+        if self._compiled is None:
+            self._compiled = self.compile()
+        lookups, convert = self._compiled
+        return [convert(row) for row in queryset.values_list(*lookups)]
+
+
+class FastListMixin:
+    """Serve unpaginated ``list`` responses through ``list_reader``"""
+    list_reader = None
+
+    def list(self, request, *args, **kwargs):
+        if self.list_reader is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        return Response(self.list_reader.serialize(queryset))
+
+
+# ============ READERS ============
+
+def full_name(first_name, last_name):
+    # Same as AbstractUser.get_full_name()
+    return f'{first_name} {last_name}'.strip()
+
+
+def barber_display_name(barber_id, first_name, last_name, username):
+    # Same as BookingSerializer.get_barber_name()
+    if barber_id is None:
+        return None
+    return full_name(first_name, last_name) or username
+
+
+SALON_LIST_READER = ValuesReader(SalonListSerializer)
+
+BOOKING_READER = ValuesReader(BookingSerializer, computed={
+    'customer_name': Computed(['customer__first_name', 'customer__last_name'], full_name),
+    'barber_name': Computed(
+        ['barber', 'barber__user__first_name', 'barber__user__last_name', 'barber__user__username'],
+        barber_display_name,
+    ),
+})
+
+BARBER_DETAIL_READER = ValuesReader(BarberDetailSerializer, computed={
+    'user_name': Computed(['user__first_name', 'user__last_name'], full_name),
+})
@@ -0,0 +1,64 @@
+"""
+orjson-backed JSON renderer and parser.
+
+Drop-in replacements for DRF's ``JSONRenderer`` and ``JSONParser``,
+enabled globally in ``REST_FRAMEWORK`` and selectable per view through
+``renderer_classes`` / ``parser_classes``. Output is the same as DRF's:
+compact separators, unescaped unicode except U+2028/U+2029, and every
+type orjson does not handle natively (``Decimal``, ``date``, ``time``,
+``datetime``, lazy strings, querysets) goes through DRF's own
+``JSONEncoder.default``. When orjson is not installed, or cannot handle a
+payload (indented output, integers beyond 64 bits, non-UTF-8 bodies), the
+stock implementation is used.
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+_encoder = JSONEncoder()
+
+if orjson is not None:
+    # datetime/date/time go through DRF's encoder so they keep its formatting
+    DUMPS_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def can_use_orjson(self, accepted_media_type, renderer_context):
+        """orjson only matches DRF's compact, non-ASCII-escaped, unindented output"""
+        return (
+            orjson is not None and self.encoder_class is JSONEncoder
+            and self.compact and not self.ensure_ascii
+            and not self.get_indent(accepted_media_type, renderer_context)
+        )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not self.can_use_orjson(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_encoder.default, option=DUMPS_OPTIONS)
+        except (orjson.JSONEncodeError, TypeError):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same JavaScript-safety escaping as DRF
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
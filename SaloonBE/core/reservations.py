@@ -0,0 +1,118 @@
+"""
+Contention-safe slot reservation for bookings.
+
+Every active booking holds one ``SlotClaim`` row per availability grid cell
+it covers. Two unique constraints make conflicting reservations fail at
+insert time instead of after a racy read-then-write check:
+
+* ``(salon, booking_date, cell, seat)``: a salon can run at most as many
+  overlapping bookings as it has barbers (``seat`` < capacity).
+* ``(barber, booking_date, cell)``: an assigned barber cannot hold two
+  overlapping bookings. Unassigned claims have ``barber=NULL``, which never
+  collides.
+
+Callers run these helpers inside a transaction and turn ``SlotUnavailable``
+into ``409 Conflict``.
+"""
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+
+from .availability import ACTIVE_STATUSES, cells_between, seat_capacity, to_minutes
+from .models import Barber, SlotClaim
+
+CLAIM_ATTEMPTS = 3
+
+
+class SlotUnavailable(Exception):
+    pass
+
+
+def booking_cells(booking, duration=None):
+    """Grid cells (start minute of each cell) covered by a booking"""
+    start = to_minutes(booking.booking_time)
+    return list(cells_between(start, start + (duration if duration is not None else booking.service.duration)))
+
+
+def salon_capacity(salon_id):
+    return seat_capacity(Barber.objects.filter(salon_id=salon_id, is_available=True).count())
+
+
+def claim_slot(booking, duration=None):
+    """
+    Reserve seats for ``booking`` in every cell it covers.
+
+    Picks the lowest free seat per cell; if a concurrent request takes the
+    same seat first, the unique constraint rejects the insert and the free
+    seats are re-read (up to ``CLAIM_ATTEMPTS`` times).
+    """
+    cells = booking_cells(booking, duration)
+    capacity = salon_capacity(booking.salon_id)
+
+    for _ in range(CLAIM_ATTEMPTS):
+        taken = defaultdict(set)
+        rows = SlotClaim.objects.filter(
+            salon_id=booking.salon_id, booking_date=booking.booking_date, cell__in=cells
+        ).values_list('cell', 'seat')
+        for cell, seat in rows:
+            taken[cell].add(seat)
+
+        claims = []
+        for cell in cells:
+            seat = next((s for s in range(capacity) if s not in taken[cell]), None)
+            if seat is None:
+                raise SlotUnavailable('This time slot is fully booked')
+            claims.append(SlotClaim(
+                booking=booking, salon_id=booking.salon_id, barber_id=booking.barber_id,
+                booking_date=booking.booking_date, cell=cell, seat=seat,
+            ))
+
+        try:
+            with transaction.atomic():
+                SlotClaim.objects.bulk_create(claims)
+            return claims
+        except IntegrityError:
+            if booking.barber_id and SlotClaim.objects.filter(
+                barber_id=booking.barber_id, booking_date=booking.booking_date, cell__in=cells
+            ).exists():
+                raise SlotUnavailable('Barber already has a booking at this time')
+            continue
+    raise SlotUnavailable('This time slot was just taken, please pick another')
+
+
+def assign_claims(booking, barber_id):
+    """Move a booking's claims onto a barber; fails if they overlap another of theirs"""
+    try:
+        with transaction.atomic():
+            moved = SlotClaim.objects.filter(booking=booking).update(barber_id=barber_id)
+    except IntegrityError:
+        raise SlotUnavailable('Barber already has a booking at this time')
+    if not moved:
+        # Booking predates slot claims
+        claim_slot(booking)
+
+
+def release_slot(booking):
+    SlotClaim.objects.filter(booking=booking).delete()
+
+
+def reclaim_slot(booking):
+    """Re-reserve after a booking moved to another date or time"""
+    release_slot(booking)
+    return claim_slot(booking)
+
+
+def snapshot(booking):
+    """The fields ``sync_claims`` compares, taken before a booking is changed"""
+    return booking.status, booking.barber_id, booking.booking_date, booking.booking_time
+
+
+def sync_claims(booking, before):
+    """Bring a booking's claims in line with its saved state"""
+    status, barber_id, day, time = before
+    if booking.status not in ACTIVE_STATUSES:
+        release_slot(booking)
+    elif status not in ACTIVE_STATUSES or (day, time) != (booking.booking_date, booking.booking_time):
+        reclaim_slot(booking)
+    elif barber_id != booking.barber_id:
+        assign_claims(booking, booking.barber_id)
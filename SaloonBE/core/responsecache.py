@@ -0,0 +1,129 @@
+"""
+Response cache for public read endpoints.
+
+``ResponseCacheMixin`` stores the serialized ``response.data`` of ``list``
+and ``retrieve`` keyed on path, query string, host and user scope. Every
+key also embeds version tokens for the tags the response depends on
+(``service:salon:3``, ``review:all``, ``service:12`` ...). The signal
+handlers in ``core.signals`` replace those tokens on every Service, Review
+and Salon write, so invalidation is exact and entries never need a short
+TTL.
+
+Entries, tag versions and hit/miss counters live in the cache named by
+``settings.RESPONSE_CACHE_ALIAS``: local memory by default, or point that
+alias at a shared backend (Redis, Memcached) so workers share one cache.
+"""
+import hashlib
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+ENTRY_TIMEOUT = 24 * 60 * 60
+
+# Views using the mixin, for the stats report
+CACHED_VIEWS = []
+
+
+def response_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _tag_versions(cache, tags):
+    keys = [f'response-cache:tag:{tag}' for tag in tags]
+    versions = cache.get_many(keys)
+    missing = {key: uuid4().hex for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def invalidate_tags(*tags):
+    """Expire every entry depending on ``tags``, now and again after commit"""
+    def bump():
+        response_cache().set_many({f'response-cache:tag:{tag}': uuid4().hex for tag in tags}, None)
+    bump()
+    # A concurrent reader may cache pre-commit data under the new token
+    transaction.on_commit(bump)
+
+
+def _count(cache, name, outcome):
+    key = f'response-cache:{outcome}:{name}'
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def cache_stats():
+    """``{view.action: {'hits': n, 'misses': n}}`` across all workers sharing the cache"""
+    cache = response_cache()
+    names = [f'{view}.{action}' for view in CACHED_VIEWS for action in ('list', 'retrieve')]
+    keys = {f'response-cache:{outcome}:{name}': (name, outcome) for name in names for outcome in ('hits', 'misses')}
+    stats = {name: {'hits': 0, 'misses': 0} for name in names}
+    for key, value in cache.get_many(keys).items():
+        name, outcome = keys[key]
+        stats[name][outcome] = value
+    return stats
+
+
+class ResponseCacheMixin:
+    # Tag prefix, e.g. 'service' -> 'service:all', 'service:salon:3', 'service:12'
+    response_cache_tag = None
+    # True when responses do not depend on the user, so everyone shares entries
+    response_cache_public = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        CACHED_VIEWS.append(cls.__name__)
+
+    def response_cache_scope(self, request):
+        if self.response_cache_public:
+            return 'public'
+        if not request.user.is_authenticated:
+            return 'anon'
+        return None
+
+    def response_cache_tags(self, request, pk=None):
+        if pk is not None:
+            return [f'{self.response_cache_tag}:{pk}']
+        salon_id = request.query_params.get('salon')
+        if salon_id and salon_id.isdigit():
+            return [f'{self.response_cache_tag}:salon:{int(salon_id)}']
+        return [f'{self.response_cache_tag}:all']
+
+    def cached_response(self, request, handler, pk=None):
+        scope = self.response_cache_scope(request)
+        if scope is None:
+            return handler()
+
+        cache = response_cache()
+        name = f'{type(self).__name__}.{self.action}'
+        versions = _tag_versions(cache, self.response_cache_tags(request, pk))
+        raw = '|'.join([scope, request.get_host(), request.get_full_path()] + versions)
+        key = f'response-cache:entry:{name}:{hashlib.md5(raw.encode("utf-8")).hexdigest()}'
+
+        data = cache.get(key)
+        if data is not None:
+            _count(cache, name, 'hits')
+            return Response(data)
+
+        _count(cache, name, 'misses')
+        response = handler()
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, ENTRY_TIMEOUT)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(ResponseCacheMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, lambda: super(ResponseCacheMixin, self).retrieve(request, *args, **kwargs),
+            pk=kwargs.get(self.lookup_url_kwarg or self.lookup_field),
+        )
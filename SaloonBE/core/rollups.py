@@ -0,0 +1,251 @@
+"""
+Daily booking rollups behind the salon time-series endpoint.
+
+``DailySalonStats`` holds one row of totals per salon and past booking
+date, up to the salon's watermark (``SalonStats.rolled_up_through``).
+``roll_up`` aggregates every day from the watermark to yesterday with one
+grouped query. After that, booking changes on rolled-up days apply small
+``F()`` deltas through ``record_daily_changes``, like SalonStats does.
+Today and later are always aggregated live from ``Booking``, so the day's
+busy bookings never write to a rollup row, and a series over years reads
+one row per day or fewer instead of every booking.
+
+A read whose watermark is a few days behind queues a ``rollups.roll_up``
+job for the ``run_jobs`` worker (see core/tasks.py) and aggregates those
+days live meanwhile. A read whose salon has no rollups, or is more than
+``MAX_LIVE_DAYS`` behind, rolls up itself, so no read aggregates more than
+that many past days from ``Booking``, with or without a worker running.
+
+Changes that deltas cannot follow (service price edits, barbers deleted
+from under completed bookings) call ``reset_rollups``, and the next read
+rebuilds the salon's rows.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .jobs import enqueue_once
+from .models import Booking, DailySalonStats, SalonStats, Service
+from .stats import CANCELLED, COMPLETED, rebuild_salon_stats
+
+PERIODS = ('day', 'week', 'month')
+ROLLUP_FIELDS = ('bookings', 'completed_bookings', 'cancelled_bookings', 'revenue')
+MAX_TIMESERIES_POINTS = 1000
+# Past days a read aggregates live while the roll-up job catches up
+MAX_LIVE_DAYS = 7
+
+# Points returned when no start_date is given
+DEFAULT_POINTS = {'day': 30, 'week': 12, 'month': 12}
+
+TRUNCATE = {'week': TruncWeek, 'month': TruncMonth}
+
+
+def day_contribution(status, has_barber):
+    """How much a single booking adds to its day (same definitions as SalonStats)"""
+    return {
+        'bookings': 1,
+        'completed_bookings': int(has_barber and status == 'completed'),
+        'cancelled_bookings': int(status == 'cancelled'),
+    }
+
+
+# ============ MAINTENANCE ============
+
+def record_daily_changes(changes):
+    """
+    Apply ``(old_state, new_state)`` booking pairs (as for
+    ``record_booking_changes``) to rolled-up days. States dated today or
+    later are skipped; those days are still aggregated live.
+    """
+    today = timezone.localdate()
+    deltas = defaultdict(lambda: defaultdict(int))
+    states = [(state, sign) for old, new in changes for state, sign in ((old, -1), (new, 1))]
+    for state, sign in states:
+        if state is None or state['booking_date'] >= today:
+            continue
+        counters = deltas[state['salon_id'], state['booking_date']]
+        has_barber = state['barber_id'] is not None
+        for field, value in day_contribution(state['status'], has_barber).items():
+            counters[field] += sign * value
+        if has_barber and state['status'] == 'completed':
+            price = Service.objects.filter(pk=state['service_id']).values_list('price', flat=True).first()
+            counters['revenue'] += sign * (price or Decimal('0'))
+
+    for (salon_id, day), counters in deltas.items():
+        changes = {field: F(field) + value for field, value in counters.items() if value}
+        if not changes:
+            continue
+        updated = DailySalonStats.objects.filter(salon_id=salon_id, date=day).update(**changes)
+        if not updated and SalonStats.objects.filter(salon_id=salon_id, rolled_up_through__gte=day).exists():
+            # The day was rolled up before it had any bookings
+            DailySalonStats.objects.create(salon_id=salon_id, date=day, **counters)
+
+
+def reset_rollups(salon_ids=None):
+    """Drop the salons' rollups (all of them by default); the next read aggregates them again"""
+    rollups, stats = DailySalonStats.objects.all(), SalonStats.objects.all()
+    if salon_ids is not None:
+        salon_ids = {pk for pk in salon_ids if pk is not None}
+        if not salon_ids:
+            return
+        rollups, stats = rollups.filter(salon_id__in=salon_ids), stats.filter(salon_id__in=salon_ids)
+    rollups.delete()
+    stats.update(rolled_up_through=None)
+
+
+def roll_up(salon_id):
+    """Aggregate the salon's days up to yesterday into DailySalonStats; returns yesterday"""
+    yesterday = timezone.localdate() - timedelta(days=1)
+    with transaction.atomic():
+        watermarks = list(SalonStats.objects.filter(salon_id=salon_id).values_list('rolled_up_through', flat=True))
+        if not watermarks:
+            rebuild_salon_stats([salon_id])
+            watermarks = [None]
+        watermark = watermarks[0]
+        if watermark is not None and watermark >= yesterday:
+            return yesterday
+
+        bookings = Booking.objects.filter(salon_id=salon_id, booking_date__lte=yesterday)
+        if watermark is None:
+            DailySalonStats.objects.filter(salon_id=salon_id).delete()
+        else:
+            bookings = bookings.filter(booking_date__gt=watermark)
+        days = bookings.order_by().values('booking_date').annotate(
+            bookings=Count('id'),
+            completed_bookings=Count('id', filter=COMPLETED),
+            cancelled_bookings=Count('id', filter=CANCELLED),
+            revenue=Sum('service__price', filter=COMPLETED),
+        )
+        DailySalonStats.objects.bulk_create(
+            [
+                DailySalonStats(
+                    salon_id=salon_id, date=row.pop('booking_date'),
+                    **row | {'revenue': row['revenue'] or Decimal('0')},
+                )
+                for row in days
+            ],
+            update_conflicts=True,
+            unique_fields=['salon', 'date'],
+            update_fields=list(ROLLUP_FIELDS),
+            batch_size=500,
+        )
+        SalonStats.objects.filter(salon_id=salon_id).update(rolled_up_through=yesterday)
+    return yesterday
+
+
+def rolled_up_through(salon_id):
+    """The last day to read from DailySalonStats, rolling up or queuing a roll-up as needed"""
+    yesterday = timezone.localdate() - timedelta(days=1)
+    watermark = SalonStats.objects.filter(salon_id=salon_id).values_list('rolled_up_through', flat=True).first()
+    if watermark is not None and watermark >= yesterday:
+        return watermark
+    if watermark is None or (yesterday - watermark).days > MAX_LIVE_DAYS:
+        return roll_up(salon_id)
+    enqueue_once('rollups.roll_up', {'salon_id': salon_id})
+    return watermark
+
+
+# ============ TIME SERIES ============
+
+def period_start(day, period):
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_period(day, period):
+    if period == 'week':
+        return day + timedelta(days=7)
+    if period == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def default_start(end_date, period):
+    points = DEFAULT_POINTS[period] - 1
+    if period == 'month':
+        month = end_date.year * 12 + end_date.month - 1 - points
+        return date(month // 12, month % 12 + 1, 1)
+    return period_start(end_date, period) - timedelta(days=points * (7 if period == 'week' else 1))
+
+
+def parse_timeseries_params(params):
+    """
+    ``(period, start_date, end_date)`` from the query string; ``start_date``
+    is moved back to the start of its week or month. Raises ``ValueError``
+    on bad input.
+    """
+    period = params.get('period') or 'day'
+    if period not in PERIODS:
+        raise ValueError(f'period must be one of: {", ".join(PERIODS)}')
+
+    dates = {}
+    for name in ('start_date', 'end_date'):
+        if params.get(name):
+            try:
+                dates[name] = datetime.strptime(params[name], '%Y-%m-%d').date()
+            except ValueError:
+                raise ValueError(f'{name} must be in YYYY-MM-DD format')
+    end_date = dates.get('end_date') or timezone.localdate()
+    start_date = period_start(dates.get('start_date') or default_start(end_date, period), period)
+    if end_date < start_date:
+        raise ValueError('end_date must not be before start_date')
+
+    points, day = 0, start_date
+    while day <= end_date:
+        points += 1
+        if points > MAX_TIMESERIES_POINTS:
+            raise ValueError(f'At most {MAX_TIMESERIES_POINTS} points per request; use a longer period')
+        day = next_period(day, period)
+    return period, start_date, end_date
+
+
+def group_by_period(queryset, field, period):
+    bucket = TRUNCATE[period](field) if period in TRUNCATE else F(field)
+    return queryset.order_by().annotate(period=bucket).values('period')
+
+
+def salon_timeseries(salon_id, start_date, end_date, period='day'):
+    """
+    ``[{'period_start': date, 'bookings': n, 'completed_bookings': n,
+    'cancelled_bookings': n, 'revenue': Decimal}]`` for every day, week or
+    month from ``start_date`` to ``end_date``, including empty ones.
+    """
+    buckets = {}
+    day = period_start(start_date, period)
+    while day <= end_date:
+        buckets[day] = dict.fromkeys(ROLLUP_FIELDS, 0) | {'revenue': Decimal('0.00')}
+        day = next_period(day, period)
+
+    def add(rows):
+        for row in rows:
+            totals = buckets[row.pop('period')]
+            for field, value in row.items():
+                totals[field] += value or 0
+
+    rolled_through = rolled_up_through(salon_id)
+    live_start = start_date
+    if start_date <= rolled_through:
+        rolled = DailySalonStats.objects.filter(
+            salon_id=salon_id, date__range=(start_date, min(end_date, rolled_through))
+        )
+        add(group_by_period(rolled, 'date', period).annotate(**{field: Sum(field) for field in ROLLUP_FIELDS}))
+        live_start = rolled_through + timedelta(days=1)
+
+    if live_start <= end_date:
+        live = Booking.objects.filter(salon_id=salon_id, booking_date__range=(live_start, end_date))
+        add(group_by_period(live, 'booking_date', period).annotate(
+            bookings=Count('id'),
+            completed_bookings=Count('id', filter=COMPLETED),
+            cancelled_bookings=Count('id', filter=CANCELLED),
+            revenue=Sum('service__price', filter=COMPLETED),
+        ))
+
+    return [{'period_start': day, **totals} for day, totals in buckets.items()]
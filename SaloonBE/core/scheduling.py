@@ -0,0 +1,104 @@
+"""
+Automatic barber assignment for pending bookings.
+
+``auto_assign`` hands a salon's unassigned pending bookings for one day to
+its available barbers. Bookings are taken in start order; each goes to the
+least loaded barber (minutes booked that day) whose chair is free for the
+grid cells the booking will claim, so no barber is double-booked and the
+day's work spreads evenly. Bookings that already have a barber count as
+busy time. Bookings no barber can fit stay pending.
+
+Each barber's share is written with one ``apply_bulk_operation``
+(``reassign`` confirms a pending booking, like barber self-assignment), so
+slot claims and the rest of the derived data stay in step. If a claim
+fails anyway because someone took the slot meanwhile, that booking stays
+pending and the rest of the barber's share is written without it.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from .availability import SLOT_INTERVAL, IntervalIndex, to_minutes
+from .bulk import apply_bulk_operation
+from .models import Barber, Booking
+from .reservations import ACTIVE_STATUSES, SlotUnavailable, booking_cells
+
+
+def claimed_span(booking):
+    """``[start, end)`` minutes of the grid cells the booking claims"""
+    cells = booking_cells(booking, booking.service.duration)
+    if not cells:
+        start = to_minutes(booking.booking_time)
+        return start, start
+    return cells[0], cells[-1] + SLOT_INTERVAL
+
+
+def plan_assignments(barber_ids, assigned, pending):
+    """
+    ``{booking: barber_id}`` for the ``pending`` bookings that fit around
+    the ``assigned`` ones. Bookings need ``service`` loaded; ``pending``
+    must be in start order.
+    """
+    busy, load = defaultdict(list), dict.fromkeys(barber_ids, 0)
+    for booking in assigned:
+        if booking.barber_id in load:
+            busy[booking.barber_id].append(claimed_span(booking))
+            load[booking.barber_id] += booking.service.duration
+    chairs = {pk: IntervalIndex(busy[pk]) for pk in barber_ids}
+
+    plan = {}
+    for booking in pending:
+        start, end = claimed_span(booking)
+        free = [pk for pk in barber_ids if chairs[pk].is_free(start, end)]
+        if not free:
+            continue
+        barber_id = min(free, key=lambda pk: (load[pk], pk))
+        chairs[barber_id].add(start, end)
+        load[barber_id] += booking.service.duration
+        plan[booking] = barber_id
+    return plan
+
+
+def assign_share(bookings, barber):
+    """Reassign ``bookings`` to ``barber``, skipping any whose slot is gone; returns how many were assigned"""
+    while bookings:
+        try:
+            apply_bulk_operation(bookings, 'reassign', barber=barber)
+            return len(bookings)
+        except SlotUnavailable as exc:
+            # Rolled back; undo the in-memory changes before trying again
+            for booking in bookings:
+                booking.barber, booking.status = None, 'pending'
+            bookings = [booking for booking in bookings if booking.pk != exc.booking_id]
+    return 0
+
+
+def auto_assign(salon_id, day):
+    """Assign the salon's pending bookings on ``day``; returns ``(assigned, still_pending)``"""
+    barbers = {
+        barber.pk: barber
+        for barber in Barber.objects.filter(salon_id=salon_id, is_available=True).select_related('user')
+    }
+    with transaction.atomic():
+        bookings = list(
+            Booking.objects.select_for_update(of=('self',))
+            .filter(salon_id=salon_id, booking_date=day, status__in=ACTIVE_STATUSES)
+            .select_related('service').order_by('booking_time', 'pk')
+        )
+        pending = [b for b in bookings if b.barber_id is None and b.status == 'pending']
+        if not barbers or not pending:
+            return 0, len(pending)
+
+        plan = plan_assignments(sorted(barbers), [b for b in bookings if b.barber_id is not None], pending)
+        shares = defaultdict(list)
+        for booking, barber_id in plan.items():
+            shares[barber_id].append(booking)
+        assigned = sum(assign_share(shares[pk], barbers[pk]) for pk in sorted(shares))
+    return assigned, len(pending) - assigned
+
+
+def salons_with_pending(day):
+    return sorted(
+        Booking.objects.filter(booking_date=day, status='pending', barber__isnull=True)
+        .order_by().values_list('salon_id', flat=True).distinct()
+    )
@@ -0,0 +1,157 @@
+"""
+Full-text search over salons and services backed by SQLite FTS5.
+
+Each ``SearchIndex`` mirrors a model into an FTS5 virtual table keyed by the
+row's primary key (the FTS ``rowid``). The tables are created by migration
+0007 and kept in sync by the signal handlers in ``core.signals``. On other
+database backends the indexes are inert and ``FullTextSearchFilter`` falls
+back to DRF's ``SearchFilter``.
+"""
+import re
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+from django.db.models import Case, IntegerField, Value, When
+from rest_framework import filters
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_enabled():
+    return connection.vendor == 'sqlite'
+
+
+class SearchIndex:
+    """An FTS5 table populated from a ``SELECT id, <columns...>`` query"""
+
+    def __init__(self, table, columns, weights, source_sql, key):
+        self.table = table
+        self.columns = columns
+        self.weights = weights
+        self.source_sql = source_sql
+        self.key = key
+
+    def refresh(self, ids):
+        """Re-read the given rows from their source tables"""
+        ids = [int(pk) for pk in ids if pk is not None]
+        if not ids or not fts_enabled():
+            return
+        placeholders = ', '.join(['%s'] * len(ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid IN ({placeholders})', ids)
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, {", ".join(self.columns)}) '
+                f'{self.source_sql} WHERE {self.key} IN ({placeholders})',
+                ids,
+            )
+
+    def remove(self, ids):
+        ids = [int(pk) for pk in ids if pk is not None]
+        if not ids or not fts_enabled():
+            return
+        placeholders = ', '.join(['%s'] * len(ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid IN ({placeholders})', ids)
+
+    def rebuild(self):
+        """Repopulate the whole index, returning the number of rows indexed"""
+        if not fts_enabled():
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, {", ".join(self.columns)}) {self.source_sql}'
+            )
+            return cursor.rowcount
+
+    def search(self, terms, limit, scope=None):
+        """
+        Return matching primary keys, best match first. With ``scope`` (a
+        queryset of the indexed model) only its rows are matched, before
+        the limit is applied.
+        """
+        match = build_match_query(terms)
+        if not match:
+            return []
+        weights = ', '.join(str(w) for w in self.weights)
+        scope_sql, scope_params = '', []
+        if scope is not None:
+            try:
+                sql, scope_params = scope.order_by().values('pk').query.sql_with_params()
+            except EmptyResultSet:
+                # ``.none()`` or ``pk__in=[]``: nothing can match
+                return []
+            scope_sql = f'AND rowid IN ({sql}) '
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s {scope_sql}'
+                f'ORDER BY bm25({self.table}, {weights}) LIMIT %s',
+                [match, *scope_params, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+def build_match_query(terms):
+    """
+    Turn free-text search terms into an FTS5 query.
+
+    Every word must match (implicit AND) and the last characters typed are
+    treated as a prefix, so "hair cu" finds "Haircut Studio". Words are
+    quoted so user input can never be parsed as FTS5 syntax.
+    """
+    tokens = TOKEN_RE.findall(' '.join(terms))
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+SALON_INDEX = SearchIndex(
+    table='core_salon_fts',
+    columns=['name', 'address', 'description', 'services'],
+    weights=[10.0, 3.0, 1.0, 5.0],
+    source_sql=(
+        'SELECT s.id, s.name, s.address, s.description, '
+        "COALESCE((SELECT group_concat(sv.name, ' ') FROM core_service sv "
+        "WHERE sv.salon_id = s.id AND sv.is_active), '') "
+        'FROM core_salon s'
+    ),
+    key='s.id',
+)
+
+SERVICE_INDEX = SearchIndex(
+    table='core_service_fts',
+    columns=['name', 'description', 'salon_name'],
+    weights=[10.0, 2.0, 1.0],
+    source_sql=(
+        'SELECT sv.id, sv.name, sv.description, sl.name '
+        'FROM core_service sv JOIN core_salon sl ON sl.id = sv.salon_id'
+    ),
+    key='sv.id',
+)
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    Relevance-ranked search using the view's ``search_index``.
+
+    Results are restricted to the top ``max_results`` matches within the
+    queryset the earlier filters produced and ordered by BM25 rank (the
+    ``search_rank`` annotation) unless an explicit ``ordering`` is applied
+    afterwards. Falls back to ``SearchFilter`` over ``search_fields`` when FTS5 is not
+    available.
+    """
+    max_results = 500
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        index = getattr(view, 'search_index', None)
+        if not search_terms or index is None or not fts_enabled():
+            return super().filter_queryset(request, queryset, view)
+
+        ids = index.search(search_terms, self.max_results, scope=queryset)
+        if not ids:
+            return queryset.none()
+
+        rank = Case(
+            *[When(pk=pk, then=Value(position)) for position, pk in enumerate(ids)],
+            output_field=IntegerField(),
+        )
+        return queryset.filter(pk__in=ids).annotate(search_rank=rank).order_by('search_rank')
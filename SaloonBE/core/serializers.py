@@ -138,6 +138,19 @@ class ServiceSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'salon_name', 'updated_at']
 
 
+class ServiceImportSerializer(serializers.ModelSerializer):
+    """One row of a catalog import; the salon comes from the URL"""
+    
+    class Meta:
+        model = Service
+        fields = ['name', 'description', 'price', 'duration', 'is_active', 'image']
+    
+    def validate_duration(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Duration must be a positive number of minutes")
+        return value
+
+
 # ============ BARBER SERIALIZERS ============
 
 class BarberListSerializer(serializers.ModelSerializer):
@@ -0,0 +1,192 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .authentication import bump_token_version
+from .availability import invalidate_availability
+from .derived import (
+    barber_deleted, barber_saved, booking_deleted, bookings_saved, service_deleted, services_saved,
+)
+from .etags import bump_salon_version
+from .models import Barber, Booking, Review, Salon, SalonStats, Service, User
+from .queues import QUEUES
+from .ratings import rebuild_ratings, record_review_change
+from .responsecache import invalidate_tags
+from .search import SALON_INDEX, SERVICE_INDEX
+
+
+# ============ SEARCH INDEX SYNC ============
+
+@receiver(post_save, sender=Salon)
+def index_salon(sender, instance, **kwargs):
+    SALON_INDEX.refresh([instance.pk])
+    # Services carry their salon's name in the service index
+    SERVICE_INDEX.refresh(instance.services.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Salon)
+def unindex_salon(sender, instance, **kwargs):
+    SALON_INDEX.remove([instance.pk])
+
+
+# ============ TOKEN CLAIMS ============
+
+@receiver(post_save, sender=User)
+def expire_claims_on_user_save(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    previous = getattr(instance, '_persisted_token_state', {})
+    written = User.TOKEN_FIELDS if update_fields is None else set(update_fields) & set(User.TOKEN_FIELDS)
+    if any(field not in previous or previous[field] != getattr(instance, field) for field in written):
+        bump_token_version(instance.pk)
+    instance.remember_token_state(written)
+
+
+@receiver(post_save, sender=Salon)
+def expire_claims_on_salon_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_persisted_owner_id', None)
+    if created or previous != instance.owner_id:
+        bump_token_version(instance.owner_id, previous)
+    instance._persisted_owner_id = instance.owner_id
+
+
+@receiver(post_delete, sender=Salon)
+def expire_claims_on_salon_delete(sender, instance, **kwargs):
+    bump_token_version(instance.owner_id)
+
+
+# ============ LIST ETAGS ============
+
+@receiver(post_save, sender=Salon)
+@receiver(post_delete, sender=Salon)
+def bump_list_version(sender, instance, **kwargs):
+    bump_salon_version(instance.pk)
+
+
+# ============ RESPONSE CACHE ============
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def expire_review_responses(sender, instance, **kwargs):
+    invalidate_tags('review:all', f'review:{instance.pk}', f'review:salon:{instance.salon_id}')
+
+
+@receiver(post_save, sender=Salon)
+@receiver(post_delete, sender=Salon)
+def expire_salon_responses(sender, instance, **kwargs):
+    # Services and reviews show the salon name
+    service_ids = instance.services.values_list('pk', flat=True)
+    review_ids = Review.objects.filter(salon=instance).values_list('pk', flat=True)
+    invalidate_tags(
+        'service:all', 'review:all', f'service:salon:{instance.pk}', f'review:salon:{instance.pk}',
+        *(f'service:{pk}' for pk in service_ids), *(f'review:{pk}' for pk in review_ids),
+    )
+
+
+# ============ LIVE QUEUE ============
+
+@receiver(post_delete, sender=Salon)
+def drop_salon_queue(sender, instance, **kwargs):
+    QUEUES.invalidate(instance.pk)
+
+
+# ============ SALON STATS ============
+
+@receiver(post_save, sender=Salon)
+def create_salon_stats(sender, instance, created, raw=False, **kwargs):
+    # Nothing to count yet; having the row keeps dashboard reads from seeding it
+    if created and not raw:
+        SalonStats.objects.get_or_create(salon=instance)
+
+
+# ============ DERIVED DATA ============
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, created, **kwargs):
+    bookings_saved([instance], {instance.pk: getattr(instance, '_persisted_state', None)}, created)
+
+
+@receiver(post_delete, sender=Booking)
+def booking_removed(sender, instance, origin=None, **kwargs):
+    # The whole salon is going away, stats row included
+    if isinstance(origin, Salon):
+        return
+    booking_deleted(instance)
+
+
+@receiver(post_save, sender=Barber)
+def barber_changed(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_persisted_salon_id', None)
+    if created or previous != instance.salon_id:
+        bump_token_version(instance.user_id)
+    barber_saved(instance, previous)
+    instance._persisted_salon_id = instance.salon_id
+
+
+@receiver(pre_delete, sender=Barber)
+def collect_barber_booking_salons(sender, instance, **kwargs):
+    # Deleting a barber un-assigns their bookings (SET_NULL) without signals
+    instance._booking_salon_ids = set(
+        instance.bookings.order_by().values_list('salon_id', flat=True).distinct()
+    )
+
+
+@receiver(post_delete, sender=Barber)
+def barber_removed(sender, instance, origin=None, **kwargs):
+    bump_token_version(instance.user_id)
+    if isinstance(origin, Salon):
+        return
+    barber_deleted(instance, getattr(instance, '_booking_salon_ids', set()))
+
+
+@receiver(post_save, sender=Service)
+def service_changed(sender, instance, created, **kwargs):
+    salon_ids = {instance.salon_id, getattr(instance, '_persisted_salon_id', None)}
+    if created:
+        services_saved(salon_ids, created_ids=[instance.pk])
+    else:
+        services_saved(salon_ids, updated_ids=[instance.pk])
+    instance._persisted_salon_id = instance.salon_id
+
+
+@receiver(post_delete, sender=Service)
+def service_removed(sender, instance, **kwargs):
+    service_deleted(instance)
+
+
+# ============ RATINGS ============
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_persisted_state', None)
+    current = {f: getattr(instance, f) for f in Review.TRACKED_FIELDS}
+    if created:
+        record_review_change(None, current)
+    elif previous is None:
+        # Previous rating unknown (deferred fields or unsaved copy)
+        barber_ids = [instance.barber_id] if instance.barber_id else []
+        rebuild_ratings([instance.salon_id], barber_ids)
+    else:
+        record_review_change(previous, current)
+    # Barber lists show ratings
+    bump_salon_version(instance.salon_id)
+    instance.remember_state()
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, origin=None, **kwargs):
+    state = getattr(instance, '_persisted_state', None) or {
+        f: getattr(instance, f) for f in Review.TRACKED_FIELDS
+    }
+    if isinstance(origin, Salon):
+        # Only the barber's rating outlives the salon
+        state = dict(state, salon_id=None)
+    record_review_change(state, None)
+    bump_salon_version(instance.salon_id)
+
+
+# ============ AVAILABILITY CACHE ============
+
+@receiver(post_save, sender=Salon)
+def invalidate_salon_availability(sender, instance, **kwargs):
+    # Opening hours changed
+    invalidate_availability(instance.pk)
@@ -0,0 +1,189 @@
+"""
+Incrementally maintained salon statistics.
+
+``SalonStats`` holds one row of booking counters per salon. Booking and
+barber changes apply small ``F()`` deltas to that row through the helpers
+in ``core.derived``, so the owner dashboard reads one row instead
+of re-aggregating the salon's whole booking history. ``rebuild_salon_stats``
+recomputes rows from scratch with grouped aggregates and is used to create
+missing rows and by the ``rebuild_salon_stats`` management command.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Barber, BarberJoinRequest, Booking, Salon, SalonStats, Service
+
+CONFIRMED_STATUSES = ('confirmed', 'in_progress', 'completed')
+COUNTER_FIELDS = ('confirmed_bookings', 'completed_bookings', 'pending_bookings', 'cancelled_bookings')
+STATS_FIELDS = COUNTER_FIELDS + ('total_revenue', 'total_barbers')
+
+# Same definitions the dashboard has always used
+CONFIRMED = Q(status__in=CONFIRMED_STATUSES, barber__isnull=False)
+COMPLETED = Q(status='completed', barber__isnull=False)
+PENDING = Q(status='pending', barber__isnull=True)
+CANCELLED = Q(status='cancelled')
+
+
+def booking_contribution(status, has_barber):
+    """How much a single booking adds to each counter"""
+    return {
+        'confirmed_bookings': int(has_barber and status in CONFIRMED_STATUSES),
+        'completed_bookings': int(has_barber and status == 'completed'),
+        'pending_bookings': int(not has_barber and status == 'pending'),
+        'cancelled_bookings': int(status == 'cancelled'),
+    }
+
+
+def record_booking_change(old_state, new_state):
+    """
+    Apply the difference between two booking states to SalonStats.
+
+    States are dicts of ``Booking.TRACKED_FIELDS``; ``None`` means the
+    booking did not exist (creation) or no longer exists (deletion).
+    """
+    record_booking_changes([(old_state, new_state)])
+
+
+def record_booking_changes(changes):
+    """Apply many ``(old_state, new_state)`` pairs with one UPDATE per salon"""
+    deltas = defaultdict(lambda: defaultdict(int))
+    states = [(state, sign) for old, new in changes for state, sign in ((old, -1), (new, 1))]
+    for state, sign in states:
+        if state is None:
+            continue
+        counters = deltas[state['salon_id']]
+        has_barber = state['barber_id'] is not None
+        for field, value in booking_contribution(state['status'], has_barber).items():
+            counters[field] += sign * value
+        if has_barber and state['status'] == 'completed':
+            price = Service.objects.filter(pk=state['service_id']).values_list('price', flat=True).first()
+            counters['total_revenue'] += sign * (price or Decimal('0'))
+
+    for salon_id, counters in deltas.items():
+        apply_deltas(salon_id, counters)
+
+
+def apply_deltas(salon_id, counters):
+    changes = {field: F(field) + value for field, value in counters.items() if value}
+    if not changes:
+        return
+    updated = SalonStats.objects.filter(salon_id=salon_id).update(updated_at=timezone.now(), **changes)
+    if not updated:
+        # First change for this salon: seed the row from the current data
+        rebuild_salon_stats([salon_id])
+
+
+def refresh_barber_count(salon_ids):
+    for salon_id in {pk for pk in salon_ids if pk is not None}:
+        count = Barber.objects.filter(salon_id=OuterRef('salon_id')).order_by().values('salon_id').annotate(
+            total=Count('id')
+        ).values('total')
+        updated = SalonStats.objects.filter(salon_id=salon_id).update(
+            total_barbers=Coalesce(Subquery(count, output_field=IntegerField()), Value(0)),
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            rebuild_salon_stats([salon_id])
+
+
+def refresh_revenue(salon_id):
+    """Recompute revenue after a service price change"""
+    revenue = Booking.objects.filter(COMPLETED, salon_id=OuterRef('salon_id')).order_by().values('salon_id').annotate(
+        total=Sum('service__price')
+    ).values('total')
+    output = DecimalField(max_digits=12, decimal_places=2)
+    SalonStats.objects.filter(salon_id=salon_id).update(
+        total_revenue=Coalesce(Subquery(revenue, output_field=output), Value(Decimal('0')), output_field=output),
+        updated_at=timezone.now(),
+    )
+
+
+def compute_salon_stats(salon_ids=None):
+    """Aggregate stats from scratch: one grouped query over bookings, one over barbers"""
+    salons = Salon.objects.all()
+    bookings = Booking.objects.all()
+    barbers = Barber.objects.filter(salon__isnull=False)
+    if salon_ids is not None:
+        salons = salons.filter(pk__in=salon_ids)
+        bookings = bookings.filter(salon_id__in=salon_ids)
+        barbers = barbers.filter(salon_id__in=salon_ids)
+
+    result = {
+        pk: dict.fromkeys(COUNTER_FIELDS + ('total_barbers',), 0) | {'total_revenue': Decimal('0.00')}
+        for pk in salons.values_list('pk', flat=True)
+    }
+    booking_rows = bookings.order_by().values('salon_id').annotate(
+        confirmed_bookings=Count('id', filter=CONFIRMED),
+        completed_bookings=Count('id', filter=COMPLETED),
+        pending_bookings=Count('id', filter=PENDING),
+        cancelled_bookings=Count('id', filter=CANCELLED),
+        total_revenue=Sum('service__price', filter=COMPLETED),
+    )
+    for row in booking_rows:
+        salon_id = row.pop('salon_id')
+        if salon_id in result:
+            row['total_revenue'] = row['total_revenue'] or Decimal('0.00')
+            result[salon_id].update(row)
+    for row in barbers.order_by().values('salon_id').annotate(total=Count('id')):
+        if row['salon_id'] in result:
+            result[row['salon_id']]['total_barbers'] = row['total']
+    return result
+
+
+def rebuild_salon_stats(salon_ids=None):
+    """Recompute and upsert SalonStats rows; returns the number written"""
+    computed = compute_salon_stats(salon_ids)
+    now = timezone.now()
+    SalonStats.objects.bulk_create(
+        [SalonStats(salon_id=pk, updated_at=now, **values) for pk, values in computed.items()],
+        update_conflicts=True,
+        unique_fields=['salon'],
+        update_fields=list(STATS_FIELDS) + ['updated_at'],
+        batch_size=500,
+    )
+    return len(computed)
+
+
+def verify_salon_stats(salon_ids=None):
+    """Return ``{salon_id: {field: (stored, expected)}}`` for every drifted row"""
+    computed = compute_salon_stats(salon_ids)
+    stored = SalonStats.objects.filter(salon_id__in=computed.keys()).in_bulk()
+    drift = {}
+    for pk, expected in computed.items():
+        row = stored.get(pk)
+        diffs = {
+            field: (getattr(row, field, None), value)
+            for field, value in expected.items()
+            if row is None or getattr(row, field) != value
+        }
+        if diffs:
+            drift[pk] = diffs
+    return drift
+
+
+def portfolio_stats(owner):
+    """
+    ``[(salon, stats, pending_join_requests)]`` for every salon ``owner``
+    has: one query for the salons with their SalonStats rows and one
+    grouped query for join requests, however many salons there are.
+    Rows are created with the salon; any still missing (salons from before
+    that) are seeded first, as the dashboard does.
+    """
+    salons = list(Salon.objects.filter(owner=owner).select_related('stats').order_by('pk'))
+    missing = [salon.pk for salon in salons if not hasattr(salon, 'stats')]
+    if missing:
+        rebuild_salon_stats(missing)
+        seeded = SalonStats.objects.in_bulk(missing)
+        for salon in salons:
+            if salon.pk in seeded:
+                salon.stats = seeded[salon.pk]
+
+    pending = dict(
+        BarberJoinRequest.objects.filter(salon__owner=owner, status='pending')
+        .order_by().values('salon_id').annotate(total=Count('id')).values_list('salon_id', 'total')
+    )
+    return [(salon, salon.stats, pending.get(salon.pk, 0)) for salon in salons]
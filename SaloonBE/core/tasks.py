@@ -0,0 +1,28 @@
+"""Job handlers for work that can run outside the request (see core/jobs.py)"""
+from datetime import date
+
+from .jobs import register
+from .ratings import rebuild_ratings
+from .rollups import roll_up
+from .scheduling import auto_assign
+from .stats import rebuild_salon_stats
+
+
+@register('stats.rebuild')
+def rebuild_stats_job(salon_ids=None):
+    rebuild_salon_stats(salon_ids)
+
+
+@register('ratings.rebuild')
+def rebuild_ratings_job(salon_ids=None, barber_ids=None):
+    rebuild_ratings(salon_ids, barber_ids)
+
+
+@register('rollups.roll_up')
+def roll_up_job(salon_id):
+    roll_up(salon_id)
+
+
+@register('bookings.auto_assign')
+def auto_assign_job(salon_id, date_iso):
+    auto_assign(salon_id, date.fromisoformat(date_iso))
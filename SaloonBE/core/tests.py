@@ -1,3 +1,1901 @@
-from django.test import TestCase
+import asyncio
+import csv
+import importlib
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO
+from time import monotonic
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import ClaimsRefreshToken, cache_token_version
+from .availability import get_availability
+from .bulk import apply_bulk_operation
+from .etags import salon_version
+from .events import publish_booking_event
+from .exports import BOOKING_EXPORT_COLUMNS
+from . import geo
+from .geo import bounding_box, closest, grid_cell, haversine_km, nearby_filter
+from .jobs import REGISTRY, Worker, claim_jobs, enqueue, enqueue_once, register, requeue_stale, run_job
+from .models import (
+    Barber, BarberJoinRequest, Booking, DailySalonStats, Job, Payment, Review, Salon, SalonStats, Service, SlotClaim,
+    User,
+)
+from .queues import QUEUES, SalonQueue
+from .ratings import rebuild_ratings
+from .readpath import BARBER_DETAIL_READER, BOOKING_READER, SALON_LIST_READER
+from .renderers import FastJSONParser, FastJSONRenderer
+from .reservations import SlotUnavailable, claim_slot, snapshot, sync_claims
+from .search import SALON_INDEX, SERVICE_INDEX, FullTextSearchFilter
+from .responsecache import cache_stats, response_cache
+from .rollups import period_start, reset_rollups
+from .scheduling import auto_assign
+from .serializers import BarberDetailSerializer, BookingSerializer, SalonListSerializer
+from .stats import COUNTER_FIELDS, STATS_FIELDS, rebuild_salon_stats, verify_salon_stats
+from .views import stream_topics
+
+
+def make_user(username, user_type, **extra):
+    return User.objects.create_user(
+        username=username, password='pass1234', user_type=user_type,
+        phone=f'99{User.objects.count():08d}', **extra
+    )
+
+
+def make_salon(owner, name='Fade Factory', **extra):
+    fields = dict(
+        description='Cuts and shaves', address='MG Road',
+        latitude=17.385, longitude=78.4867, phone='1234567890',
+        opening_time=time(9), closing_time=time(21),
+    )
+    fields.update(extra)
+    return Salon.objects.create(owner=owner, name=name, **fields)
+
+
+def api_client(user=None):
+    client = APIClient()
+    if user is not None:
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {ClaimsRefreshToken.for_user(user).access_token}')
+    return client
+
+
+# ============ QUERY BUDGET TESTS ============
+
+@override_settings(QUERY_BUDGET_ENFORCE=True)
+class QueryBudgetTests(TestCase):
+    """List and detail endpoints run a constant number of queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', 'owner', first_name='Olivia')
+        cls.customer = make_user('customer', 'customer', first_name='Carl')
+        cls.barber_user = make_user('barber', 'barber', first_name='Bob')
+        cls.salon = make_salon(cls.owner)
+        cls.service = Service.objects.create(
+            salon=cls.salon, name='Haircut', description='Classic cut', price=250, duration=30
+        )
+        cls.barber = Barber.objects.create(user=cls.barber_user, salon=cls.salon)
+        BarberJoinRequest.objects.create(barber=make_user('applicant', 'barber'), salon=cls.salon)
+
+    def add_bookings(self, count):
+        for i in range(count):
+            booking = Booking.objects.create(
+                customer=self.customer, salon=self.salon, service=self.service,
+                barber=self.barber if i % 2 else None,
+                booking_date=date.today() + timedelta(days=i % 5), booking_time=time(10 + i % 8),
+                status='completed',
+            )
+            Payment.objects.create(booking=booking, amount=250, payment_method='cash')
+            Review.objects.create(
+                booking=booking, customer=self.customer, salon=self.salon,
+                barber=booking.barber, rating=5, comment='Great',
+            )
+
+    def count_queries(self, user, url):
+        client = api_client(user)
+        if user is not None:
+            # Measure with the token version cached, as after a user's first request
+            cache_token_version(User.objects.get(pk=user.pk))
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(ctx)
+
+    def assert_constant(self, user, url):
+        """Query count must not grow with the number of rows returned"""
+        self.add_bookings(2)
+        few = self.count_queries(user, url)
+        self.add_bookings(20)
+        many = self.count_queries(user, url)
+        self.assertEqual(few, many, url)
+
+    def test_booking_list(self):
+        for user in (self.owner, self.customer, self.barber_user):
+            with self.subTest(user=user.username):
+                self.assert_constant(user, '/api/bookings/')
+
+    def test_booking_detail(self):
+        self.add_bookings(2)
+        booking = Booking.objects.filter(barber__isnull=False).first()
+        self.count_queries(self.owner, f'/api/bookings/{booking.pk}/')
+
+    def test_payment_list(self):
+        self.assert_constant(self.owner, '/api/payments/')
+
+    def test_review_list(self):
+        self.assert_constant(None, '/api/reviews/')
+        self.assert_constant(self.owner, f'/api/reviews/?salon={self.salon.pk}')
+
+    def test_salon_list_and_detail(self):
+        for i in range(5):
+            make_salon(self.owner, name=f'Branch {i}')
+        self.count_queries(self.customer, '/api/salons/')
+        self.count_queries(self.customer, f'/api/salons/{self.salon.pk}/')
+
+    def test_service_and_barber_lists(self):
+        for i in range(5):
+            Service.objects.create(salon=self.salon, name=f'Extra {i}', description='', price=1, duration=15)
+        self.count_queries(None, f'/api/services/?salon={self.salon.pk}')
+        self.count_queries(self.owner, f'/api/barbers/?salon={self.salon.pk}')
+        self.count_queries(self.owner, f'/api/barbers/join-requests/?salon={self.salon.pk}')
+
+    def test_owner_portfolio(self):
+        def portfolio():
+            queries = self.count_queries(self.owner, '/api/salons/portfolio/')
+            return queries, api_client(self.owner).get('/api/salons/portfolio/').data
+
+        self.add_bookings(2)
+        few, data = portfolio()
+        for i in range(5):
+            branch = make_salon(self.owner, name=f'Branch {i}')
+            BarberJoinRequest.objects.create(barber=make_user(f'applicant{i}', 'barber'), salon=branch)
+        many, data = portfolio()
+        self.assertEqual(few, many)
+        self.assertEqual(data['salon_count'], 6)
+        self.assertEqual(data['salons'][0]['total_completed_bookings'], 1)
+        self.assertEqual(data['salons'][0]['total_revenue'], 250.0)
+        self.assertEqual(data['totals']['pending_join_requests'], 6)
+        self.assertEqual(data['totals']['total_barbers'], 1)
+        self.assertEqual(api_client(self.customer).get('/api/salons/portfolio/').status_code, 403)
+
+
+
+# ============ BULK BOOKING TESTS ============
+
+class BulkBookingTests(TestCase):
+    """POST /api/bookings/bulk/ applies all changes or none and keeps derived data in sync"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', 'owner')
+        cls.customer = make_user('customer', 'customer')
+        cls.salon = make_salon(cls.owner)
+        cls.service = Service.objects.create(salon=cls.salon, name='Haircut', description='', price=250, duration=30)
+        cls.barbers = [
+            Barber.objects.create(user=make_user(f'barber{i}', 'barber'), salon=cls.salon) for i in range(2)
+        ]
+
+    def setUp(self):
+        self.day = date.today() + timedelta(days=2)
+        self.bookings = []
+        for i in range(4):
+            booking = Booking.objects.create(
+                customer=self.customer, salon=self.salon, service=self.service,
+                barber=self.barbers[0] if i % 2 else None, status='confirmed' if i % 2 else 'pending',
+                booking_date=self.day, booking_time=time(10 + i),
+            )
+            claim_slot(booking)
+            self.bookings.append(booking)
+        self.ids = [booking.pk for booking in self.bookings]
+
+    def bulk(self, user, **data):
+        return api_client(user).post('/api/bookings/bulk/', data, format='json')
+
+    def test_reassign(self):
+        version = salon_version(self.salon.pk)
+        response = self.bulk(self.owner, operation='reassign', ids=self.ids, barber=self.barbers[1].pk)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual({b['barber_name'] for b in response.data['bookings']}, {'barber1'})
+        self.assertEqual(
+            set(Booking.objects.filter(pk__in=self.ids).values_list('barber', 'status')),
+            {(self.barbers[1].pk, 'confirmed')},
+        )
+        self.assertEqual(set(SlotClaim.objects.values_list('barber', flat=True)), {self.barbers[1].pk})
+        self.assertEqual(verify_salon_stats(), {})
+        self.assertNotEqual(salon_version(self.salon.pk), version)
+
+    def test_invalid_transition_changes_nothing(self):
+        Booking.objects.filter(pk=self.ids[0]).update(status='completed')
+        response = self.bulk(self.owner, operation='cancel', ids=self.ids)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.data['errors']), [self.ids[0]])
+        self.assertFalse(Booking.objects.filter(status='cancelled').exists())
+
+        response = self.bulk(self.owner, operation='cancel', ids=self.ids[1:])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Booking.objects.filter(status='cancelled').count(), 3)
+        self.assertEqual(SlotClaim.objects.filter(booking__in=self.ids[1:]).count(), 0)
+
+    def test_reschedule(self):
+        new_day = self.day + timedelta(days=1)
+        response = self.bulk(self.owner, operation='reschedule', ids=self.ids, booking_date=new_day.isoformat())
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(set(SlotClaim.objects.values_list('booking_date', flat=True)), {new_day})
+        self.assertEqual(
+            sorted(Booking.objects.filter(pk__in=self.ids).values_list('booking_time', flat=True)),
+            [time(10), time(11), time(12), time(13)],
+        )
+        self.assertEqual(verify_salon_stats(), {})
+
+    def test_permissions(self):
+        barber = self.barbers[0].user
+        self.assertEqual(self.bulk(self.customer, operation='cancel', ids=self.ids).status_code, 403)
+        self.assertEqual(self.bulk(barber, operation='reassign', ids=self.ids, barber=1).status_code, 403)
+        # Barbers only see bookings assigned to them
+        response = self.bulk(barber, operation='cancel', ids=self.ids)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['ids'], [self.ids[0], self.ids[2]])
+        self.assertEqual(self.bulk(barber, operation='cancel', ids=[self.ids[1]]).status_code, 200)
+
+
+
+# ============ SERVICE CATALOG TESTS ============
+
+class ServiceCatalogTests(TestCase):
+    """Catalog import upserts by name in bulk; export streams the same columns back"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', 'owner')
+        cls.salon = make_salon(cls.owner)
+        cls.haircut = Service.objects.create(salon=cls.salon, name='Haircut', description='Classic', price=250, duration=30)
+
+    def setUp(self):
+        response_cache().clear()
+
+    def upload(self, name, body, user=None):
+        file = SimpleUploadedFile(name, body.encode(), content_type='text/csv')
+        return api_client(user or self.owner).post(
+            f'/api/salons/{self.salon.pk}/services/import/', {'file': file}, format='multipart'
+        )
+
+    def test_csv_import_upserts_by_name(self):
+        url = f'/api/services/?salon={self.salon.pk}'
+        self.assertEqual(len(api_client().get(url).data), 1)
+        response = self.upload('services.csv', (
+            'name,description,price,duration,is_active,image\n'
+            'Haircut,Classic,300.00,30,true,\n'
+            'Beard Trim,"Shape, line and oil",150,20,,\n'
+        ))
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data, {'created': 1, 'updated': 1, 'unchanged': 0})
+        self.haircut.refresh_from_db()
+        self.assertEqual(self.haircut.price, Decimal('300.00'))
+        # Cached list, search index and ETag all see the new service
+        self.assertEqual(len(api_client().get(url).data), 2)
+        found = api_client().get('/api/services/?search=beard').data
+        self.assertEqual([service['name'] for service in found], ['Beard Trim'])
+
+    def test_invalid_row_rolls_back_every_batch(self):
+        rows = ''.join(f'Service {i},Desc,100,30,true,\n' for i in range(5))
+        with mock.patch('core.catalog.IMPORT_BATCH_SIZE', 2):
+            response = self.upload('services.csv', (
+                'name,description,price,duration,is_active,image\n' + rows + 'Broken,Desc,abc,0,true,\n'
+            ))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.data['errors']], [6])
+        self.assertEqual(set(response.data['errors'][0]['errors']), {'price', 'duration'})
+        self.assertEqual(Service.objects.filter(salon=self.salon).count(), 1)
+
+    def test_undecodable_csv_is_rejected(self):
+        file = SimpleUploadedFile('services.csv', b'\xff\xfename,price\n', content_type='text/csv')
+        response = api_client(self.owner).post(
+            f'/api/salons/{self.salon.pk}/services/import/', {'file': file}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIsNone(response.data['errors'][0]['row'])
+
+        body = 'name,price,duration\nBeard Trim,150,20\n'.encode() + b'Shave\xff,99,15\n'
+        file = SimpleUploadedFile('services.csv', body, content_type='text/csv')
+        response = api_client(self.owner).post(
+            f'/api/salons/{self.salon.pk}/services/import/', {'file': file}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0]['row'], 2)
+        self.assertIn('Invalid CSV', response.data['errors'][0]['errors'])
+        self.assertFalse(Service.objects.filter(name='Beard Trim').exists())
+
+    def test_export_round_trips(self):
+        Service.objects.create(salon=self.salon, name='Shave', description='Hot towel', price=99, duration=15)
+        client = api_client(self.owner)
+        csv_body = b''.join(client.get(f'/api/salons/{self.salon.pk}/services/export/').streaming_content)
+        self.assertEqual(self.upload('services.csv', csv_body.decode()).data, {'created': 0, 'updated': 0, 'unchanged': 2})
+
+        response = client.get(f'/api/salons/{self.salon.pk}/services/export/?type=json')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        rows = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([(row['name'], row['price']) for row in rows], [('Haircut', '250.00'), ('Shave', '99.00')])
+
+    def test_only_owner(self):
+        other = make_user('other', 'owner')
+        self.assertEqual(self.upload('services.csv', 'name\n', user=other).status_code, 404)
+        customer = make_user('customer', 'customer')
+        self.assertEqual(self.upload('services.csv', 'name\n', user=customer).status_code, 403)
+
+    def test_search_limit_applies_after_scoping(self):
+        other = make_salon(self.owner, name='Haircut Hub')
+        Service.objects.bulk_create([
+            Service(salon=other, name=f'Haircut {i}', description='', price=100, duration=30) for i in range(4)
+        ])
+        Salon.objects.filter(pk=other.pk).update(is_active=False)
+        SERVICE_INDEX.rebuild()
+        SALON_INDEX.rebuild()
+        with mock.patch.object(FullTextSearchFilter, 'max_results', 2):
+            found = api_client().get(f'/api/services/?salon={self.salon.pk}&search=haircut').data
+            self.assertEqual([service['name'] for service in found], ['Haircut'])
+            # The inactive salon ranks first but is not listed, so it must not use up the limit
+            found = api_client(make_user('customer', 'customer')).get('/api/salons/?search=haircut').data
+            self.assertEqual([salon['name'] for salon in found], ['Fade Factory'])
+
+    def test_search_ranks_name_matches_first(self):
+        Service.objects.create(salon=self.salon, name='Shave', description='Beard oil and a hot towel', price=99, duration=15)
+        Service.objects.create(salon=self.salon, name='Beard Trim', description='', price=150, duration=20)
+        found = api_client().get('/api/services/?search=beard').data
+        self.assertEqual([service['name'] for service in found], ['Beard Trim', 'Shave'])
+
+    def test_search_only_sees_the_callers_salons(self):
+        rival = make_user('rival', 'owner')
+        make_salon(rival, name='Haircut Heaven')
+
+        def names(user):
+            return [salon['name'] for salon in api_client(user).get('/api/salons/?search=haircut').data]
+
+        self.assertEqual(names(make_user('customer', 'customer')), ['Haircut Heaven', 'Fade Factory'])
+        self.assertEqual(names(self.owner), ['Fade Factory'])
+        self.assertEqual(names(rival), ['Haircut Heaven'])
+
+    def test_empty_scope_finds_nothing(self):
+        request = Request(APIRequestFactory().get('/api/services/', {'search': 'haircut'}))
+        view = mock.Mock(search_index=SERVICE_INDEX, search_fields=['name'])
+        for label, scope in (('none()', Service.objects.none()), ('pk__in=[]', Service.objects.filter(pk__in=[]))):
+            with self.subTest(scope=label):
+                self.assertEqual(list(FullTextSearchFilter().filter_queryset(request, scope, view)), [])
+
+
+# ============ PAGINATION TESTS ============
+
+class KeysetPaginationTests(TestCase):
+    """Cursor pages walk a list in order, both ways, whatever the ordering"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', 'owner')
+        cls.customer = make_user('customer', 'customer')
+        cls.salon = make_salon(cls.owner)
+        cls.service = Service.objects.create(salon=cls.salon, name='Haircut', description='', price=250, duration=30)
+        day = date.today() + timedelta(days=1)
+        # Pairs share a date and time, so only the id tells them apart
+        for at in (time(9), time(9), time(10), time(10), time(11)):
+            Booking.objects.create(customer=cls.customer, salon=cls.salon, service=cls.service,
+                                   booking_date=day, booking_time=at)
+        for years in (3, 1, 3, 2, 1):
+            Barber.objects.create(user=make_user(f'barber{Barber.objects.count()}', 'barber'),
+                                  salon=cls.salon, experience_years=years)
+
+    def setUp(self):
+        response_cache().clear()
+
+    def walk(self, client, url):
+        """Follow next links from ``url``; returns the pages' ids and responses"""
+        pages = []
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200, response.data)
+            pages.append(response)
+            url = response.data['next']
+        return [[row['id'] for row in page.data['results']] for page in pages], pages
+
+    def test_pages_follow_the_default_ordering_with_id_breaking_ties(self):
+        client = api_client(self.customer)
+        expected = list(Booking.objects.order_by('-booking_date', '-booking_time', '-id').values_list('id', flat=True))
+        ids, pages = self.walk(client, '/api/bookings/?page_size=2')
+        self.assertEqual(ids, [expected[0:2], expected[2:4], expected[4:]])
+        self.assertIsNone(pages[0].data['previous'])
+
+        # Previous links lead back through the same pages
+        for page, earlier in zip(pages[:0:-1], ids[-2::-1]):
+            response = client.get(page.data['previous'])
+            self.assertEqual([row['id'] for row in response.data['results']], earlier)
+        first = client.get(pages[1].data['previous'])
+        self.assertIsNone(first.data['previous'])
+        self.assertEqual(first.data['next'], pages[0].data['next'])
+
+    def test_mixed_ascending_and_descending_ordering(self):
+        client = api_client(self.customer)
+        expected = list(Barber.objects.order_by('experience_years', '-id').values_list('id', flat=True))
+        ids, _ = self.walk(client, '/api/barbers/?ordering=experience_years&page_size=2')
+        self.assertEqual(sum(ids, []), expected)
+
+        expected = list(Barber.objects.order_by('-rating', 'experience_years', '-id').values_list('id', flat=True))
+        ids, _ = self.walk(client, '/api/barbers/?ordering=-rating,experience_years&page_size=3')
+        self.assertEqual(sum(ids, []), expected)
+
+    def test_search_results_keep_their_rank(self):
+        for name, description in (('Beard Trim', 'Beard shaping'), ('Shave', 'Hot towel and beard oil'), ('Beard Color', '')):
+            Service.objects.create(salon=self.salon, name=name, description=description, price=150, duration=20)
+        ranked = [row['id'] for row in api_client().get('/api/services/?search=beard').data]
+        # Newest first would be a different order
+        self.assertNotEqual(ranked, sorted(ranked, reverse=True))
+
+        ids, _ = self.walk(api_client(), '/api/services/?search=beard&page_size=1')
+        self.assertEqual(sum(ids, []), ranked)
+
+    def test_invalid_cursor_is_not_found(self):
+        client = api_client(self.customer)
+        self.assertEqual(client.get('/api/bookings/?cursor=not-a-cursor').status_code, 404)
+
+        # A cursor from one ordering is rejected under another
+        cursor = client.get('/api/barbers/?ordering=experience_years&page_size=2').data['next'].split('cursor=')[1]
+        cursor = cursor.split('&')[0]
+        self.assertEqual(client.get(f'/api/barbers/?cursor={cursor}').status_code, 404)
+
+
+# ============ EXPORT TESTS ============
+
+class ExportTests(TestCase):
+    """Booking and payment CSV exports stream the owner's rows with date and status filters"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', 'owner')
+        cls.customer = make_user('customer', 'customer')
+        cls.salon = make_salon(cls.owner)
+        other_salon = make_salon(make_user('other', 'owner'), name='Elsewhere')
+        for salon in (cls.salon, other_salon):
+            service = Service.objects.create(salon=salon, name='Haircut', description='', price=250, duration=30)
+            for day, booking_status in ((1, 'completed'), (2, 'cancelled'), (3, 'completed')):
+                booking = Booking.objects.create(
+                    customer=cls.customer, salon=salon, service=service, status=booking_status,
+                    booking_date=date(2026, 3, day), booking_time=time(10),
+                )
+                Payment.objects.create(booking=booking, amount=250, payment_method='cash',
+                                       status='refunded' if booking_status == 'cancelled' else 'completed')
+
+    def export(self, url, user=None):
+        response = api_client(user or self.owner).get(url)
+        if not response.streaming:
+            return response, None
+        return response, list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_booking_export_filters(self):
+        response, rows = self.export('/api/bookings/export/?start_date=2026-03-02&status=completed,cancelled')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(rows[0], [header for header, _ in BOOKING_EXPORT_COLUMNS])
+        self.assertEqual([(row[1], row[3], row[4]) for row in rows[1:]], [
+            ('2026-03-02', 'cancelled', 'Fade Factory'), ('2026-03-03', 'completed', 'Fade Factory'),
+        ])
+
+    def test_payment_export_filters(self):
+        _, rows = self.export('/api/payments/export/?status=completed')
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({(row[4], row[7], row[9]) for row in rows[1:]}, {('Fade Factory', '250.00', 'completed')})
+        today = date.today().isoformat()
+        _, rows = self.export(f'/api/payments/export/?start_date={today}&end_date={today}')
+        self.assertEqual(len(rows), 4)
+
+    def test_rejects_bad_filters_and_non_owners(self):
+        for query in ('start_date=03/01/2026', 'status=paid', 'start_date=2026-03-02&end_date=2026-03-01'):
+            with self.subTest(query=query):
+                self.assertEqual(self.export(f'/api/bookings/export/?{query}')[0].status_code, 400)
+        self.assertEqual(self.export('/api/payments/export/', user=self.customer)[0].status_code, 403)
+
+    async def test_asgi_export_streams_asynchronously(self):
+        token = await sync_to_async(AccessToken.for_user)(self.owner)
+        response = await AsyncClient().get('/api/bookings/export/', headers={'Authorization': f'Bearer {token}'})
+        # ASGIHandler reads the body with ``async for``; a sync iterator would be buffered whole
+        self.assertTrue(response.is_async)
+        body = ''.join([chunk.decode() async for chunk in response])
+        self.assertEqual(len(body.strip().splitlines()), 4)
+
+
+
+# ============ SALON STATS TESTS ============
+
+class SalonStatsTests(TestCase):
+    """Incremental SalonStats counters always equal a rebuild from the booking table"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', 'owner')
+        cls.customer = make_user('customer', 'customer')
+        cls.salon = make_salon(cls.owner)
+        cls.service = Service.objects.create(salon=cls.salon, name='Haircut', description='', price=250, duration=30)
+        cls.barber = Barber.objects.create(user=make_user('barber', 'barber'), salon=cls.salon)
+
+    def setUp(self):
+        self.day = date.today() + timedelta(days=1)
+
+    def stats(self):
+        return SalonStats.objects.filter(salon=self.salon).values(*STATS_FIELDS).get()
+
+    def assert_matches_rebuild(self):
+        self.assertEqual(verify_salon_stats([self.salon.pk]), {})
+        incremental = self.stats()
+        rebuild_salon_stats([self.salon.pk])
+        self.assertEqual(self.stats(), incremental)
+        return incremental
+
+    def create(self, at):
+        response = api_client(self.customer).post('/api/bookings/', {
+            'salon': self.salon.pk, 'service': self.service.pk,
+            'booking_date': self.day.isoformat(), 'booking_time': at,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def test_booking_lifecycle_through_the_api(self):
+        customer, barber = api_client(self.customer), api_client(self.barber.user)
+        first, second, third = self.create('10:00'), self.create('11:00'), self.create('12:00')
+        self.assertEqual(self.assert_matches_rebuild()['pending_bookings'], 3)
+
+        barber.patch(f'/api/bookings/{first}/', {'barber': self.barber.pk}, format='json')
+        for next_status in ('in_progress', 'completed'):
+            response = barber.patch(f'/api/bookings/{first}/', {'status': next_status}, format='json')
+            self.assertEqual(response.status_code, 200, response.data)
+        stats = self.assert_matches_rebuild()
+        self.assertEqual((stats['completed_bookings'], stats['total_revenue']), (1, Decimal('250.00')))
+
+        response = customer.patch(f'/api/bookings/{second}/', {'booking_time': '13:00', 'notes': 'Late'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assert_matches_rebuild()
+
+        self.assertEqual(customer.post(f'/api/bookings/{second}/cancel/').status_code, 200)
+        self.assertEqual(self.assert_matches_rebuild()['cancelled_bookings'], 1)
+
+        for booking_id in (first, second, third):
+            self.assertEqual(customer.delete(f'/api/bookings/{booking_id}/').status_code, 204)
+        stats = self.assert_matches_rebuild()
+        self.assertEqual(stats, dict.fromkeys(COUNTER_FIELDS, 0) | {'total_revenue': Decimal('0.00'), 'total_barbers': 1})
+
+    def test_verify_command_passes_when_counters_match(self):
+        self.create('10:00')
+        out = io.StringIO()
+        call_command('rebuild_salon_stats', '--verify', stdout=out)
+        self.assertIn('All salon stats are consistent', out.getvalue())
+
+    def test_verify_command_reports_drift_and_rebuild_fixes_it(self):
+        self.create('10:00')
+        SalonStats.objects.filter(salon=self.salon).update(pending_bookings=5, total_revenue=Decimal('99.00'))
+        out = io.StringIO()
+        with self.assertRaisesMessage(CommandError, '1 salon(s) have drifted stats'):
+            call_command('rebuild_salon_stats', '--verify', stdout=out)
+        self.assertIn(f'Salon {self.salon.pk}: pending_bookings: stored=5 expected=1, '
+                      'total_revenue: stored=99.00 expected=0.00', out.getvalue())
+
+        call_command('rebuild_salon_stats', '--salon', str(self.salon.pk), stdout=io.StringIO())
+        call_command('rebuild_salon_stats', '--verify', stdout=io.StringIO())
+        self.assertEqual(self.stats()['pending_bookings'], 1)
+
+
+# ============ TIME SERIES TESTS ============
+
+class TimeSeriesTests(TestCase):
+    """Past days are served from DailySalonStats, kept in sync with later booking changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', 'owner')
+        cls.customer = make_user('customer', 'customer')
+        cls.salon = make_salon(cls.owner)
+        cls.service = Service.objects.create(salon=cls.salon, name='Haircut', description='', price=200, duration=30)
+        cls.barber = Barber.objects.create(user=make_user('barber', 'barber'), salon=cls.salon)
+
+    def setUp(self):
+        self.today = date.today()
+        self.bookings = [
+            self.book(days_ago, booking_status)
+            for days_ago, booking_status in ((40, 'completed'), (40, 'cancelled'), (3, 'completed'), (0, 'completed'))
+        ]
+
+    def book(self, days_ago, booking_status):
+        return Booking.objects.create(
+            customer=self.customer, salon=self.salon, service=self.service, status=booking_status,
+            barber=self.barber if booking_status == 'completed' else None,
+            booking_date=self.today - timedelta(days=days_ago), booking_time=time(11),
+        )
+
+    def series(self, query='period=day&start_date={start}'):
+        start = (self.today - timedelta(days=60)).isoformat()
+        url = f'/api/salons/{self.salon.pk}/stats/timeseries/?' + query.format(start=start)
+        response = api_client(self.owner).get(url)
+        self.assertEqual(response.status_code, 200)
+        return {row['period_start']: row for row in response.data['results'] if row['bookings']}
+
+    def expected(self):
+        """The same series aggregated from the booking table"""
+        reset_rollups([self.salon.pk])
+        return self.series()
+
+    def test_daily_series_rolls_up_past_days(self):
+        days = self.series()
+        self.assertEqual(len(days), 3)
+        row = days[(self.today - timedelta(days=40)).isoformat()]
+        self.assertEqual(
+            (row['bookings'], row['completed_bookings'], row['cancelled_bookings'], row['revenue']), (2, 1, 1, 200.0)
+        )
+        self.assertEqual(days[self.today.isoformat()]['revenue'], 200.0)
+        self.assertEqual(DailySalonStats.objects.filter(salon=self.salon).count(), 2)
+        self.assertEqual(SalonStats.objects.get(salon=self.salon).rolled_up_through, self.today - timedelta(days=1))
+
+        # Today is still aggregated live; nothing before it is read from bookings again
+        self.book(0, 'cancelled')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.series()[self.today.isoformat()]['bookings'], 2)
+        booking_reads = [q['sql'] for q in queries.captured_queries if 'FROM "core_booking"' in q['sql']]
+        self.assertEqual(len(booking_reads), 1)
+
+    def test_lagging_rollups_are_caught_up_by_a_job(self):
+        rolled = self.series()
+        stats = SalonStats.objects.filter(salon=self.salon)
+        # A few days behind: served live meanwhile, the roll-up is queued once
+        stats.update(rolled_up_through=self.today - timedelta(days=5))
+        DailySalonStats.objects.filter(salon=self.salon, date__gt=self.today - timedelta(days=5)).delete()
+        self.assertEqual(self.series(), rolled)
+        self.assertEqual(self.series(), rolled)
+        self.assertEqual(Job.objects.filter(name='rollups.roll_up', status='queued').count(), 1)
+        Worker().run(once=True)
+        self.assertEqual(stats.get().rolled_up_through, self.today - timedelta(days=1))
+        self.assertEqual(self.series(), rolled)
+
+        # Too far behind for live reads: the read rolls up itself
+        stats.update(rolled_up_through=self.today - timedelta(days=30))
+        DailySalonStats.objects.filter(salon=self.salon, date__gt=self.today - timedelta(days=30)).delete()
+        self.assertEqual(self.series(), rolled)
+        self.assertEqual(stats.get().rolled_up_through, self.today - timedelta(days=1))
+        self.assertFalse(Job.objects.filter(status='queued').exists())
+
+    def test_changes_to_rolled_up_days(self):
+        self.series()
+        self.bookings[1].delete()
+        self.bookings[2].status = 'cancelled'
+        self.bookings[2].save()
+        self.book(20, 'completed')
+        apply_bulk_operation([self.book(30, 'pending')], 'cancel')
+        self.assertEqual(self.series(), self.expected())
+
+        self.service.price = 300
+        self.service.save()
+        self.assertFalse(DailySalonStats.objects.filter(salon=self.salon).exists())
+        self.assertEqual(self.series()[(self.today - timedelta(days=20)).isoformat()]['revenue'], 300.0)
+
+    def test_weekly_and_monthly_buckets(self):
+        for period in ('week', 'month'):
+            with self.subTest(period=period):
+                rows = list(self.series(f'period={period}&start_date={{start}}').values())
+                self.assertEqual(sum(row['bookings'] for row in rows), 4)
+                self.assertEqual(sum(row['revenue'] for row in rows), 600.0)
+                for row in rows:
+                    start = date.fromisoformat(row['period_start'])
+                    self.assertEqual(period_start(start, period), start)
+
+    def test_rejects_bad_params_and_non_owners(self):
+        url = f'/api/salons/{self.salon.pk}/stats/timeseries/'
+        for query in ('period=year', 'start_date=2026-13-01', 'start_date=2020-01-01&end_date=2026-01-01'):
+            with self.subTest(query=query):
+                self.assertEqual(api_client(self.owner).get(f'{url}?{query}').status_code, 400)
+        self.assertEqual(api_client(self.customer).get(url).status_code, 403)
+
+
+# ============ AVAILABILITY TESTS ============
+
+class AvailabilityTests(TestCase):
+    """Offered slots follow the slot-claim rules and change as soon as bookings, barbers or services do"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', 'owner')
+        cls.customer = make_user('customer', 'customer')
+        cls.salon = make_salon(cls.owner, opening_time=time(9), closing_time=time(12))
+        cls.haircut = Service.objects.create(salon=cls.salon, name='Haircut', description='', price=200, duration=30)
+        cls.color = Service.objects.create(salon=cls.salon, name='Color', description='', price=900, duration=60)
+        cls.barbers = [Barber.objects.create(user=make_user(f'barber{i}', 'barber'), salon=cls.salon) for i in range(2)]
+
+    def setUp(self):
+        cache.clear()
+        self.day = date.today() + timedelta(days=1)
+
+    def slots(self, service=None, barber=None):
+        return get_availability(self.salon, service or self.haircut, self.day, self.day, barber)[self.day]
+
+    def book(self, at, booking_status='confirmed', barber=None, service=None):
+        return Booking.objects.create(
+            customer=self.customer, salon=self.salon, service=service or self.haircut, barber=barber,
+            status=booking_status, booking_date=self.day, booking_time=at,
+        )
+
+    def set_available(self, barber, available):
+        barber.is_available = available
+        barber.save()
+
+    def test_slot_grid_fits_the_service(self):
+        self.assertEqual(self.slots(), ['09:00', '09:30', '10:00', '10:30', '11:00', '11:30'])
+        self.assertEqual(self.slots(self.color), ['09:00', '09:30', '10:00', '10:30', '11:00'])
+
+    def test_busy_and_free_statuses(self):
+        self.set_available(self.barbers[1], False)
+        self.book(time(10), barber=self.barbers[0])
+        self.book(time(11), 'pending')
+        self.book(time(9), 'cancelled', barber=self.barbers[0])
+        self.book(time(9, 30), 'completed', barber=self.barbers[0])
+        self.assertEqual(self.slots(), ['09:00', '09:30', '10:30', '11:30'])
+        self.assertEqual(self.slots(self.color), ['09:00'])
+
+    def test_capacity_counts_every_booking_and_barbers_their_own(self):
+        first, second = self.barbers
+        self.book(time(10), 'pending')
+        self.assertIn('10:00', self.slots())
+        self.assertIn('10:00', self.slots(barber=first))
+
+        # Both seats taken: no barber can take 10:00, even with a free chair
+        self.book(time(10), barber=second)
+        self.assertNotIn('10:00', self.slots())
+        self.assertNotIn('10:00', self.slots(barber=first))
+
+        self.book(time(11), barber=second)
+        self.assertIn('11:00', self.slots(barber=first))
+        self.assertNotIn('11:00', self.slots(barber=second))
+        self.assertNotIn('10:30', self.slots(self.color, barber=second))
+
+    def test_salon_without_barbers_takes_one_booking_per_slot(self):
+        for barber in self.barbers:
+            self.set_available(barber, False)
+        self.assertIn('10:00', self.slots())
+        self.book(time(10), 'pending')
+        self.assertNotIn('10:00', self.slots())
+        self.assertEqual(self.slots(barber=self.barbers[0]), [])
+
+    def test_offered_slots_are_the_ones_claims_accept(self):
+        first, second = self.barbers
+        for at, barber, service in ((time(9), first, self.color), (time(10), None, self.haircut),
+                                    (time(10, 30), second, self.haircut)):
+            claim_slot(self.book(at, 'confirmed' if barber else 'pending', barber, service))
+
+        for service, barber in ((self.haircut, None), (self.color, None), (self.haircut, first), (self.color, second)):
+            offered = set(self.slots(service, barber))
+            for minutes in range(9 * 60, 12 * 60 - service.duration + 1, 30):
+                at = time(minutes // 60, minutes % 60)
+                with self.subTest(service=service.name, barber=barber and barber.pk, at=at):
+                    savepoint = transaction.savepoint()
+                    try:
+                        claim_slot(self.book(at, 'confirmed' if barber else 'pending', barber, service))
+                        accepted = True
+                    except SlotUnavailable:
+                        accepted = False
+                    transaction.savepoint_rollback(savepoint)
+                    self.assertEqual(accepted, at.strftime('%H:%M') in offered)
+
+    def test_changes_invalidate_cached_slots(self):
+        self.set_available(self.barbers[1], False)
+        self.assertIn('10:00', self.slots())
+        booking = self.book(time(10), barber=self.barbers[0])
+        self.assertNotIn('10:00', self.slots())
+        booking.status = 'cancelled'
+        booking.save()
+        self.assertIn('10:00', self.slots())
+
+        self.book(time(10), 'pending')
+        self.assertNotIn('10:00', self.slots())
+        self.set_available(self.barbers[1], True)
+        self.assertIn('10:00', self.slots())
+
+        self.haircut.duration = 90
+        self.haircut.save()
+        self.assertEqual(self.slots(), ['09:00', '09:30', '10:00', '10:30'])
+
+
+# ============ RESERVATION TESTS ============
+
+class ReservationTests(TestCase):
+    """Bookings hold slot claims that follow their status, time and barber through the API"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', 'owner')
+        cls.customers = [make_user(f'customer{i}', 'customer') for i in range(3)]
+        cls.salon = make_salon(cls.owner, opening_time=time(9), closing_time=time(12))
+        cls.haircut = Service.objects.create(salon=cls.salon, name='Haircut', description='', price=200, duration=60)
+        cls.barbers = [Barber.objects.create(user=make_user(f'barber{i}', 'barber'), salon=cls.salon) for i in range(2)]
+
+    def setUp(self):
+        cache.clear()
+        self.day = date.today() + timedelta(days=1)
+
+    def create(self, customer, at):
+        return api_client(customer).post('/api/bookings/', {
+            'salon': self.salon.pk, 'service': self.haircut.pk,
+            'booking_date': self.day.isoformat(), 'booking_time': at,
+        }, format='json')
+
+    def claims(self, booking_id):
+        return sorted(SlotClaim.objects.filter(booking_id=booking_id).values_list('cell', 'barber_id'))
+
+    def test_create_claims_every_cell_the_booking_covers(self):
+        response = self.create(self.customers[0], '10:00')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.claims(response.data['id']), [(600, None), (630, None)])
+
+    def test_slot_capacity_is_one_booking_per_available_barber(self):
+        self.assertEqual(self.create(self.customers[0], '10:00').status_code, 201)
+        self.assertEqual(self.create(self.customers[1], '10:30').status_code, 201)
+
+        # 10:30 is held by both bookings; overlapping it fails without leaving a booking behind
+        response = self.create(self.customers[2], '10:30')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['error'], 'This time slot is fully booked')
+        self.assertFalse(Booking.objects.filter(customer=self.customers[2]).exists())
+        self.assertEqual(self.create(self.customers[2], '11:00').status_code, 201)
+
+        self.barbers[1].is_available = False
+        self.barbers[1].save()
+        self.assertEqual(self.create(self.customers[2], '09:30').status_code, 409)
+        self.assertEqual(self.create(self.customers[2], '09:00').status_code, 201)
+
+    def test_moving_a_booking_reclaims_its_cells(self):
+        booking_id = self.create(self.customers[0], '09:00').data['id']
+        other_id = self.create(self.customers[1], '10:00').data['id']
+        self.create(self.customers[2], '10:00')
+
+        response = api_client(self.customers[0]).patch(f'/api/bookings/{booking_id}/', {'booking_time': '11:00'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.claims(booking_id), [(660, None), (690, None)])
+
+        # 10:00 is full, so the move fails and the booking keeps its claims
+        response = api_client(self.customers[0]).patch(f'/api/bookings/{booking_id}/', {'booking_time': '10:00'}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Booking.objects.get(pk=booking_id).booking_time, time(11))
+        self.assertEqual(self.claims(booking_id), [(660, None), (690, None)])
+        self.assertEqual(self.claims(other_id), [(600, None), (630, None)])
+
+    def test_assigning_a_barber_moves_the_claims_onto_them(self):
+        first_id = self.create(self.customers[0], '10:00').data['id']
+        second_id = self.create(self.customers[1], '10:30').data['id']
+        barber = api_client(self.barbers[0].user)
+
+        response = barber.patch(f'/api/bookings/{first_id}/', {'barber': self.barbers[0].pk}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.claims(first_id), [(600, self.barbers[0].pk), (630, self.barbers[0].pk)])
+
+        # The barber is busy at 10:30 with the first booking
+        response = barber.patch(f'/api/bookings/{second_id}/', {'barber': self.barbers[0].pk}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['error'], 'Barber already has a booking at this time')
+        self.assertIsNone(Booking.objects.get(pk=second_id).barber_id)
+        self.assertEqual(self.claims(second_id), [(630, None), (660, None)])
+
+    def test_cancelling_and_finishing_release_the_claims(self):
+        booking_id = self.create(self.customers[0], '10:00').data['id']
+        response = api_client(self.customers[0]).post(f'/api/bookings/{booking_id}/cancel/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.claims(booking_id), [])
+
+        booking_id = self.create(self.customers[1], '10:00').data['id']
+        response = api_client(self.customers[1]).patch(f'/api/bookings/{booking_id}/', {'status': 'cancelled'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.claims(booking_id), [])
+
+        booking_id = self.create(self.customers[2], '10:00').data['id']
+        barber = api_client(self.barbers[0].user)
+        barber.patch(f'/api/bookings/{booking_id}/', {'barber': self.barbers[0].pk}, format='json')
+        for next_status in ('in_progress', 'completed'):
+            response = barber.patch(f'/api/bookings/{booking_id}/', {'status': next_status}, format='json')
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.claims(booking_id), [])
+
+    def test_reactivated_booking_claims_again(self):
+        booking = Booking.objects.create(
+            customer=self.customers[0], salon=self.salon, service=self.haircut,
+            status='cancelled', booking_date=self.day, booking_time=time(10),
+        )
+        before = snapshot(booking)
+        booking.status = 'pending'
+        booking.save()
+        sync_claims(booking, before)
+        self.assertEqual(self.claims(booking.pk), [(600, None), (630, None)])
+
+
+# ============ GEO TESTS ============
+
+def spread(lats, lngs):
+    """Every combination of the given coordinates, longitudes wrapped into [-180, 180)"""
+    return [(round(lat, 6), round((lng + 180) % 360 - 180, 6)) for lat in lats for lng in lngs]
+
+
+def steps(start, stop, step):
+    return [start + i * step for i in range(int(round((stop - start) / step)) + 1)]
+
+
+class GeoTests(TestCase):
+    """The grid/bounding-box prefilter never drops a salon that is within the radius"""
+
+    CENTERS = {
+        'city': (17.385, 78.4867),
+        'antimeridian': (-17.0, 179.98),
+        'pole': (89.95, 30.0),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = make_user('owner', 'owner')
+        points = (
+            spread(steps(17.285, 17.485, 0.01), steps(78.3867, 78.5867, 0.01))
+            + spread(steps(-17.2, -16.8, 0.02), steps(179.68, 180.28, 0.03))
+            + spread(steps(89.5, 90.0, 0.05), steps(-180, 165, 15))
+        )
+        Salon.objects.bulk_create([
+            Salon(owner=owner, name=f'Salon {i}', description='', address='', phone='1234567890',
+                  latitude=lat, longitude=lng, geo_cell=grid_cell(lat, lng),
+                  opening_time=time(9), closing_time=time(21))
+            for i, (lat, lng) in enumerate(points)
+        ])
+        cls.points = [(pk, float(lat), float(lng)) for pk, lat, lng in Salon.objects.values_list('pk', 'latitude', 'longitude')]
+
+    def where(self, condition):
+        return str(Salon.objects.filter(condition).query).split(' WHERE ')[1]
+
+    def within(self, lat, lng, radius_km, pks):
+        return {pk for pk, p_lat, p_lng in self.points if pk in pks and haversine_km(lat, lng, p_lat, p_lng) <= radius_km}
+
+    def assert_prefilter_keeps_everything_within(self, center, radius_km):
+        lat, lng = self.CENTERS[center]
+        candidates = set(Salon.objects.filter(nearby_filter(lat, lng, radius_km)).values_list('pk', flat=True))
+        expected = self.within(lat, lng, radius_km, {pk for pk, _, _ in self.points})
+        self.assertTrue(expected)
+        self.assertEqual(self.within(lat, lng, radius_km, candidates), expected)
+        # A prefilter that lets everything through would pass too; it must trim
+        self.assertLess(len(candidates), len(self.points) // 2)
+        return candidates
+
+    def test_ordinary_radius(self):
+        for radius_km in (1, 5, 10):
+            with self.subTest(radius_km=radius_km):
+                self.assert_prefilter_keeps_everything_within('city', radius_km)
+        self.assertIn('geo_cell', self.where(nearby_filter(*self.CENTERS['city'], 5)))
+
+    def test_box_too_tall_for_the_grid_falls_back_to_coordinates(self):
+        self.assertNotIn('geo_cell', self.where(nearby_filter(*self.CENTERS['city'], 500)))
+        lat, lng = self.CENTERS['city']
+        candidates = set(Salon.objects.filter(nearby_filter(lat, lng, 500)).values_list('pk', flat=True))
+        self.assertEqual(candidates, self.within(lat, lng, 500, {pk for pk, _, _ in self.points}))
+
+    def test_box_crossing_the_antimeridian(self):
+        candidates = self.assert_prefilter_keeps_everything_within('antimeridian', 15)
+        longitudes = {p_lng for pk, _, p_lng in self.points if pk in candidates}
+        self.assertTrue(min(longitudes) < -179 and max(longitudes) > 179)
+
+    def test_box_covering_a_pole(self):
+        lat, lng = self.CENTERS['pole']
+        self.assertEqual(bounding_box(lat, lng, 30)[2], [(-180.0, 180.0)])
+        candidates = self.assert_prefilter_keeps_everything_within('pole', 30)
+        # Salons on the far side of the pole are within reach too
+        self.assertTrue(any(abs(p_lng - lng) >= 90 for pk, _, p_lng in self.points
+                            if pk in self.within(lat, lng, 30, candidates)))
+
+    def test_closest_slices_the_ranking(self):
+        lat, lng = self.CENTERS['city']
+        points = [(p_lat, p_lng) for _, p_lat, p_lng in self.points]
+        ranking = closest(lat, lng, points, 10)
+        distances = [distance for _, distance in ranking]
+        self.assertEqual(distances, sorted(distances))
+        self.assertEqual({i for i, _ in ranking}, {
+            i for i, (p_lat, p_lng) in enumerate(points) if haversine_km(lat, lng, p_lat, p_lng) <= 10
+        })
+        for limit, offset in ((1, 0), (5, 0), (5, 3), (None, 7), (50, len(ranking) - 2), (5, len(ranking) + 1)):
+            with self.subTest(limit=limit, offset=offset):
+                self.assertEqual(
+                    closest(lat, lng, points, 10, limit, offset),
+                    ranking[offset:None if limit is None else offset + limit],
+                )
+
+    def test_closest_without_numpy(self):
+        lat, lng = self.CENTERS['antimeridian']
+        points = [(p_lat, p_lng) for _, p_lat, p_lng in self.points]
+        # Duplicates tie on distance; both paths break ties on the index
+        points += points[:20]
+        expected = {(limit, offset): closest(lat, lng, points, 15, limit, offset)
+                    for limit, offset in ((None, 0), (10, 0), (10, 5))}
+        self.assertTrue(expected[None, 0])
+
+        with mock.patch.dict(sys.modules, {'numpy': None}):
+            importlib.reload(geo)
+        self.addCleanup(importlib.reload, geo)
+        self.assertIsNone(geo.np)
+        for (limit, offset), ranking in expected.items():
+            with self.subTest(limit=limit, offset=offset):
+                fallback = geo.closest(lat, lng, points, 15, limit, offset)
+                self.assertEqual([i for i, _ in fallback], [i for i, _ in ranking])
+                for (_, distance), (_, exact) in zip(fallback, ranking):
+                    self.assertAlmostEqual(distance, exact, places=9)
+
+
+# ============ LIVE QUEUE TESTS ============
+
+class LiveQueueTests(TestCase):
+    """Positions and wait estimates follow today's bookings as they change"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', 'owner')
+        cls.customer = make_user('customer', 'customer')
+        cls.salon = make_salon(cls.owner)
+        cls.haircut = Service.objects.create(salon=cls.salon, name='Haircut', description='', price=200, duration=30)
+        cls.color = Service.objects.create(salon=cls.salon, name='Color', description='', price=900, duration=45)
+        cls.barber = Barber.objects.create(user=make_user('barber', 'barber'), salon=cls.salon)
+        Barber.objects.create(user=make_user('barber2', 'barber'), salon=cls.salon)
+
+    def setUp(self):
+        cache.clear()
+        QUEUES.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first = self.book(time(10))
+            self.second = self.book(time(11), service=self.color)
+            self.third = self.book(time(12))
+            self.walk_ins = [self.book(time(10), barber=None), self.book(time(10, 30), barber=None)]
+
+    def book(self, at, barber=..., service=None):
+        barber = self.barber if barber is ... else barber
+        return Booking.objects.create(
+            customer=self.customer, salon=self.salon, service=service or self.haircut, barber=barber,
+            status='confirmed' if barber else 'pending', booking_date=timezone.localdate(), booking_time=at,
+        )
+
+    def stored(self, *bookings):
+        rows = dict(Booking.objects.values_list('pk', 'queue_position'))
+        waits = dict(Booking.objects.values_list('pk', 'estimated_wait_time'))
+        return [(rows[b.pk], waits[b.pk]) for b in bookings]
+
+    def set_status(self, booking, new_status):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.status = new_status
+            booking.save()
+
+    def test_status_changes_update_positions_and_waits(self):
+        lane = (self.first, self.second, self.third)
+        self.assertEqual(self.stored(*lane), [(1, 0), (2, 30), (3, 75)])
+        # Two barbers share the unassigned bookings
+        self.assertEqual(self.stored(*self.walk_ins), [(1, 0), (2, 15)])
+
+        self.set_status(self.first, 'in_progress')
+        self.assertEqual(self.stored(*lane), [(0, 0), (1, 30), (2, 75)])
+        self.set_status(self.first, 'completed')
+        self.assertEqual(self.stored(*lane), [(None, None), (1, 0), (2, 45)])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(api_client(self.customer).post(f'/api/bookings/{self.second.pk}/cancel/').status_code, 200)
+        self.assertEqual(self.stored(*lane), [(None, None), (None, None), (1, 0)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_bulk_operation([self.walk_ins[0]], 'reassign', barber=self.barber)
+        self.assertEqual(self.stored(self.walk_ins[0], self.third, self.walk_ins[1]), [(1, 0), (2, 30), (1, 0)])
+
+        # A rebuild from the database agrees with the incremental updates
+        before = {b.pk: (e.position, e.wait) for b in lane + tuple(self.walk_ins) if (e := QUEUES.lookup(b.pk))}
+        QUEUES.clear()
+        after = {pk: (e.position, e.wait) for pk in before if (e := QUEUES.lookup(pk, self.salon.pk))}
+        self.assertEqual(before, after)
+
+    def test_poll_is_answered_from_memory(self):
+        url = f'/api/bookings/{self.second.pk}/queue/'
+        client = api_client(self.customer)
+        cache_token_version(User.objects.get(pk=self.customer.pk))
+        with self.assertNumQueries(0):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['queue_position'], response.data['estimated_wait_time']), (2, 30))
+
+        self.assertEqual(api_client(make_user('stranger', 'customer')).get(url).status_code, 404)
+        self.set_status(self.second, 'cancelled')
+        response = api_client(self.customer).get(url)
+        self.assertEqual((response.data['status'], response.data['queue_position']), ('cancelled', None))
+
+    def test_changes_from_another_process_reload_the_salon(self):
+        self.assertEqual(QUEUES.lookup(self.third.pk).position, 3)
+        # Another worker cancels a booking and counts the change
+        Booking.objects.filter(pk=self.first.pk).update(status='cancelled')
+        cache.incr(f'queue:salon:{self.salon.pk}')
+        entry = QUEUES.lookup(self.third.pk)
+        self.assertEqual((entry.position, entry.wait), (2, 45))
+        self.assertEqual(self.stored(self.first, self.third), [(None, None), (2, 45)])
+
+    def test_salon_queue_for_owner_and_barbers(self):
+        url = f'/api/salons/{self.salon.pk}/queue/'
+        response = api_client(self.owner).get(url)
+        self.assertEqual(response.status_code, 200)
+        lanes = {lane['barber_id']: [b['booking_id'] for b in lane['bookings']] for lane in response.data['lanes']}
+        self.assertEqual(lanes, {
+            self.barber.pk: [self.first.pk, self.second.pk, self.third.pk],
+            None: [b.pk for b in self.walk_ins],
+        })
+        self.assertEqual(response.data['lanes'][-1]['barber_id'], None)
+        self.assertEqual(api_client(self.barber.user).get(url).status_code, 200)
+        self.assertEqual(api_client(self.customer).get(url).status_code, 403)
+
+    def test_loading_one_salon_does_not_block_another(self):
+        other = make_salon(make_user('rival', 'owner'), name='Rival Cuts')
+        self.assertEqual(len(QUEUES.lanes(self.salon.pk)[self.barber.pk]), 3)
+        loading, release = threading.Event(), threading.Event()
+
+        def slow_load(salon_id, version):
+            # Stands in for a load stuck on the database
+            loading.set()
+            release.wait(5)
+            return SalonQueue(salon_id, timezone.localdate(), version, 0, {})
+
+        with mock.patch.object(QUEUES, '_load', side_effect=slow_load):
+            loader = threading.Thread(target=QUEUES.lanes, args=(other.pk,))
+            loader.start()
+            try:
+                self.assertTrue(loading.wait(5))
+                started = monotonic()
+                self.assertEqual(QUEUES.lookup(self.first.pk).position, 1)
+                self.assertEqual(len(QUEUES.lanes(self.salon.pk)[None]), 2)
+                self.assertLess(monotonic() - started, 1)
+                self.assertFalse(release.is_set())
+            finally:
+                release.set()
+                loader.join()
+
+
+# ============ AUTO ASSIGNMENT TESTS ============
+
+class AutoAssignTests(TestCase):
+    """Pending bookings go to the least loaded available barber whose chair is free"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', 'owner')
+        cls.customer = make_user('customer', 'customer')
+        cls.salon = make_salon(cls.owner)
+        cls.haircut = Service.objects.create(salon=cls.salon, name='Haircut', description='', price=200, duration=30)
+        cls.color = Service.objects.create(salon=cls.salon, name='Color', description='', price=900, duration=60)
+        cls.barbers = [
+            Barber.objects.create(user=make_user(f'barber{i}', 'barber'), salon=cls.salon) for i in range(3)
+        ]
+        cls.barbers[2].is_available = False
+        cls.barbers[2].save()
+
+    def setUp(self):
+        self.day = date.today() + timedelta(days=1)
+
+    def book(self, at, service=None, barber=None):
+        return Booking.objects.create(
+            customer=self.customer, salon=self.salon, service=service or self.haircut, barber=barber,
+            status='confirmed' if barber else 'pending', booking_date=self.day, booking_time=at,
+        )
+
+    def test_respects_durations_and_existing_assignments(self):
+        first, second = self.barbers[:2]
+        claim_slot(self.book(time(10), service=self.color, barber=first))
+        pending = [self.book(time(10)), self.book(time(10)), self.book(time(10, 30)), self.book(time(11), self.color)]
+
+        self.assertEqual(auto_assign(self.salon.pk, self.day), (3, 1))
+        assigned = dict(Booking.objects.filter(pk__in=[b.pk for b in pending]).values_list('pk', 'barber_id'))
+        self.assertEqual([assigned[b.pk] for b in pending], [second.pk, None, second.pk, first.pk])
+        self.assertEqual(Booking.objects.get(pk=pending[3].pk).status, 'confirmed')
+        self.assertEqual(set(SlotClaim.objects.filter(booking=pending[3]).values_list('barber_id', flat=True)),
+                         {first.pk})
+        self.assertEqual(verify_salon_stats([self.salon.pk]), {})
+
+    def test_command_balances_load(self):
+        for i in range(8):
+            self.book(time(9 + i // 2, 30 * (i % 2)))
+        out = io.StringIO()
+        call_command('auto_assign_bookings', '--date', self.day.isoformat(), stdout=out)
+        self.assertIn(f'Salon {self.salon.pk}: assigned 8, still pending 0', out.getvalue())
+        loads = Booking.objects.filter(salon=self.salon).values_list('barber_id', flat=True)
+        self.assertEqual(sorted(loads), [self.barbers[0].pk] * 4 + [self.barbers[1].pk] * 4)
+
+
+# ============ BOOKING EVENT STREAM TESTS ============
+
+class BookingEventStreamTests(TestCase):
+    """The SSE stream authenticates its caller and forwards only their bookings' events"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', 'owner')
+        cls.customer = make_user('customer', 'customer')
+        cls.other_customer = make_user('other', 'customer')
+        cls.salon = make_salon(cls.owner)
+        cls.other_salon = make_salon(make_user('rival', 'owner'), name='Rival Cuts')
+        cls.barber = Barber.objects.create(user=make_user('barber', 'barber'), salon=cls.salon)
+        cls.services = {
+            salon.pk: Service.objects.create(salon=salon, name='Haircut', description='', price=250, duration=30)
+            for salon in (cls.salon, cls.other_salon)
+        }
+
+    async def connect(self, user=None, query='', token=None):
+        headers = {}
+        if user is not None:
+            token = await sync_to_async(lambda: str(ClaimsRefreshToken.for_user(user).access_token))()
+            headers['Authorization'] = f'Bearer {token}'
+        return await AsyncClient().get(f'/api/events/bookings/{query}', headers=headers)
+
+    async def events(self, response):
+        """Open the stream; returns its chunk iterator, subscribed"""
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response)
+        self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+        return stream
+
+    def book(self, customer, salon, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Booking.objects.create(
+                customer=customer, salon=salon, service=self.services[salon.pk],
+                booking_date=date.today() + timedelta(days=1), booking_time=time(10), **fields,
+            )
+
+    async def next_event(self, stream):
+        event, data = (await asyncio.wait_for(anext(stream), 5)).decode().splitlines()[:2]
+        return event.removeprefix('event: '), json.loads(data.removeprefix('data: '))
+
+    async def test_requires_authentication(self):
+        response = await self.connect()
+        self.assertEqual(response.status_code, 401)
+        response = await self.connect(query='?token=not-a-token')
+        self.assertEqual(response.status_code, 401)
+
+        token = await sync_to_async(lambda: str(ClaimsRefreshToken.for_user(self.customer).access_token))()
+        stream = await self.events(await self.connect(query=f'?token={token}'))
+        await stream.aclose()
+
+    async def test_customers_hear_only_their_own_bookings(self):
+        stream = await self.events(await self.connect(self.customer))
+        await sync_to_async(self.book)(self.other_customer, self.salon)
+        mine = await sync_to_async(self.book)(self.customer, self.other_salon)
+        event, data = await self.next_event(stream)
+        self.assertEqual((event, data['id'], data['status']), ('booking.created', mine.pk, 'pending'))
+        await stream.aclose()
+
+    async def test_owners_and_barbers_hear_their_salon(self):
+        owner = await self.events(await self.connect(self.owner))
+        narrowed = await self.events(await self.connect(self.owner, f'?salon={self.salon.pk}'))
+        barber = await self.events(await self.connect(self.barber.user))
+        await sync_to_async(self.book)(self.customer, self.other_salon)
+        booking = await sync_to_async(self.book)(self.customer, self.salon)
+        for stream in (owner, narrowed, barber):
+            event, data = await self.next_event(stream)
+            self.assertEqual((event, data['id']), ('booking.created', booking.pk))
+            await stream.aclose()
+
+    async def test_salon_filter_is_limited_to_the_callers_salons(self):
+        for user in (self.owner, self.barber.user, self.customer):
+            with self.subTest(user=user.username):
+                response = await self.connect(user, f'?salon={self.other_salon.pk}')
+                self.assertEqual(response.status_code, 403)
+        self.assertEqual((await self.connect(self.owner, '?salon=abc')).status_code, 400)
+
+    def test_publishing_needs_no_queries(self):
+        booking = self.book(self.customer, self.salon, barber=self.barber)
+        booking = Booking.objects.get(pk=booking.pk)
+        with mock.patch('core.events.get_broker') as get_broker, self.assertNumQueries(0):
+            with self.captureOnCommitCallbacks(execute=True):
+                publish_booking_event(booking, 'booking.updated')
+        topics, event = get_broker.return_value.publish.call_args.args
+        self.assertEqual(topics, [f'salon:{self.salon.pk}', f'user:{self.customer.pk}', f'barber:{self.barber.pk}'])
+        self.assertIn(f'barber:{self.barber.pk}', stream_topics(self.barber.user))
+        self.assertEqual(event['booking']['barber'], self.barber.pk)
+
+
+# ============ BACKGROUND JOB TESTS ============
+
+class JobTests(TestCase):
+    """Queued jobs run once each, failures retry with backoff and then fail"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', 'owner')
+        cls.salon = make_salon(cls.owner)
+
+    def setUp(self):
+        self.calls = []
+
+        @register('tests.flaky')
+        def flaky(fail=0):
+            self.calls.append(fail)
+            if len(self.calls) <= fail:
+                raise RuntimeError('boom')
+        self.addCleanup(REGISTRY.pop, 'tests.flaky')
+
+    def test_enqueued_job_runs(self):
+        SalonStats.objects.filter(salon=self.salon).update(total_barbers=5)
+        job = enqueue('stats.rebuild', {'salon_ids': [self.salon.pk]})
+        worker = Worker()
+        self.assertEqual(worker.run_batch(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.last_error), ('succeeded', 1, ''))
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(SalonStats.objects.get(salon=self.salon).total_barbers, 0)
+        self.assertEqual(worker.run_batch(), 0)
+        self.assertEqual(worker.stats()['succeeded'], 1)
+        with self.assertRaises(ValueError):
+            enqueue('tests.missing')
+
+    def test_failures_retry_with_backoff_then_fail(self):
+        retried = enqueue('tests.flaky', {'fail': 1})
+        doomed = enqueue('tests.flaky', {'fail': 5}, max_attempts=2)
+        worker = Worker()
+        with self.assertLogs('core.jobs', 'ERROR'):
+            worker.run_batch()
+        retried.refresh_from_db()
+        self.assertEqual((retried.status, retried.attempts), ('queued', 1))
+        self.assertIn('RuntimeError: boom', retried.last_error)
+        self.assertGreater(retried.run_at, timezone.now() + timedelta(seconds=4))
+        # Not due yet
+        self.assertEqual(worker.run_batch(), 0)
+
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('core.jobs', 'ERROR') as logs:
+            worker.run_batch()
+        self.assertIn('attempt 2 of 2', logs.output[0])
+        retried.refresh_from_db()
+        doomed.refresh_from_db()
+        self.assertEqual((retried.status, retried.attempts), ('succeeded', 2))
+        self.assertEqual((doomed.status, doomed.attempts), ('failed', 2))
+        self.assertEqual(worker.stats()['retried'], 2)
+        self.assertEqual(worker.stats()['failed'], 1)
+
+    def test_claims_do_not_overlap_and_stale_claims_are_requeued(self):
+        jobs = [enqueue('tests.flaky') for _ in range(5)]
+        first, second = claim_jobs(3), claim_jobs(3)
+        self.assertEqual([job.pk for job in first + second], [job.pk for job in jobs])
+        self.assertEqual(claim_jobs(3), [])
+
+        self.assertEqual(requeue_stale(timeout=timedelta(hours=1)), 0)
+        Job.objects.filter(pk=first[0].pk).update(max_attempts=1)
+        self.assertEqual(requeue_stale(timeout=timedelta(0)), 5)
+        self.assertEqual(Job.objects.get(pk=first[0].pk).status, 'failed')
+        self.assertEqual(Job.objects.filter(status='queued', claimed_by='').count(), 4)
+        # The stale claim's worker can no longer record an outcome
+        run_job(first[1])
+        self.assertEqual(Job.objects.get(pk=first[1].pk).status, 'queued')
+        self.assertEqual(Worker().run_batch(), 4)
+        self.assertEqual(Job.objects.filter(status='succeeded').count(), 4)
+
+    def test_heartbeat_keeps_long_jobs_claimed(self):
+        worker = Worker()
+
+        @register('tests.slow')
+        def slow():
+            # Running longer than the claim timeout, with a heartbeat in between
+            Job.objects.filter(status='running').update(claimed_at=timezone.now() - timedelta(hours=1))
+            self.assertEqual(worker.heartbeat(), 1)
+            self.assertEqual(requeue_stale(timeout=timedelta(minutes=1)), 0)
+        self.addCleanup(REGISTRY.pop, 'tests.slow')
+
+        job = enqueue('tests.slow')
+        self.assertEqual(enqueue_once('tests.slow'), job)
+        worker.run_batch()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('succeeded', 1))
+        self.assertEqual(worker.heartbeat(), 0)
+
+    def test_command_drains_queue_and_reports_throughput(self):
+        call_command('auto_assign_bookings', '--enqueue', '--salon', str(self.salon.pk), stdout=io.StringIO())
+        for _ in range(3):
+            enqueue('tests.flaky')
+        out = io.StringIO()
+        call_command('run_jobs', '--once', stdout=out)
+        self.assertRegex(out.getvalue(), r'4 job\(s\) in [\d.]+s \([\d.]+ jobs/s while busy\): 4 succeeded')
+        self.assertFalse(Job.objects.exclude(status='succeeded').exists())
+
+
+# ============ AUTHENTICATION TESTS ============
+
+class AuthenticationTests(TestCase):
+    """request.user comes from token claims until the user's role, salons or password change"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', 'owner', email='owner@example.com')
+        cls.salon = make_salon(cls.owner)
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, username='owner', password='pass1234'):
+        response = APIClient().post('/api/auth/login/', {'username': username, 'password': password}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def get(self, url, access):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        user_reads = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT "core_user"."id"')]
+        return response, user_reads
+
+    def test_claims_replace_user_lookup(self):
+        tokens = self.login()
+        claims = AccessToken(tokens['access'])
+        self.assertEqual(
+            (claims['user_type'], claims['salon_ids'], claims['barber_id']), ('owner', [self.salon.pk], None)
+        )
+
+        # The first request caches the current token version
+        self.assertEqual(len(self.get('/api/salons/', tokens['access'])[1]), 1)
+        response, user_reads = self.get(f'/api/salons/{self.salon.pk}/', tokens['access'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(user_reads, [])
+        # Anything beyond the claims loads the rest of the row at once
+        response, user_reads = self.get('/api/auth/profile/', tokens['access'])
+        self.assertEqual((response.data['email'], response.data['phone']), ('owner@example.com', self.owner.phone))
+        self.assertEqual(len(user_reads), 1)
+
+    def test_salon_and_role_changes_expire_claims(self):
+        tokens = self.login()
+        second = make_salon(self.owner, name='Second Branch')
+        # Stale claims are not trusted: the user row is checked and the request still works
+        response, user_reads = self.get('/api/salons/', tokens['access'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(user_reads), 1)
+
+        refreshed = APIClient().post('/api/auth/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+        access = refreshed.data['access']
+        self.assertEqual(AccessToken(access)['salon_ids'], [self.salon.pk, second.pk])
+        self.assertEqual(self.get('/api/salons/', access)[1], [])
+
+        barber_user = make_user('barber', 'barber')
+        access = self.login('barber')['access']
+        Barber.objects.create(user=barber_user, salon=self.salon)
+        self.assertEqual(len(self.get('/api/bookings/', access)[1]), 1)
+
+    def test_password_change_and_deactivation_revoke_tokens(self):
+        tokens = self.login()
+        response = api_client(self.owner).post(
+            '/api/auth/change-password/', {'old_password': 'pass1234', 'new_password': 'n3w-Secret!'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get('/api/salons/', tokens['access'])[0].status_code, 401)
+        refresh = APIClient().post('/api/auth/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(refresh.status_code, 401)
+
+        access = self.login(password='n3w-Secret!')['access']
+        self.assertEqual(self.get('/api/salons/', access)[0].status_code, 200)
+        owner = User.objects.get(pk=self.owner.pk)
+        owner.is_active = False
+        owner.save()
+        self.assertEqual(self.get('/api/salons/', access)[0].status_code, 401)
+
+
+# ============ CONDITIONAL GET TESTS ============
+
+class ConditionalGetTests(TestCase):
+    """Per-salon list ETags: 304 while unchanged, new tag after any write"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', 'owner')
+        cls.customer = make_user('customer', 'customer')
+        cls.salon = make_salon(cls.owner)
+        cls.service = Service.objects.create(
+            salon=cls.salon, name='Haircut', description='Classic cut', price=250, duration=30
+        )
+
+    def test_not_modified_without_queries(self):
+        client = api_client(self.owner)
+        url = f'/api/bookings/?salon={self.salon.pk}'
+        etag = client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        # The user comes from the token claims, so nothing touches the database
+        self.assertEqual(len(ctx), 0)
+
+    def test_writes_change_etag(self):
+        client = api_client(self.owner)
+        url = f'/api/services/?salon={self.salon.pk}'
+        etag = client.get(url)['ETag']
+        Service.objects.create(salon=self.salon, name='Shave', description='', price=100, duration=15)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        Booking.objects.create(
+            customer=self.customer, salon=self.salon, service=self.service,
+            booking_date=date.today() + timedelta(days=1), booking_time=time(10),
+        )
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_is_per_user(self):
+        url = f'/api/bookings/?salon={self.salon.pk}'
+        etag = api_client(self.owner).get(url)['ETag']
+        response = api_client(self.customer).get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+# ============ RESPONSE CACHE TESTS ============
+
+class ResponseCacheTests(TestCase):
+    """Public reads are served from cache until a related write"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', 'owner')
+        cls.customer = make_user('customer', 'customer')
+        cls.salon = make_salon(cls.owner)
+        cls.service = Service.objects.create(
+            salon=cls.salon, name='Haircut', description='Classic cut', price=250, duration=30
+        )
+
+    def setUp(self):
+        response_cache().clear()
+
+    def assert_cached(self, url):
+        client = api_client()
+        first = client.get(url)
+        with CaptureQueriesContext(connection) as ctx:
+            second = client.get(url)
+        self.assertEqual(len(ctx), 0, url)
+        self.assertEqual(first.json(), second.json())
+        return second
+
+    def test_hits_and_misses(self):
+        self.assert_cached(f'/api/services/?salon={self.salon.pk}')
+        self.assert_cached(f'/api/services/{self.service.pk}/')
+        stats = cache_stats()
+        self.assertEqual(stats['ServiceViewSet.list'], {'hits': 1, 'misses': 1})
+        self.assertEqual(stats['ServiceViewSet.retrieve'], {'hits': 1, 'misses': 1})
+
+    def test_writes_invalidate(self):
+        url = f'/api/services/?salon={self.salon.pk}'
+        self.assert_cached(url)
+        self.service.price = 300
+        self.service.save()
+        self.assertEqual(api_client().get(url).json()[0]['price'], '300.00')
+
+        self.salon.name = 'Renamed'
+        self.salon.save()
+        detail = api_client().get(f'/api/services/{self.service.pk}/')
+        self.assertEqual(detail.json()['salon_name'], 'Renamed')
+
+        reviews = f'/api/reviews/?salon={self.salon.pk}'
+        self.assert_cached(reviews)
+        booking = Booking.objects.create(
+            customer=self.customer, salon=self.salon, service=self.service,
+            booking_date=date.today(), booking_time=time(10), status='completed',
+        )
+        Review.objects.create(booking=booking, customer=self.customer, salon=self.salon, rating=4, comment='Good')
+        self.assertEqual(len(api_client().get(reviews).json()), 1)
+
+    def test_authenticated_reviews_not_shared(self):
+        # Customers only see their own reviews, so their reads bypass the cache
+        url = f'/api/reviews/?salon={self.salon.pk}'
+        api_client(self.customer).get(url)
+        self.assertEqual(cache_stats()['ReviewViewSet.list'], {'hits': 0, 'misses': 0})
+
+
+# ============ RATING TESTS ============
+
+class RatingTests(TestCase):
+    """Salon and barber ratings follow review writes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', 'owner')
+        cls.customer = make_user('customer', 'customer')
+        cls.salon = make_salon(cls.owner)
+        cls.service = Service.objects.create(
+            salon=cls.salon, name='Haircut', description='Classic cut', price=250, duration=30
+        )
+        cls.barber = Barber.objects.create(user=make_user('barber', 'barber'), salon=cls.salon)
+
+    def review(self, rating, barber=None):
+        booking = Booking.objects.create(
+            customer=self.customer, salon=self.salon, service=self.service, barber=barber,
+            booking_date=date.today(), booking_time=time(10), status='completed',
+        )
+        return Review.objects.create(
+            booking=booking, customer=self.customer, salon=self.salon, barber=barber, rating=rating, comment='',
+        )
+
+    def assert_rating(self, obj, rating, count):
+        obj.refresh_from_db()
+        self.assertEqual((obj.rating, obj.total_reviews), (Decimal(rating), count))
+
+    def test_create_update_delete(self):
+        first = self.review(5, self.barber)
+        self.review(4)
+        self.assert_rating(self.salon, '4.50', 2)
+        self.assert_rating(self.barber, '5.00', 1)
+
+        review = Review.objects.get(pk=first.pk)
+        review.rating = 1
+        review.save()
+        self.assert_rating(self.salon, '2.50', 2)
+        self.assert_rating(self.barber, '1.00', 1)
+
+        review.delete()
+        self.assert_rating(self.salon, '4.00', 1)
+        self.assert_rating(self.barber, '0.00', 0)
+
+    def test_stale_instance_keeps_counters(self):
+        salon = Salon.objects.get(pk=self.salon.pk)
+        self.review(3)
+        salon.name = 'Renamed'
+        salon.save()
+        self.assert_rating(self.salon, '3.00', 1)
+
+    def test_rebuild_matches(self):
+        for rating in (5, 4, 2):
+            self.review(rating, self.barber)
+        Salon.objects.update(rating=0, total_reviews=0, rating_sum=0)
+        self.assertEqual(rebuild_ratings(), (1, 1))
+        self.assert_rating(self.salon, '3.67', 3)
+        self.assert_rating(self.barber, '3.67', 3)
+
+    def test_ties_round_half_up_on_both_paths(self):
+        # 33 / 8 = 4.125, which rounding half to even would make 4.12
+        for rating in (5, 5, 5, 4, 4, 4, 3, 3):
+            self.review(rating, self.barber)
+        self.assert_rating(self.salon, '4.13', 8)
+        rebuild_ratings()
+        self.assert_rating(self.salon, '4.13', 8)
+        self.assert_rating(self.barber, '4.13', 8)
+
+
+# ============ READ PATH TESTS ============
+
+class ReadPathTests(TestCase):
+    """Compiled list readers render byte-for-byte like their serializers"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = make_user('owner', 'owner', first_name='Olivia', last_name='Stone')
+        customer = make_user('customer', 'customer')
+        cls.salon = make_salon(owner, latitude='17.385044', longitude='78.486671', cover_image='https://x/y.png')
+        make_salon(owner, name='Second', rating='4.25')
+        service = Service.objects.create(
+            salon=cls.salon, name='Haircut', description='', price='249.50', duration=30
+        )
+        named = Barber.objects.create(user=make_user('bob', 'barber', first_name='Bob'), salon=cls.salon)
+        Barber.objects.create(user=make_user('free', 'barber'))
+        for i, barber in enumerate([named, None]):
+            Booking.objects.create(
+                customer=customer, salon=cls.salon, service=service, barber=barber,
+                booking_date=date(2025, 1, 2 + i), booking_time=time(9, 30), notes='Window seat',
+            )
+
+    def assert_same(self, reader, serializer_class, queryset):
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        self.assertEqual(JSONRenderer().render(reader.serialize(queryset)), expected)
+
+    def test_readers_match_serializers(self):
+        self.assert_same(SALON_LIST_READER, SalonListSerializer, Salon.objects.order_by('id'))
+        self.assert_same(BOOKING_READER, BookingSerializer, Booking.objects.order_by('id'))
+        self.assert_same(BARBER_DETAIL_READER, BarberDetailSerializer, Barber.objects.order_by('id'))
+
+    def test_list_endpoint_uses_reader(self):
+        client = api_client(make_user('viewer', 'customer'))
+        response = client.get('/api/salons/?ordering=-rating')
+        self.assertEqual(
+            response.content,
+            JSONRenderer().render(SalonListSerializer(Salon.objects.order_by('-rating'), many=True).data),
+        )
+
+
+# ============ JSON RENDERER TESTS ============
+
+class FastJSONTests(TestCase):
+    """orjson renderer and parser behave exactly like DRF's json ones"""
+
+    def test_render_matches_drf(self):
+        payload = {
+            'price': Decimal('249.50'), 'rating': Decimal('4.25'), 'latitude': Decimal('17.385044'),
+            'date': date(2025, 1, 2), 'time': time(9, 30), 'time_us': time(9, 30, 5, 120),
+            'created': datetime(2025, 1, 2, 9, 30, 5, 123456, tzinfo=dt_timezone.utc),
+            'naive': datetime(2025, 1, 2, 9, 30), 'text': 'Café   ✂', 'error': ErrorDetail('bad'),
+            'lazy': gettext_lazy('Cancelled'), 'nested': [{'n': 1, 'f': 2.5, 'none': None, 'ok': True}],
+        }
+        self.assertEqual(FastJSONRenderer().render(payload), JSONRenderer().render(payload))
+
+    def test_indent_falls_back(self):
+        payload = {'a': [1, 2]}
+        media_type = 'application/json; indent=4'
+        self.assertEqual(
+            FastJSONRenderer().render(payload, media_type), JSONRenderer().render(payload, media_type)
+        )
+
+    def test_parse(self):
+        parser = FastJSONParser()
+        self.assertEqual(parser.parse(BytesIO('{"a": [1, 2.5, "é"]}'.encode())), {'a': [1, 2.5, 'é']})
+        with self.assertRaises(ParseError):
+            parser.parse(BytesIO(b'{"a": NaN}'))
+
+
+# ============ QUERY PLAN TESTS ============
+
+FULL_SCAN = re.compile(r'\bSCAN (\S+)$')
+
+
+class QueryPlanTests(TestCase):
+    """Hot endpoints stay on indexes: no query plan may fall back to a full table scan"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user('owner', 'owner')
+        cls.customer = make_user('customer', 'customer')
+        cls.barber_user = make_user('barber', 'barber')
+        cls.salon = make_salon(cls.owner)
+        cls.service = Service.objects.create(salon=cls.salon, name='Haircut', description='', price=250, duration=30)
+        cls.barber = Barber.objects.create(user=cls.barber_user, salon=cls.salon)
+        for i, barber in enumerate((cls.barber, None)):
+            booking = Booking.objects.create(
+                customer=cls.customer, salon=cls.salon, service=cls.service, barber=barber,
+                booking_date=date.today() + timedelta(days=1), booking_time=time(10 + i),
+                status='completed' if barber else 'pending',
+            )
+        Payment.objects.create(booking=booking, amount=250, payment_method='cash')
+        Review.objects.create(booking=booking, customer=cls.customer, salon=cls.salon, rating=4, comment='Nice')
+
+    def setUp(self):
+        response_cache().clear()
+
+    def plan(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assert_indexed(self, sql, params=()):
+        plan = self.plan(sql, params)
+        scans = [line for line in plan if FULL_SCAN.search(line)]
+        self.assertFalse(scans, f'full scan in plan for:\n{sql}\n' + '\n'.join(plan))
+        return plan
+
+    def assert_endpoint_indexed(self, user, url):
+        client = api_client(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        selects = [query['sql'] for query in ctx.captured_queries if query['sql'].startswith('SELECT')]
+        self.assertTrue(selects, url)
+        for sql in selects:
+            with self.subTest(url=url, sql=sql):
+                self.assert_indexed(sql)
+
+    def assert_uses_index(self, queryset, index_name):
+        sql, params = queryset.query.sql_with_params()
+        plan = self.assert_indexed(sql, params)
+        self.assertTrue(any(index_name in line for line in plan), '\n'.join(plan))
+
+    def test_booking_lists(self):
+        for user in (self.owner, self.customer, self.barber_user):
+            with self.subTest(user=user.username):
+                self.assert_endpoint_indexed(user, '/api/bookings/')
+                self.assert_endpoint_indexed(user, f'/api/bookings/?salon={self.salon.pk}')
+
+    def test_review_and_payment_lists(self):
+        self.assert_endpoint_indexed(None, f'/api/reviews/?salon={self.salon.pk}')
+        for user in (self.owner, self.customer):
+            with self.subTest(user=user.username):
+                self.assert_endpoint_indexed(user, '/api/reviews/')
+                self.assert_endpoint_indexed(user, '/api/payments/')
+
+    def test_salon_stats_and_availability(self):
+        # Without a stats row the endpoint rebuilds it with the grouped aggregates
+        SalonStats.objects.filter(salon=self.salon).delete()
+        with self.assertLogs('core.querybudget', 'WARNING'):
+            self.assert_endpoint_indexed(self.owner, f'/api/salons/{self.salon.pk}/stats/')
+        day = (date.today() + timedelta(days=1)).isoformat()
+        self.assert_endpoint_indexed(
+            self.customer, f'/api/salons/{self.salon.pk}/availability/?service={self.service.pk}&date={day}'
+        )
+
+    def test_status_indexes(self):
+        bookings = Booking.objects.filter(salon=self.salon)
+        self.assert_uses_index(
+            bookings.filter(status='pending', barber__isnull=True).order_by('booking_date', 'booking_time'),
+            'booking_unassigned_idx',
+        )
+        self.assert_uses_index(
+            bookings.filter(status='completed', barber__isnull=False).order_by()
+            .values('salon_id').annotate(total=Sum('service__price')),
+            'booking_salon_status_idx',
+        )
+
+
+# ============ DATABASE PROFILE TESTS ============
+
+PRODUCTION_ENV = {
+    'DJANGO_SECRET_KEY': 'not-the-dev-key', 'DJANGO_ALLOWED_HOSTS': 'salon.example.com, api.example.com',
+    'CACHE_BACKEND': 'redis', 'CACHE_LOCATION': 'redis://cache.internal:6379/0',
+}
+
+
+def production_settings(environ=PRODUCTION_ENV):
+    """Import salon_backend.settings_production afresh with only ``environ`` set"""
+    sys.modules.pop('salon_backend.settings_production', None)
+    with mock.patch.dict(os.environ, environ, clear=True):
+        return importlib.import_module('salon_backend.settings_production')
+
+
+class DatabaseProfileTests(TestCase):
+    """salon_backend.settings_production builds the database from the environment"""
+
+    def test_secrets_come_from_the_environment(self):
+        production = production_settings()
+        self.assertEqual(production.SECRET_KEY, 'not-the-dev-key')
+        self.assertEqual(production.ALLOWED_HOSTS, ['salon.example.com', 'api.example.com'])
+        for missing in PRODUCTION_ENV:
+            with self.subTest(missing=missing), self.assertRaisesMessage(ImproperlyConfigured, missing):
+                production_settings({**PRODUCTION_ENV, missing: ''})
+
+    def test_cache_is_shared_between_workers(self):
+        caches = production_settings().CACHES
+        self.assertEqual(caches['default']['BACKEND'], 'django.core.cache.backends.redis.RedisCache')
+        self.assertEqual(caches['responses']['LOCATION'], 'redis://cache.internal:6379/0')
+        self.assertNotEqual(caches['responses'].get('KEY_PREFIX', ''), caches['default'].get('KEY_PREFIX', ''))
+        caches = production_settings({
+            **PRODUCTION_ENV, 'CACHE_BACKEND': 'memcached', 'CACHE_LOCATION': 'cache1:11211, cache2:11211',
+        }).CACHES
+        self.assertEqual(caches['default']['LOCATION'], ['cache1:11211', 'cache2:11211'])
+        with self.assertRaisesMessage(ImproperlyConfigured, 'CACHE_BACKEND'):
+            production_settings({**PRODUCTION_ENV, 'CACHE_BACKEND': 'locmem'})
+
+    def test_sqlite_connection_is_tuned(self):
+        from django.db.backends.sqlite3.base import DatabaseWrapper
+
+        database_from_env = production_settings().database_from_env
+
+        with tempfile.TemporaryDirectory() as tmp:
+            config = database_from_env({'DATABASE_NAME': os.path.join(tmp, 'db.sqlite3')})
+            self.assertTrue(config['CONN_HEALTH_CHECKS'])
+            self.assertEqual(config['CONN_MAX_AGE'], 600)
+            wrapper = DatabaseWrapper({**connection.settings_dict, **config}, alias='tuned')
+            try:
+                with wrapper.cursor() as cursor:
+                    pragmas = {
+                        name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                        for name in ('journal_mode', 'synchronous', 'busy_timeout')
+                    }
+            finally:
+                wrapper.close()
+        self.assertEqual(pragmas, {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 20000})
+
+    def test_pooled_server_database(self):
+        database_from_env = production_settings().database_from_env
+
+        config = database_from_env({
+            'DATABASE_ENGINE': 'postgresql', 'DATABASE_NAME': 'salon', 'DATABASE_POOL_SIZE': '8',
+        })
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(config['OPTIONS']['pool']['max_size'], 8)
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertEqual(database_from_env({'DATABASE_ENGINE': 'postgresql'})['CONN_MAX_AGE'], 600)
+        with self.assertRaises(ImproperlyConfigured):
+            database_from_env({'DATABASE_ENGINE': 'oracle'})
@@ -25,6 +25,9 @@ urlpatterns = [
     path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('auth/profile/', user_profile, name='user_profile'),
     path('auth/change-password/', views.change_password, name='change_password'),
+    path('cache/stats/', views.response_cache_stats, name='response_cache_stats'),
+    # Real-time booking events (Server-Sent Events)
+    path('events/bookings/', views.booking_events, name='booking_events'),
     # Include router URLs
     path('', include(router.urls)),
 ]
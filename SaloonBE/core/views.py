@@ -1,15 +1,44 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, status, filters
+from rest_framework.exceptions import AuthenticationFailed, PermissionDenied
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
 from django.contrib.auth import get_user_model
 from django_filters.rest_framework import DjangoFilterBackend
-from math import radians, cos, sin, asin, sqrt
+from rest_framework_simplejwt.exceptions import InvalidToken
 from datetime import datetime, timedelta
-from django.db.models import Sum
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+from django.utils import timezone
 
-from .models import BarberJoinRequest, Salon, Service, Barber, Booking, Payment, Review
+from .authentication import ClaimsJWTAuthentication, barber_ids, owned_salon_ids
+from .availability import MAX_RANGE_DAYS, drop_past_slots, get_availability
+from .bulk import MAX_BULK_BOOKINGS, OPERATIONS, BulkOperationError, apply_bulk_operation
+from .catalog import CatalogImportError, export_catalog_csv, export_catalog_json, import_catalog, read_rows
+from .etags import ConditionalListMixin
+from .exports import (
+    BOOKING_EXPORT_COLUMNS, PAYMENT_EXPORT_COLUMNS, export_csv, parse_export_filters, stream_response,
+)
+from .events import barber_topic, get_broker, salon_topic, user_topic
+from .geo import closest, haversine_km, nearby_filter
+from .models import BarberJoinRequest, Salon, SalonStats, Service, Barber, Booking, Payment, Review
+from .pagination import BookingPagination, KeysetPagination, PaymentPagination
+from .querybudget import QueryBudgetMixin
+from .queues import QUEUES, entry_data, in_queue
+from .readpath import BARBER_DETAIL_READER, BOOKING_READER, SALON_LIST_READER, FastListMixin
+from .reservations import SlotUnavailable, claim_slot, release_slot, snapshot, sync_claims
+from .responsecache import ResponseCacheMixin, cache_stats
+from .rollups import parse_timeseries_params, salon_timeseries
+from .search import SALON_INDEX, SERVICE_INDEX, FullTextSearchFilter
+from .stats import portfolio_stats, rebuild_salon_stats
 from .serializers import (
     ChangePasswordSerializer, RegisterSerializer, UserSerializer, UserProfileSerializer,
     SalonSerializer, SalonListSerializer, SalonCreateUpdateSerializer,
@@ -63,20 +92,24 @@ def user_profile(request):
 
 # ============ SALON VIEWSET ============
 
-class SalonViewSet(viewsets.ModelViewSet):
+class SalonViewSet(QueryBudgetMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Salon.objects.all()
     serializer_class = SalonSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = KeysetPagination
+    query_budgets = {'list': 3, 'retrieve': 3, 'nearby': 4, 'stats': 3, 'portfolio': 2, 'availability': 6}
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
     filterset_fields = ['is_active']
-    search_fields = ['name', 'address', 'description']
+    search_fields = ['name', 'address', 'description', 'services__name']
+    search_index = SALON_INDEX
     ordering_fields = ['rating', 'created_at']
+    list_reader = SALON_LIST_READER
     
     def get_queryset(self):
         user = self.request.user
         if user.user_type == 'owner':
-            return Salon.objects.filter(owner=user)
-        return Salon.objects.filter(is_active=True)
+            return Salon.objects.filter(owner=user).select_related('owner')
+        return Salon.objects.filter(is_active=True).select_related('owner')
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -92,7 +125,7 @@ class SalonViewSet(viewsets.ModelViewSet):
         """Allow PATCH updates for salon"""
         instance = self.get_object()
         
-        if instance.owner != request.user:
+        if instance.owner_id != request.user.pk:
             return Response(
                 {'error': 'You can only update your own salons'},
                 status=status.HTTP_403_FORBIDDEN
@@ -108,7 +141,7 @@ class SalonViewSet(viewsets.ModelViewSet):
         """Delete salon - only by owner"""
         instance = self.get_object()
         
-        if instance.owner != request.user:
+        if instance.owner_id != request.user.pk:
             return Response(
                 {'error': 'You can only delete your own salons'},
                 status=status.HTTP_403_FORBIDDEN
@@ -133,86 +166,114 @@ class SalonViewSet(viewsets.ModelViewSet):
         lat = float(lat)
         lng = float(lng)
         
-        salons = []
-        for salon in self.get_queryset():
-            distance = self.calculate_distance(lat, lng, 
-                                               float(salon.latitude), 
-                                               float(salon.longitude))
-            if distance <= radius:
-                salon.distance = round(distance, 2)
-                salons.append(salon)
+        try:
+            limit = request.query_params.get('limit')
+            limit = int(limit) if limit else None
+            offset = int(request.query_params.get('offset', 0))
+        except ValueError:
+            return Response(
+                {"error": "limit and offset must be integers"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if (limit is not None and limit < 1) or offset < 0:
+            return Response(
+                {"error": "limit must be positive and offset non-negative"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        salons.sort(key=lambda x: x.distance)
+        # Only salons in grid cells overlapping the radius' bounding box
+        candidates = list(
+            self.get_queryset()
+            .filter(nearby_filter(lat, lng, radius))
+            .annotate(lat=Cast('latitude', FloatField()), lng=Cast('longitude', FloatField()))
+            .values_list('id', 'lat', 'lng')
+        )
+        ranked = closest(lat, lng, [(c[1], c[2]) for c in candidates], radius, limit, offset)
+        
+        # Load full rows only for the page being returned
+        by_id = self.get_queryset().in_bulk([candidates[i][0] for i, _ in ranked])
+        salons = []
+        for i, distance in ranked:
+            salon = by_id[candidates[i][0]]
+            salon.distance = round(distance, 2)
+            salons.append(salon)
         
         serializer = SalonListSerializer(salons, many=True)
         return Response(serializer.data)
     
     def calculate_distance(self, lat1, lon1, lat2, lon2):
         """Calculate distance between two points using Haversine formula"""
-        lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
-        dlon = lon2 - lon1
-        dlat = lat2 - lat1
-        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-        c = 2 * asin(sqrt(a))
-        km = 6371 * c
-        return km
+        return haversine_km(lat1, lon1, lat2, lon2)
 
+    @action(detail=True, methods=['get'])
+    def availability(self, request, pk=None):
+        """Free booking slots for a service, optionally with one barber, over a date range"""
+        salon = self.get_object()
+        params = request.query_params
+        
+        service_id = params.get('service')
+        if not service_id:
+            return Response(
+                {'error': 'service is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            start_date = datetime.strptime(params.get('start_date') or params.get('date') or '', '%Y-%m-%d').date()
+            end_date = datetime.strptime(params['end_date'], '%Y-%m-%d').date() if params.get('end_date') else start_date
+        except ValueError:
+            return Response(
+                {'error': 'date (or start_date/end_date) is required in YYYY-MM-DD format'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if end_date < start_date or (end_date - start_date).days >= MAX_RANGE_DAYS:
+            return Response(
+                {'error': f'Date range must be between 1 and {MAX_RANGE_DAYS} days'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        service = get_object_or_404(Service, pk=service_id, salon=salon, is_active=True)
+        barber = None
+        if params.get('barber'):
+            barber = get_object_or_404(Barber, pk=params['barber'], salon=salon)
+        
+        days = drop_past_slots(get_availability(salon, service, start_date, end_date, barber))
+        return Response({
+            'salon_id': salon.id,
+            'service_id': service.id,
+            'barber_id': barber.id if barber else None,
+            'duration': service.duration,
+            'dates': [{'date': day.isoformat(), 'slots': slots} for day, slots in days.items()],
+        })
+    
     @action(detail=True, methods=['get'])
     def stats(self, request, pk=None):
         """Get salon statistics for owner dashboard"""
         try:
             salon = self.get_object()
             
-            if salon.owner != request.user:  # pyright: ignore[reportUnreachable]
+            if salon.owner_id != request.user.pk:  # pyright: ignore[reportUnreachable]
                 return Response(  # pyright: ignore[reportUnreachable]
                     {'error': 'You can only view stats for your own salons'},
                     status=status.HTTP_403_FORBIDDEN
                 )
             
-            # ✅ CONFIRMED BOOKINGS (actual valid bookings)
-            confirmed_bookings = Booking.objects.filter(
-                salon=salon,
-                status__in=['confirmed', 'in_progress', 'completed'],
-                barber__isnull=False
-            )
-            
-            # ✅ COMPLETED BOOKINGS (revenue)
-            completed_bookings = Booking.objects.filter(
-                salon=salon,
-                status='completed',
-                barber__isnull=False
-            )
-            
-            # ✅ PENDING BOOKINGS (waiting for barber)
-            pending_bookings = Booking.objects.filter(
-                salon=salon,
-                status='pending',
-                barber__isnull=True
-            )
-            
-            # ✅ CANCELLED BOOKINGS (unsuccessful)
-            cancelled_bookings = Booking.objects.filter(
-                salon=salon,
-                status='cancelled'
-            )
-            
-            # Calculate revenue
-            total_revenue = completed_bookings.aggregate(
-                total=Sum('service__price')
-            )['total'] or 0
-            
-            # Get barbers in this salon
-            barbers_count = Barber.objects.filter(salon=salon).count()
+            # Counters are maintained incrementally; seed the row on first use
+            stats = SalonStats.objects.filter(salon=salon).first()
+            if stats is None:
+                rebuild_salon_stats([salon.id])
+                stats = SalonStats.objects.get(salon=salon)
             
             stats_data = {
                 'salon_id': salon.id,
                 'salon_name': salon.name,
-                'total_confirmed_bookings': confirmed_bookings.count(),
-                'total_completed_bookings': completed_bookings.count(),
-                'total_pending_bookings': pending_bookings.count(),
-                'total_cancelled_bookings': cancelled_bookings.count(),
-                'total_revenue': float(total_revenue),
-                'total_barbers': barbers_count,
+                'total_confirmed_bookings': stats.confirmed_bookings,
+                'total_completed_bookings': stats.completed_bookings,
+                'total_pending_bookings': stats.pending_bookings,
+                'total_cancelled_bookings': stats.cancelled_bookings,
+                'total_revenue': float(stats.total_revenue),
+                'total_barbers': stats.total_barbers,
                 'rating': salon.rating,
                 'total_reviews': salon.total_reviews,
             }
@@ -224,15 +285,153 @@ class SalonViewSet(viewsets.ModelViewSet):
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+    
+    @action(detail=False, methods=['get'])
+    def portfolio(self, request):
+        """Dashboard stats for every salon the owner has, plus totals across them"""
+        if request.user.user_type != 'owner':
+            return Response(
+                {'error': 'Only salon owners can view a portfolio'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        portfolio = portfolio_stats(request.user)
+        salons = [
+            {
+                'salon_id': salon.id,
+                'salon_name': salon.name,
+                'is_active': salon.is_active,
+                'total_confirmed_bookings': stats.confirmed_bookings,
+                'total_completed_bookings': stats.completed_bookings,
+                'total_pending_bookings': stats.pending_bookings,
+                'total_cancelled_bookings': stats.cancelled_bookings,
+                'total_revenue': float(stats.total_revenue),
+                'total_barbers': stats.total_barbers,
+                'pending_join_requests': pending_requests,
+                'rating': salon.rating,
+                'total_reviews': salon.total_reviews,
+            }
+            for salon, stats, pending_requests in portfolio
+        ]
+        summed = (
+            'total_confirmed_bookings', 'total_completed_bookings', 'total_pending_bookings',
+            'total_cancelled_bookings', 'total_barbers', 'pending_join_requests', 'total_reviews',
+        )
+        totals = {field: sum(row[field] for row in salons) for field in summed}
+        # Summed as Decimal so cents do not drift
+        totals['total_revenue'] = float(sum((stats.total_revenue for _, stats, _ in portfolio), Decimal('0')))
+        return Response({'salon_count': len(salons), 'totals': totals, 'salons': salons})
+    
+    @action(detail=True, methods=['get'], url_path='stats/timeseries')
+    def timeseries(self, request, pk=None):
+        """Bookings, completions, cancellations and revenue per day, week or month (?period=)"""
+        salon = self.get_object()
+        if salon.owner_id != request.user.pk:
+            return Response(
+                {'error': 'You can only view stats for your own salons'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        try:
+            period, start_date, end_date = parse_timeseries_params(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        results = [
+            {
+                'period_start': row['period_start'].isoformat(),
+                'bookings': row['bookings'],
+                'completed_bookings': row['completed_bookings'],
+                'cancelled_bookings': row['cancelled_bookings'],
+                'revenue': float(row['revenue']),
+            }
+            for row in salon_timeseries(salon.id, start_date, end_date, period)
+        ]
+        return Response({
+            'salon_id': salon.id,
+            'period': period,
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'results': results,
+        })
+    
+    @action(detail=True, methods=['get'])
+    def queue(self, request, pk=None):
+        """Today's live queue, one lane per barber plus unassigned bookings (owner and barbers)"""
+        salon = self.get_object()
+        if salon.owner_id != request.user.pk and barber_ids(request.user)[1] != salon.id:
+            return Response(
+                {'error': 'Only the salon owner and its barbers can view the queue'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        lanes = QUEUES.lanes(salon.id)
+        return Response({
+            'salon_id': salon.id,
+            'date': timezone.localdate().isoformat(),
+            'lanes': [
+                {'barber_id': barber_id, 'bookings': [entry_data(entry) for entry in lanes[barber_id]]}
+                # Barbers in id order, unassigned bookings last
+                for barber_id in sorted(lanes, key=lambda pk: (pk is None, pk or 0))
+            ],
+        })
+    
+    @action(detail=True, methods=['get'], url_path='services/export')
+    def export_services(self, request, pk=None):
+        """Stream the salon's service catalog as CSV (default) or JSON (?type=json)"""
+        salon = self.get_object()
+        if salon.owner_id != request.user.pk:
+            return Response(
+                {'error': 'You can only export services of your own salons'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        if request.query_params.get('type') == 'json':
+            lines, content_type, extension = export_catalog_json(salon), 'application/json', 'json'
+        else:
+            lines, content_type, extension = export_catalog_csv(salon), 'text/csv', 'csv'
+        return stream_response(request, lines, content_type, f'salon-{salon.id}-services.{extension}')
+    
+    @action(detail=True, methods=['post'], url_path='services/import', parser_classes=[MultiPartParser])
+    def import_services(self, request, pk=None):
+        """Create or update services by name from an uploaded .csv or .json file"""
+        salon = self.get_object()
+        if salon.owner_id != request.user.pk:
+            return Response(
+                {'error': 'You can only import services into your own salons'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'error': 'Upload the catalog as a "file" field'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            counts = import_catalog(salon, read_rows(upload))
+        except CatalogImportError as e:
+            return Response(
+                {'error': 'Import failed, no services were changed', 'errors': e.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(counts)
 
 
 # ============ SERVICE VIEWSET ============
 
-class ServiceViewSet(viewsets.ModelViewSet):
-    queryset = Service.objects.filter(is_active=True)
+class ServiceViewSet(QueryBudgetMixin, ConditionalListMixin, ResponseCacheMixin, viewsets.ModelViewSet):
+    queryset = Service.objects.filter(is_active=True).select_related('salon')
     serializer_class = ServiceSerializer
-    filter_backends = [DjangoFilterBackend]
+    pagination_class = KeysetPagination
+    query_budgets = {'list': 3, 'retrieve': 2}
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     filterset_fields = ['salon', 'is_active']
+    search_fields = ['name', 'description', 'salon__name']
+    search_index = SERVICE_INDEX
+    response_cache_tag = 'service'
+    response_cache_public = True
     
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -242,13 +441,16 @@ class ServiceViewSet(viewsets.ModelViewSet):
 
 # ============ BARBER VIEWSET ============
 
-class BarberViewSet(viewsets.ModelViewSet):
+class BarberViewSet(QueryBudgetMixin, ConditionalListMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Barber.objects.select_related('user', 'salon').all()
     serializer_class = BarberDetailSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    query_budgets = {'list': 3, 'retrieve': 2, 'get_join_requests': 3}
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['salon', 'is_available']
     ordering_fields = ['rating', 'experience_years']
+    list_reader = BARBER_DETAIL_READER
     
     def get_queryset(self):
         """Return barbers with user and salon info preloaded"""
@@ -321,7 +523,9 @@ class BarberViewSet(viewsets.ModelViewSet):
         
         salon = get_object_or_404(Salon, id=salon_id, owner=request.user)
         
-        requests = BarberJoinRequest.objects.filter(salon=salon, status='pending')
+        requests = BarberJoinRequest.objects.filter(
+            salon=salon, status='pending'
+        ).select_related('barber', 'salon')
         serializer = BarberJoinRequestSerializer(requests, many=True)
         return Response(serializer.data)
     
@@ -336,7 +540,7 @@ class BarberViewSet(viewsets.ModelViewSet):
         
         join_request = get_object_or_404(BarberJoinRequest, id=request_id)
         
-        if join_request.salon.owner != request.user:
+        if join_request.salon.owner_id != request.user.pk:
             return Response(
                 {'error': 'You can only approve requests for your own salons'},
                 status=status.HTTP_403_FORBIDDEN
@@ -376,7 +580,7 @@ class BarberViewSet(viewsets.ModelViewSet):
         
         join_request = get_object_or_404(BarberJoinRequest, id=request_id)
         
-        if join_request.salon.owner != request.user:
+        if join_request.salon.owner_id != request.user.pk:
             return Response(
                 {'error': 'You can only reject requests for your own salons'},
                 status=status.HTTP_403_FORBIDDEN
@@ -393,7 +597,7 @@ class BarberViewSet(viewsets.ModelViewSet):
         barber = self.get_object()
         
         # Check if requesting user is the salon owner
-        if barber.salon and barber.salon.owner != request.user:
+        if barber.salon and barber.salon.owner_id != request.user.pk:
             return Response(
                 {'error': 'Only salon owner can remove barbers'},
                 status=status.HTTP_403_FORBIDDEN
@@ -419,15 +623,20 @@ class BarberViewSet(viewsets.ModelViewSet):
 
 # ============ BOOKING VIEWSET ============
 
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(QueryBudgetMixin, ConditionalListMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Booking.objects.all()
     serializer_class = BookingSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = BookingPagination
+    query_budgets = {'list': 3, 'retrieve': 3}
+    list_reader = BOOKING_READER
     
     def get_queryset(self):
         """Filter bookings based on user type and query params"""
         user = self.request.user
-        queryset = Booking.objects.all()
+        queryset = Booking.objects.select_related(
+            'customer', 'salon', 'service', 'barber__user'
+        )
         
         salon_id = self.request.query_params.get('salon', None)
         if salon_id:
@@ -437,18 +646,18 @@ class BookingViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(customer=user)
         
         elif user.user_type == 'barber':
-            try:
-                barber = user.barber_profile
-                if barber.salon:
-                    queryset = queryset.filter(salon=barber.salon)
-            except:
+            barber_id, barber_salon_id = barber_ids(user)
+            if barber_id is None:
                 queryset = queryset.none()
+            elif barber_salon_id:
+                queryset = queryset.filter(salon_id=barber_salon_id)
         
         elif user.user_type == 'owner':
             queryset = queryset.filter(salon__owner=user)
         
-        return queryset.order_by('-booking_date', '-booking_time')
+        return queryset.order_by('-booking_date', '-booking_time', '-id')
     
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
         """✅ Customer creates booking with time slot validation"""
         if request.user.user_type != 'customer':
@@ -495,10 +704,18 @@ class BookingViewSet(viewsets.ModelViewSet):
         
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
+        
+        # Reserve the slot; a conflicting concurrent booking fails here
+        try:
+            with transaction.atomic():
+                self.perform_create(serializer)
+                claim_slot(serializer.instance)
+        except SlotUnavailable as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
         
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
+    @transaction.atomic
     def partial_update(self, request, *args, **kwargs):
         """Allow partial updates for barber assignment and status changes"""
         instance = self.get_object()
@@ -531,9 +748,12 @@ class BookingViewSet(viewsets.ModelViewSet):
                     )
                 
                 # ✨ AUTO-CONFIRM when barber assigns themselves
-                instance.barber = barber
-                instance.status = 'confirmed'
-                instance.save()
+                before = snapshot(instance)
+                with transaction.atomic():
+                    instance.barber = barber
+                    instance.status = 'confirmed'
+                    instance.save()
+                    sync_claims(instance, before)
                 
                 serializer = self.get_serializer(instance)
                 return Response({
@@ -541,6 +761,11 @@ class BookingViewSet(viewsets.ModelViewSet):
                     'data': serializer.data
                 })
                 
+            except SlotUnavailable as e:
+                return Response(
+                    {'error': str(e)},
+                    status=status.HTTP_409_CONFLICT
+                )
             except Exception as e:
                 return Response(
                     {'error': str(e)},
@@ -558,12 +783,9 @@ class BookingViewSet(viewsets.ModelViewSet):
                 can_update = True
             
             elif user.user_type == 'barber':
-                try:
-                    barber = user.barber_profile
-                    if instance.barber == barber:
-                        can_update = True
-                except:
-                    pass
+                barber_id = barber_ids(user)[0]
+                if barber_id is not None and instance.barber_id == barber_id:
+                    can_update = True
             
             if not can_update:
                 return Response(
@@ -571,15 +793,7 @@ class BookingViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_403_FORBIDDEN
                 )
             
-            valid_transitions = {
-                'pending': ['confirmed', 'cancelled'],
-                'confirmed': ['in_progress', 'cancelled'],
-                'in_progress': ['completed'],
-                'completed': [],
-                'cancelled': [],
-            }
-            
-            if new_status not in valid_transitions.get(current_status, []):
+            if new_status not in Booking.VALID_TRANSITIONS.get(current_status, []):
                 return Response(
                     {'error': f'Cannot change status from {current_status} to {new_status}'},
                     status=status.HTTP_400_BAD_REQUEST
@@ -587,11 +801,19 @@ class BookingViewSet(viewsets.ModelViewSet):
         
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
+        
+        before = snapshot(instance)
+        try:
+            with transaction.atomic():
+                self.perform_update(serializer)
+                sync_claims(instance, before)
+        except SlotUnavailable as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
         
         return Response(serializer.data)
     
     @action(detail=True, methods=['post'])
+    @transaction.atomic
     def cancel(self, request, pk=None):
         """Cancel booking - customer or assigned barber can cancel"""
         try:
@@ -604,12 +826,9 @@ class BookingViewSet(viewsets.ModelViewSet):
                 can_cancel = True
             
             elif user.user_type == 'barber':
-                try:
-                    barber_profile = Barber.objects.get(user=user)
-                    if booking.barber == barber_profile:
-                        can_cancel = True
-                except Barber.DoesNotExist:
-                    pass
+                barber_id = barber_ids(user)[0]
+                if barber_id is not None and booking.barber_id == barber_id:
+                    can_cancel = True
             
             if not can_cancel:
                 return Response(
@@ -625,6 +844,7 @@ class BookingViewSet(viewsets.ModelViewSet):
             
             booking.status = 'cancelled'
             booking.save()
+            release_slot(booking)
             
             serializer = self.get_serializer(booking)
             return Response({
@@ -637,22 +857,190 @@ class BookingViewSet(viewsets.ModelViewSet):
                 {'error': f'Failed to cancel booking: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+    
+    @action(detail=True, methods=['get'])
+    def queue(self, request, pk=None):
+        """
+        Where the booking stands in its salon's live queue today.
+        
+        Answered from the in-memory queue without touching the database
+        when the booking is already there; ``queue_position`` and
+        ``estimated_wait_time`` are null for bookings not in today's queue.
+        """
+        user = request.user
+        entry = QUEUES.lookup(int(pk)) if pk.isdigit() else None
+        if entry is not None and (
+            entry.customer_id == user.pk
+            or entry.salon_id in owned_salon_ids(user)
+            or barber_ids(user)[1] == entry.salon_id
+        ):
+            return Response({'salon_id': entry.salon_id, **entry_data(entry)})
+        
+        booking = self.get_object()
+        state = {f: getattr(booking, f) for f in Booking.TRACKED_FIELDS}
+        entry = QUEUES.lookup(booking.pk, booking.salon_id) if in_queue(state) else None
+        if entry is not None:
+            return Response({'salon_id': entry.salon_id, **entry_data(entry)})
+        return Response({
+            'salon_id': booking.salon_id,
+            'booking_id': booking.pk,
+            'barber_id': booking.barber_id,
+            'status': booking.status,
+            'booking_time': booking.booking_time.strftime('%H:%M'),
+            'queue_position': None,
+            'estimated_wait_time': None,
+        })
+    
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Apply one operation to many bookings: all succeed or none change.
+        
+        Owners can cancel, confirm, reassign or reschedule bookings in their
+        salons; barbers can cancel or confirm bookings assigned to them.
+        Body: ``{"operation": ..., "ids": [...]}`` plus ``barber`` for
+        reassign, ``booking_date`` (and optionally ``booking_time``) for
+        reschedule.
+        """
+        user = request.user
+        operation = request.data.get('operation')
+        ids = request.data.get('ids')
+        
+        if user.user_type == 'owner':
+            bookings = Booking.objects.filter(salon__owner=user)
+            allowed = OPERATIONS
+        elif user.user_type == 'barber':
+            bookings = Booking.objects.filter(barber__user=user)
+            allowed = ('cancel', 'confirm')
+        else:
+            return Response(
+                {'error': 'Only salon owners and barbers can update bookings in bulk'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        if operation not in OPERATIONS:
+            return Response(
+                {'error': f'operation must be one of: {", ".join(OPERATIONS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if operation not in allowed:
+            return Response(
+                {'error': f'You cannot {operation} bookings in bulk'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        if (not isinstance(ids, list) or not ids or len(ids) > MAX_BULK_BOOKINGS
+                or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids)):
+            return Response(
+                {'error': f'ids must be a list of 1 to {MAX_BULK_BOOKINGS} booking ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        params = {}
+        if operation == 'reassign':
+            try:
+                params['barber'] = Barber.objects.select_related('user').filter(
+                    pk=request.data.get('barber'), salon__owner=user
+                ).first()
+            except (ValueError, TypeError):
+                params['barber'] = None
+            if params['barber'] is None:
+                return Response(
+                    {'error': 'barber must be a barber in one of your salons'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        elif operation == 'reschedule':
+            try:
+                params['booking_date'] = datetime.strptime(request.data.get('booking_date') or '', '%Y-%m-%d').date()
+                if request.data.get('booking_time'):
+                    params['booking_time'] = datetime.strptime(request.data['booking_time'], '%H:%M').time()
+            except (ValueError, TypeError):
+                return Response(
+                    {'error': 'booking_date (YYYY-MM-DD) is required; booking_time must be HH:MM'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        bookings = list(
+            bookings.filter(pk__in=set(ids))
+            .select_related('customer', 'salon', 'service', 'barber__user')
+            .order_by('pk')
+        )
+        missing = sorted(set(ids) - {booking.pk for booking in bookings})
+        if missing:
+            return Response(
+                {'error': 'Bookings not found', 'ids': missing},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        try:
+            apply_bulk_operation(bookings, operation, **params)
+        except BulkOperationError as e:
+            return Response(
+                {'error': 'No bookings were changed', 'errors': e.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except SlotUnavailable as e:
+            return Response(
+                {'error': str(e), 'booking': e.booking_id},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        serializer = self.get_serializer(bookings, many=True)
+        return Response({
+            'message': f'{len(bookings)} bookings updated',
+            'bookings': serializer.data
+        })
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream the owner's bookings as CSV for accounting.
+        
+        Filters: ``start_date``/``end_date`` on the booking date (inclusive),
+        ``status`` (comma-separated) and ``salon``.
+        """
+        if request.user.user_type != 'owner':
+            return Response(
+                {'error': 'Only salon owners can export bookings'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        try:
+            export_filters = parse_export_filters(request.query_params, Booking.STATUS_CHOICES)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        queryset = Booking.objects.filter(salon__owner=request.user)
+        if 'start_date' in export_filters:
+            queryset = queryset.filter(booking_date__gte=export_filters['start_date'])
+        if 'end_date' in export_filters:
+            queryset = queryset.filter(booking_date__lte=export_filters['end_date'])
+        if 'status' in export_filters:
+            queryset = queryset.filter(status__in=export_filters['status'])
+        if request.query_params.get('salon', '').isdigit():
+            queryset = queryset.filter(salon_id=request.query_params['salon'])
+        
+        lines = export_csv(queryset.order_by('booking_date', 'booking_time', 'id'), BOOKING_EXPORT_COLUMNS)
+        return stream_response(request, lines, 'text/csv', 'bookings.csv')
 
 
 # ============ PAYMENT VIEWSET ============
 
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(QueryBudgetMixin, viewsets.ModelViewSet):
     serializer_class = PaymentSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = PaymentPagination
+    query_budgets = {'list': 2, 'retrieve': 2}
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['status', 'payment_method']
     
     def get_queryset(self):
         user = self.request.user
+        queryset = Payment.objects.select_related(
+            'booking__customer', 'booking__salon', 'booking__service', 'booking__barber__user'
+        )
         if user.user_type == 'customer':
-            return Payment.objects.filter(booking__customer=user)
+            return queryset.filter(booking__customer=user)
         elif user.user_type == 'owner':
-            return Payment.objects.filter(booking__salon__owner=user)
+            return queryset.filter(booking__salon__owner=user)
         return Payment.objects.none()
     
     def get_serializer_class(self):
@@ -669,22 +1057,57 @@ class PaymentViewSet(viewsets.ModelViewSet):
         payment.save()
         serializer = self.get_serializer(payment)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream the owner's payments as CSV for accounting.
+        
+        Filters: ``start_date``/``end_date`` on the payment date (inclusive,
+        UTC), ``status`` (comma-separated) and ``salon``.
+        """
+        if request.user.user_type != 'owner':
+            return Response(
+                {'error': 'Only salon owners can export payments'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        try:
+            export_filters = parse_export_filters(request.query_params, Payment.PAYMENT_STATUS)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        queryset = Payment.objects.filter(booking__salon__owner=request.user)
+        if 'start_date' in export_filters:
+            queryset = queryset.filter(payment_date__date__gte=export_filters['start_date'])
+        if 'end_date' in export_filters:
+            queryset = queryset.filter(payment_date__date__lte=export_filters['end_date'])
+        if 'status' in export_filters:
+            queryset = queryset.filter(status__in=export_filters['status'])
+        if request.query_params.get('salon', '').isdigit():
+            queryset = queryset.filter(booking__salon_id=request.query_params['salon'])
+        
+        lines = export_csv(queryset.order_by('payment_date', 'id'), PAYMENT_EXPORT_COLUMNS)
+        return stream_response(request, lines, 'text/csv', 'payments.csv')
 
 
 # ============ REVIEW VIEWSET ============
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(QueryBudgetMixin, ResponseCacheMixin, viewsets.ModelViewSet):
+    pagination_class = KeysetPagination
+    query_budgets = {'list': 3, 'retrieve': 2}
+    response_cache_tag = 'review'
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['salon', 'barber', 'rating']
     ordering_fields = ['created_at', 'rating']
     
     def get_queryset(self):
+        queryset = Review.objects.select_related('customer', 'salon', 'barber__user')
         if self.request.user.is_authenticated:
             if self.request.user.user_type == 'customer':
-                return Review.objects.filter(customer=self.request.user)
+                return queryset.filter(customer=self.request.user)
             elif self.request.user.user_type == 'owner':
-                return Review.objects.filter(salon__owner=self.request.user)
-        return Review.objects.all()
+                return queryset.filter(salon__owner=self.request.user)
+        return queryset
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -696,8 +1119,18 @@ class ReviewViewSet(viewsets.ModelViewSet):
             return [IsAuthenticated()]
         return [AllowAny()]
     
+    # Ratings are updated by the review signals inside the same transaction
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(customer=self.request.user)
+    
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
+    
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
 
 
 @api_view(['POST'])
@@ -720,3 +1153,109 @@ def change_password(request):
         }, status=status.HTTP_200_OK)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def response_cache_stats(request):
+    """Hit and miss counters of the public response cache"""
+    stats = cache_stats()
+    hits = sum(s['hits'] for s in stats.values())
+    misses = sum(s['misses'] for s in stats.values())
+    return Response({
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+        'endpoints': stats,
+    })
+
+
+# ============ BOOKING EVENT STREAM ============
+
+EVENT_HEARTBEAT_SECONDS = 15
+
+
+def stream_user(request):
+    """JWT from the Authorization header, or ``?token=`` for EventSource clients"""
+    auth = ClaimsJWTAuthentication()
+    result = auth.authenticate(request)
+    if result is not None:
+        return result[0]
+    token = request.GET.get('token')
+    if not token:
+        raise AuthenticationFailed('Authentication credentials were not provided.')
+    return auth.get_user(auth.get_validated_token(token))
+
+
+def stream_topics(user, salon_id=None):
+    """Topics a user may follow; ``salon_id`` narrows to one of their salons"""
+    salon_ids = set()
+    topics = [user_topic(user.pk)]
+    if user.user_type == 'owner':
+        salon_ids = owned_salon_ids(user)
+    elif user.user_type == 'barber':
+        barber_id, barber_salon_id = barber_ids(user)
+        salon_ids = {barber_salon_id} - {None}
+        if barber_id is not None:
+            topics.append(barber_topic(barber_id))
+
+    if salon_id is not None:
+        if salon_id not in salon_ids:
+            raise PermissionDenied('You cannot follow bookings for this salon')
+        return [salon_topic(salon_id)]
+    return topics + [salon_topic(pk) for pk in salon_ids]
+
+
+def format_sse(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+async def booking_event_stream(topics):
+    # Subscribe lazily so the queue belongs to the loop that consumes the stream
+    subscription = get_broker().subscribe(topics)
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            event = await subscription.get(EVENT_HEARTBEAT_SECONDS)
+            if subscription.overflowed:
+                # Events were dropped: tell the client to refetch
+                subscription.overflowed = False
+                yield format_sse('reset', {})
+            elif event is None:
+                yield ': ping\n\n'
+            else:
+                yield format_sse(event['type'], event['booking'])
+    finally:
+        subscription.close()
+
+
+async def booking_events(request):
+    """
+    Server-Sent Events stream of booking changes.
+
+    Customers get their own bookings, barbers and owners their salons'
+    (``?salon=<id>`` narrows to one salon). Events: ``booking.created``,
+    ``booking.assigned``, ``booking.status``, ``booking.updated``,
+    ``booking.deleted`` and ``reset`` (refetch everything).
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    salon_id = request.GET.get('salon')
+    try:
+        salon_id = int(salon_id) if salon_id else None
+    except ValueError:
+        return JsonResponse({'error': 'salon must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        user = await sync_to_async(stream_user)(request)
+        topics = await sync_to_async(stream_topics)(user, salon_id)
+    except (AuthenticationFailed, InvalidToken) as e:
+        return JsonResponse({'error': str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+    except PermissionDenied as e:
+        return JsonResponse({'error': str(e.detail)}, status=status.HTTP_403_FORBIDDEN)
+
+    response = StreamingHttpResponse(booking_event_stream(topics), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
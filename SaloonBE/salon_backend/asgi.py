@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Serve the project through this module (e.g. ``uvicorn salon_backend.asgi:application``)
+so the booking event stream at /api/events/bookings/ holds an open connection
+without tying up a worker thread.
 """
 
 import os
@@ -142,19 +142,60 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework configuration
 REST_FRAMEWORK = {
+    # simplejwt, with request.user built from token claims (core/authentication.py)
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # orjson-backed JSON (core/renderers.py); falls back to DRF's json when unavailable
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# Fail requests that exceed their view's declared query budget (see
+# core/querybudget.py). Off in production, where overruns are only logged.
+QUERY_BUDGET_ENFORCE = False
+
+# Caches. 'responses' holds the public API response cache (see
+# core/responsecache.py); point it at Redis or Memcached to share it
+# between worker processes.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+RESPONSE_CACHE_ALIAS = 'responses'
+
+# Booking event fan-out for /api/events/bookings/ (see core/events.py).
+# With several worker processes, use 'core.events.RelayBroker' and run
+# `python manage.py run_event_relay` alongside them.
+EVENT_BROKER = 'core.events.LocalBroker'
+EVENT_RELAY_ADDRESS = ('127.0.0.1', 8765)
+
 # JWT Settings
 from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
+    # Tokens carry user type and salon claims (core/authentication.py)
+    'TOKEN_OBTAIN_SERIALIZER': 'core.authentication.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'core.authentication.ClaimsTokenRefreshSerializer',
+    # Embed a password hash claim so changing the password revokes older tokens
+    'CHECK_REVOKE_TOKEN': True,
 }
 
 # Media files
@@ -0,0 +1,140 @@
+"""
+Production settings for salon_backend.
+
+Select with ``DJANGO_SETTINGS_MODULE=salon_backend.settings_production``.
+Everything not overridden here comes from ``settings.py``.
+
+Required environment variables (there is no fallback to the development
+values in ``settings.py``):
+
+    DJANGO_SECRET_KEY      the secret key
+    DJANGO_ALLOWED_HOSTS   comma-separated host names
+    CACHE_BACKEND          redis or memcached; the cache every worker
+                           process shares (see CACHES below)
+    CACHE_LOCATION         the cache server URL, or comma-separated URLs
+
+The database is chosen by environment variables:
+
+    DATABASE_ENGINE        sqlite (default) or postgresql
+    DATABASE_NAME          SQLite file path, or the PostgreSQL database name
+    DATABASE_USER / DATABASE_PASSWORD / DATABASE_HOST / DATABASE_PORT
+    DATABASE_POOL_SIZE     PostgreSQL only: size of the psycopg connection
+                           pool (needs ``psycopg[pool]``); 0 disables it
+    DATABASE_CONN_MAX_AGE  seconds a connection is kept between requests
+                           when not pooling (default 600)
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR
+
+
+def required_env(name, environ=os.environ):
+    value = environ.get(name, '').strip()
+    if not value:
+        raise ImproperlyConfigured(f'{name} must be set for the production settings')
+    return value
+
+
+DEBUG = os.environ.get('DJANGO_DEBUG') == '1'
+SECRET_KEY = required_env('DJANGO_SECRET_KEY')
+ALLOWED_HOSTS = [host.strip() for host in required_env('DJANGO_ALLOWED_HOSTS').split(',') if host.strip()]
+
+
+
+# ============ CACHE ============
+
+# List ETags, JWT token versions, availability grids, live-queue counters
+# and cached responses are invalidated by bumping versions in the cache.
+# A per-process cache would leave every other worker serving stale data,
+# so production refuses to start without a shared backend.
+SHARED_CACHE_BACKENDS = {
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+}
+
+
+def caches_from_env(environ=os.environ):
+    backend = environ.get('CACHE_BACKEND', '').strip()
+    if backend not in SHARED_CACHE_BACKENDS:
+        raise ImproperlyConfigured(
+            f"CACHE_BACKEND must be 'redis' or 'memcached' (a cache shared by every worker), not {backend!r}"
+        )
+    locations = [url.strip() for url in required_env('CACHE_LOCATION', environ).split(',') if url.strip()]
+    shared = {
+        'BACKEND': SHARED_CACHE_BACKENDS[backend],
+        'LOCATION': locations if len(locations) > 1 else locations[0],
+    }
+    return {
+        'default': shared,
+        'responses': {**shared, 'KEY_PREFIX': 'responses'},
+    }
+
+
+CACHES = caches_from_env()
+
+
+# ============ DATABASE ============
+
+# Run on every new SQLite connection. WAL lets readers continue while a
+# booking is being written; synchronous=NORMAL is durable in WAL mode
+# except for the last commits on power loss; busy_timeout makes writers
+# queue for the lock instead of failing with "database is locked".
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA busy_timeout=20000',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_size=-32000',
+    'PRAGMA temp_store=MEMORY',
+)
+
+SQLITE_OPTIONS = {
+    'init_command': ';'.join(SQLITE_PRAGMAS),
+    # Take the write lock at BEGIN: a deferred transaction that reads and
+    # then writes fails immediately when another writer got there first,
+    # without waiting for busy_timeout
+    'transaction_mode': 'IMMEDIATE',
+}
+
+
+def database_from_env(environ=os.environ):
+    engine = environ.get('DATABASE_ENGINE', 'sqlite')
+    conn_max_age = int(environ.get('DATABASE_CONN_MAX_AGE', 600))
+
+    if engine == 'sqlite':
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': environ.get('DATABASE_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': SQLITE_OPTIONS,
+            'CONN_MAX_AGE': conn_max_age,
+            'CONN_HEALTH_CHECKS': True,
+        }
+
+    if engine == 'postgresql':
+        options = {}
+        pool_size = int(environ.get('DATABASE_POOL_SIZE', 0))
+        if pool_size:
+            # The pool owns connection reuse; Django rejects CONN_MAX_AGE with it
+            options['pool'] = {'min_size': 1, 'max_size': pool_size, 'timeout': 10}
+            conn_max_age = 0
+        return {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': environ.get('DATABASE_NAME', 'salon'),
+            'USER': environ.get('DATABASE_USER', ''),
+            'PASSWORD': environ.get('DATABASE_PASSWORD', ''),
+            'HOST': environ.get('DATABASE_HOST', ''),
+            'PORT': environ.get('DATABASE_PORT', ''),
+            'OPTIONS': options,
+            'CONN_MAX_AGE': conn_max_age,
+            'CONN_HEALTH_CHECKS': True,
+        }
+
+    raise ImproperlyConfigured(f"DATABASE_ENGINE must be 'sqlite' or 'postgresql', not {engine!r}")
+
+
+DATABASES = {
+    'default': database_from_env(),
+}